@@ -0,0 +1,789 @@
+"""
+Benchmarks de los caminos críticos: cálculos, búsquedas, gráficos e informes PDF.
+
+Cada benchmark corre en un proceso aparte, así el pico de memoria de uno no contamina al
+siguiente. Se reportan dos picos: el aumento del RSS máximo del proceso en la primera ejecución
+y el pico de asignaciones de Python/NumPy medido con tracemalloc. Los datos son sintéticos con
+semilla fija.
+
+Uso:
+    python benchmarks/bench_lab.py                          # corre todo y muestra la tabla
+    python benchmarks/bench_lab.py -k pdf                   # solo los que contienen "pdf"
+    python benchmarks/bench_lab.py --guardar benchmarks/baseline.json
+    python benchmarks/bench_lab.py --comparar benchmarks/baseline.json --tolerancia 0.25
+    python benchmarks/bench_lab.py --verificar              # verificaciones con criterio pasa/falla
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: solo se reporta el pico de tracemalloc
+    resource = None
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path:
+    sys.path.insert(0, str(RAIZ))
+
+SEMILLA = 20240601
+TIEMPO_OBJETIVO_S = 1.0
+MAX_REPETICIONES = 5
+# tracemalloc hace ~10x más lenta la ejecución; por encima de este tiempo solo se reporta el RSS
+MAX_TIEMPO_TRACEMALLOC_S = 2.0
+
+BENCHMARKS = {}
+VERIFICACIONES = {}
+
+
+def benchmark(nombre):
+    """Registra una función que prepara los datos y devuelve la función a medir."""
+    def registrar(preparar):
+        BENCHMARKS[nombre] = preparar
+        return preparar
+    return registrar
+
+
+def verificacion(nombre):
+    """Registra una función que devuelve (pasa, detalle); corre con --verificar."""
+    def registrar(funcion):
+        VERIFICACIONES[nombre] = funcion
+        return funcion
+    return registrar
+
+
+# ========================================
+# DATOS SINTÉTICOS
+# ========================================
+
+def _rng():
+    import numpy as np
+
+    return np.random.default_rng(SEMILLA)
+
+
+def _cilindros(n):
+    import numpy as np
+    import pandas as pd
+
+    rng = _rng()
+    diametro = rng.choice([100.0, 150.0], n)
+    return pd.DataFrame({
+        "Muestra": [f"M-{i}" for i in range(n)],
+        "Fecha": "18/10/2026",
+        "Edad(d)": rng.choice(["1", "3", "7", "28", "90"], n),
+        "F'c(MPa)": rng.choice([21.0, 28.0, 35.0], n),
+        "Diámetro(mm)": diametro,
+        "Altura(mm)": diametro * rng.uniform(1.0, 2.0, n).round(2),
+        "Peso(kg)": rng.uniform(3.4, 12.5, n),
+        "Densidad(kg/m3)": np.nan,
+        "Carga Máxima(kN)": rng.uniform(80, 600, n),
+        "Resistencia(MPa)": np.nan,
+        "Evolución(%)": np.nan,
+        "Tipo Falla": rng.choice([f"Tipo {i}" for i in range(1, 7)], n),
+    })
+
+
+def _resultados_cilindros(n):
+    from calculos.cal_concreto import compute_cylinder_results
+
+    return compute_cylinder_results(_cilindros(n))
+
+
+def _granulometria(n):
+    import numpy as np
+    import pandas as pd
+
+    tamices = np.geomspace(50, 0.075, n)
+    retenido = _rng().uniform(0, 1, n)
+    acumulado = np.cumsum(retenido / retenido.sum() * 100)
+    return pd.DataFrame({
+        "Tamiz (mm)": tamices.round(3),
+        "% Retenido": retenido / retenido.sum() * 100,
+        "% Retenido Acumulado": acumulado,
+        "% Pasante": 100 - acumulado,
+    })
+
+
+# ========================================
+# CÁLCULOS
+# ========================================
+
+@benchmark("calculos/resistencia_compresion_escalar_100k")
+def _():
+    from calculos.cal_concreto import resistencia_compresion
+
+    df = _cilindros(100_000)
+    carga, diametro = df["Carga Máxima(kN)"].tolist(), df["Diámetro(mm)"].tolist()
+    return lambda: [resistencia_compresion(c, d) for c, d in zip(carga, diametro)]
+
+
+@benchmark("calculos/resistencia_compresion_lote_100k")
+def _():
+    from calculos.cal_concreto import resistencia_compresion_lote
+
+    df = _cilindros(100_000)
+    return lambda: resistencia_compresion_lote(df["Carga Máxima(kN)"], df["Diámetro(mm)"])
+
+
+@benchmark("calculos/densidad_cilindro_escalar_100k")
+def _():
+    from calculos.cal_concreto import densidad_cilindro, volumen_cilindro
+
+    df = _cilindros(100_000)
+    filas = list(zip(df["Diámetro(mm)"], df["Altura(mm)"], df["Peso(kg)"]))
+    return lambda: [densidad_cilindro(volumen_cilindro(d, h), p) for d, h, p in filas]
+
+
+@benchmark("calculos/densidad_cilindro_lote_100k")
+def _():
+    from calculos.cal_concreto import densidad_cilindro_lote, volumen_cilindro_lote
+
+    df = _cilindros(100_000)
+    return lambda: densidad_cilindro_lote(volumen_cilindro_lote(df["Diámetro(mm)"], df["Altura(mm)"]), df["Peso(kg)"])
+
+
+@benchmark("calculos/compute_cylinder_results_100k")
+def _():
+    from calculos.cal_concreto import compute_cylinder_results
+
+    df = _cilindros(100_000)
+    return lambda: compute_cylinder_results(df)
+
+
+@benchmark("calculos/clasificar_granulometria_500_muestras")
+def _():
+    import numpy as np
+
+    from calculos.granulometria import clasificador_catalogo
+
+    tamices = np.array([50, 37.5, 25, 19, 12.5, 9.5, 4.75, 2.36, 1.18, 0.6, 0.3, 0.15, 0.075])
+    retenido = _rng().uniform(0, 10, (500, len(tamices)))
+    clasificador = clasificador_catalogo()
+    return lambda: clasificador.clasificar(tamices, retenido, retenido.sum(axis=1))
+
+
+@verificacion("calculos/clasificacion_solo_en_tamices_de_la_franja")
+def _():
+    import numpy as np
+
+    from calculos.granulometria import clasificador_catalogo
+
+    # Cumple todos los tamices de #57 (NTC 174) pero se ensaya también en 50 y 12.5 mm, donde #57
+    # no fija límites: interpolando la franja, 40 % en 12.5 mm quedaría fuera de un ~30 % inventado
+    tamices = np.array([50, 37.5, 25, 19, 12.5, 9.5, 4.75, 2.36])
+    pasante = np.array([100, 100, 97, 55, 40, 5, 2, 0.0])
+    retenido = -np.diff(np.r_[100.0, pasante]) * 10
+    resultado = clasificador_catalogo().clasificar(tamices, retenido, 1000.0)
+    i = resultado.bandas.index("#57-Grava TMN 25 mm")
+    detalle = (f"#57: desviación {resultado.desviacion_max[0, i]:.1f} puntos; "
+               f"cumple {', '.join(resultado.franjas_que_cumple()) or 'ninguna'}")
+    return bool(resultado.cumple[0, i]), detalle
+
+
+def _cilindros_28d(n):
+    df = _resultados_cilindros(n)
+    df["Edad(d)"] = "28"
+    # Dos cilindros por muestra, como se ensayan en obra
+    df["Muestra"] = [f"M-{i // 2}" for i in range(n)]
+    return df
+
+
+@benchmark("calculos/conformidad_agregar_sobre_10k")
+def _():
+    from itertools import count
+
+    from calculos.conformidad import ControlConformidad
+
+    df = _cilindros_28d(10_000)
+    control = ControlConformidad.desde_registros(df.to_dict("records"))
+    siguiente = count()
+    # Un cilindro nuevo sobre un historial de 10k: no debe depender del tamaño del historial
+    return lambda: control.agregar({"Muestra": f"N-{next(siguiente)}", "Edad(d)": "28",
+                                    "F'c(MPa)": 28.0, "Resistencia(MPa)": 30.0})
+
+
+@benchmark("calculos/ajuste_resistencia_5000_mezclas")
+def _():
+    import numpy as np
+
+    from calculos.madurez import ajustar_resistencia
+
+    rng = _rng()
+    mezclas, edades = 5_000, np.array([3, 7, 28, 90])
+    familia = np.repeat(np.arange(mezclas), 2 * edades.size)
+    edad = np.tile(np.repeat(edades, 2), mezclas)
+    # Dos cilindros por edad; a y b distintos por mezcla, más ruido de rotura
+    resistencia = (
+        rng.uniform(2, 8, mezclas)[familia] + rng.uniform(4, 7, mezclas)[familia] * np.log(edad)
+        + rng.normal(0, 1, familia.size)
+    )
+    return lambda: ajustar_resistencia(familia, edad, resistencia)
+
+
+@benchmark("importacion/csv_prensa_50k")
+def _():
+    import tempfile
+
+    from utils.importacion import importar_ensayos
+    from utils.registro_ensayos import RegistroEnsayos
+
+    df = _cilindros(50_000).drop(columns=["Densidad(kg/m3)", "Resistencia(MPa)", "Evolución(%)"])
+    # Formato de prensa configurada en español: ';' y coma decimal
+    ruta = Path(tempfile.mkdtemp()) / "prensa.csv"
+    df.to_csv(ruta, sep=";", decimal=",", index=False)
+
+    def importar():
+        registro = RegistroEnsayos()
+        return importar_ensayos(ruta, al_importar=registro.extender)
+    return importar
+
+
+def _archivo_cilindros(n):
+    import tempfile
+
+    import pandas as pd
+
+    from utils.archivo_parquet import escribir_archivo
+
+    df = _resultados_cilindros(n)
+    # n ensayos repartidos en dos años: 24 particiones mensuales
+    df["Fecha"] = pd.date_range("2025-01-01", "2026-12-31", periods=n).strftime("%d/%m/%Y")
+    df["Obra"] = _rng().choice(["Obra A", "Obra B", "Obra C"], n)
+    raiz = tempfile.mkdtemp()
+    for inicio in range(0, n, 50_000):
+        escribir_archivo(df.iloc[inicio:inicio + 50_000], raiz, "cilindros")
+    return df, raiz
+
+
+@benchmark("archivo/parquet_un_mes_dos_columnas_de_200k")
+def _():
+    from utils.archivo_parquet import leer_archivo
+
+    _, raiz = _archivo_cilindros(200_000)
+    # Lo que pide un tablero: resistencia a 28 días de un mes, sin abrir los otros 23
+    return lambda: leer_archivo(raiz, "cilindros", ["fecha", "resistencia_mpa"],
+                                desde="2026-03-01", hasta="2026-03-31", edad_d=28)
+
+
+@verificacion("archivo/parquet_filtrado_igual_a_pandas")
+def _():
+    import numpy as np
+    import pandas as pd
+
+    from utils.archivo_parquet import leer_archivo
+
+    df, raiz = _archivo_cilindros(20_000)
+    leido = leer_archivo(raiz, "cilindros", ["muestra", "resistencia_mpa", "tipo_falla"],
+                         desde="2026-03-01", hasta="2026-03-31", edad_d=28)
+    fechas = pd.to_datetime(df["Fecha"], format="%d/%m/%Y")
+    esperado = df[(fechas >= "2026-03-01") & (fechas <= "2026-03-31") & (df["Edad(d)"] == "28")]
+    leido = leido.sort_values("Muestra").reset_index(drop=True)
+    esperado = esperado.sort_values("Muestra").reset_index(drop=True)
+    iguales = (
+        len(leido) == len(esperado) > 0
+        and leido["Muestra"].tolist() == esperado["Muestra"].tolist()
+        and np.allclose(leido["Resistencia(MPa)"], esperado["Resistencia(MPa)"], rtol=1e-6, equal_nan=True)
+        and leido["Tipo Falla"].astype(str).tolist() == esperado["Tipo Falla"].tolist()
+        and isinstance(leido["Tipo Falla"].dtype, pd.CategoricalDtype)
+    )
+    return iguales, f"{len(leido)} filas de marzo a 28 días ({len(esperado)} esperadas)"
+
+
+@verificacion("calculos/conformidad_incremental_igual_a_pandas")
+def _():
+    import numpy as np
+
+    from calculos.conformidad import VENTANA, ControlConformidad
+
+    df = _cilindros_28d(5_000)
+    control = ControlConformidad.desde_registros(df.to_dict("records"))
+    errores = []
+    for fc, grupo in df.groupby("F'c(MPa)", sort=True):
+        # Resultado = promedio de cilindros consecutivos de la misma muestra
+        bloque = (grupo["Muestra"] != grupo["Muestra"].shift()).cumsum()
+        resultados = grupo.groupby(bloque)["Resistencia(MPa)"].mean()
+        esperado = {
+            "resultado": resultados.to_numpy(),
+            "media_movil": resultados.rolling(VENTANA).mean().to_numpy(),
+        }
+        clase = control.clases[fc]
+        obtenido = clase.arreglos()
+        for serie, valores in esperado.items():
+            if not np.allclose(obtenido[serie], valores, equal_nan=True):
+                errores.append(f"{serie} f'c={fc:g}")
+        if not np.isclose(clase.desviacion, resultados.std()):
+            errores.append(f"desviación f'c={fc:g}")
+    return not errores, ", ".join(errores) or f"{len(control.clases)} clases coinciden con pandas.rolling"
+
+
+# ========================================
+# BÚSQUEDAS
+# ========================================
+
+@benchmark("busquedas/factor_ld_for_100k")
+def _():
+    from utils.factores_ld import factor_ld_for
+
+    ratios = _rng().uniform(1.0, 2.0, 100_000).tolist()
+    return lambda: [factor_ld_for(r) for r in ratios]
+
+
+@benchmark("busquedas/factor_ld_array_100k")
+def _():
+    from utils.factores_ld import factor_ld_array
+
+    ratios = _rng().uniform(1.0, 2.0, 100_000)
+    return lambda: factor_ld_array(ratios)
+
+
+@benchmark("busquedas/gram_limites_carga_en_frio")
+def _():
+    from utils import limites_granulometria
+
+    def cargar():
+        limites_granulometria._cache.clear()
+        return limites_granulometria.cargar_limites()["#56-Grava TMN 25 mm"]
+    return cargar
+
+
+@benchmark("busquedas/gram_limites_carga_en_cache")
+def _():
+    from utils.limites_granulometria import cargar_limites
+
+    cargar_limites()
+    return lambda: cargar_limites()["#56-Grava TMN 25 mm"]
+
+
+@benchmark("busquedas/datos_referencia_en_cache")
+def _():
+    from utils.datos_referencia import datos_referencia
+
+    datos_referencia()
+    return lambda: datos_referencia().limites["#56-Grava TMN 25 mm"]
+
+
+@verificacion("busquedas/datos_referencia_compartidos_30_sesiones")
+def _():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from utils.datos_referencia import contadores_cache, datos_referencia
+
+    # 30 hilos simulan a los técnicos conectados al mismo servidor
+    with ThreadPoolExecutor(max_workers=30) as pool:
+        datos = list(pool.map(lambda _: datos_referencia(), range(300)))
+    distintos = len({id(d) for d in datos})
+    contadores = contadores_cache()
+    solo_lectura = not datos[0].factores_ld.flags.writeable and not datos[0].limites["Arena"].tamiz_mm.flags.writeable
+    pasa = distintos == 1 and contadores["fallos"] == 1 and solo_lectura
+    return pasa, f"{distintos} copia(s), {contadores['fallos']} fallo(s), {contadores['aciertos']} aciertos"
+
+
+# ========================================
+# GRÁFICOS
+# ========================================
+
+@benchmark("graficos/curva_granulometrica_png")
+def _():
+    from io import BytesIO
+
+    from utils.report.lote import _figura_granulometria
+
+    df = _granulometria(8)
+
+    def renderizar():
+        fig = _figura_granulometria("Arena", df)
+        fig.savefig(BytesIO(), format="png")
+    return renderizar
+
+
+@benchmark("graficos/curva_granulometrica_rerun")
+def _():
+    import numpy as np
+
+    from utils.grafico_granulometria import GraficoGranulometria
+    from utils.limites_granulometria import cargar_limites
+
+    limites = cargar_limites()["Arena"]
+    grafico = GraficoGranulometria(limites)
+    grafico.png(np.full(len(limites.tamiz_mm), 100.0))
+    datos = iter(np.linspace(100.0, 0.0, len(limites.tamiz_mm)) * f for f in np.linspace(1.0, 0.5, 10**6))
+
+    # Cada llamada simula un rerun con un valor retenido distinto
+    return lambda: grafico.png(next(datos))
+
+
+# Crecimiento máximo del RSS tolerado tras el calentamiento; una fuga de una figura por render
+# (como plt.subplots sin plt.close) suma cientos de MB en 1000 renders
+MAX_CRECIMIENTO_RSS_MB = 15.0
+
+
+@verificacion("graficos/rss_estable_1000_renders")
+def _():
+    from concurrent.futures import ThreadPoolExecutor
+
+    import numpy as np
+
+    from utils.graficos import barras_cubos, curva_granulometrica, figura_png
+    from utils.limites_granulometria import cargar_limites
+
+    limites = cargar_limites()["Arena"]
+    df = _granulometria(8)
+
+    def renderizar(i):
+        # Cuatro hilos simulan sesiones concurrentes del servidor
+        if i % 2:
+            fig = curva_granulometrica(limites, df["Tamiz (mm)"], df["% Pasante"] * (1 - i / 2000))
+        else:
+            fig = barras_cubos(["#1", "#2", "#3"], np.array([20.0, 21.0, 19.5]) + i % 7, [True, True, i % 3 > 0])
+        return len(figura_png(fig, dpi=30))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(renderizar, range(100)))
+        rss_inicial = _rss_pico_mb()
+        list(pool.map(renderizar, range(100, 1100)))
+    crecimiento = _rss_pico_mb() - rss_inicial
+    return crecimiento <= MAX_CRECIMIENTO_RSS_MB, f"RSS +{crecimiento:.1f} MB en 1000 renders"
+
+
+# ========================================
+# INFORMES PDF
+# ========================================
+
+def _registrar_pdfs():
+    for n, etiqueta in ((10, "10"), (1_000, "1k"), (10_000, "10k")):
+        def cilindros(n=n):
+            from utils.report.compresion_cilindros_pdf import compresion_cilindros_pdf
+
+            df = _resultados_cilindros(n)
+            return lambda: compresion_cilindros_pdf(df)
+
+        def cilindros_lote(n=n):
+            from utils.report.compresion_cilindros_pdf import compresion_cilindros_pdf_lote
+
+            df = _resultados_cilindros(n)
+            return lambda: compresion_cilindros_pdf_lote(df)
+
+        def granulometria(n=n):
+            from utils.report.granulometria_pdf import granulometria_pdf
+            from utils.report.lote import _figura_granulometria
+
+            df = _granulometria(n)
+            fig = _figura_granulometria("Arena", df)
+            return lambda: granulometria_pdf("Muestra", "Arena", df, fig)
+
+        benchmark(f"pdf/compresion_cilindros_{etiqueta}")(cilindros)
+        benchmark(f"pdf/compresion_cilindros_lote_{etiqueta}")(cilindros_lote)
+        benchmark(f"pdf/granulometria_{etiqueta}")(granulometria)
+
+
+_registrar_pdfs()
+
+
+# ========================================
+# ESTADO DE SESIÓN
+# ========================================
+
+@verificacion("sesion/df_ensayos_tipado_memoria_10k")
+def _():
+    from calculos.cal_concreto import COLUMNAS_ENSAYOS
+    from utils.registro_ensayos import RegistroEnsayos, tipar_ensayos
+
+    df = _resultados_cilindros(10_000)[COLUMNAS_ENSAYOS]
+    # Como quedaba antes: pd.concat sobre pd.DataFrame(columns=[...]) deja todo en object
+    objetos = df.astype(object).memory_usage(deep=True).sum()
+    tipado = tipar_ensayos(df).memory_usage(deep=True).sum()
+    registro = RegistroEnsayos()
+    registro.agregar(df.iloc[0].to_dict())
+    registro.extender(df.iloc[1:])
+    iguales = registro.dataframe().dtypes.equals(tipar_ensayos(df).dtypes)
+    ahorro = 1 - tipado / objetos
+    detalle = (f"object {objetos / 1e6:.2f} MB -> tipado {tipado / 1e6:.2f} MB por 10k filas "
+               f"({(objetos - tipado) / 1e6:.2f} MB menos, {ahorro:.0%})")
+    return ahorro >= 0.5 and iguales, detalle
+
+
+@verificacion("sesion/presupuesto_memoria_descarta_y_descarga")
+def _():
+    from calculos.cal_concreto import COLUMNAS_ENSAYOS
+    from calculos.madurez import COLUMNAS_AJUSTE, ajustar_ensayos
+    from utils.memoria_sesion import MB, MIN_FILAS_EN_MEMORIA, CacheLRU, controlar_memoria, tamano_aproximado
+    from utils.registro_ensayos import RegistroEnsayos, tipar_ensayos
+    import pandas as pd
+
+    df = _resultados_cilindros(20_000)[COLUMNAS_ENSAYOS]
+    # 500 muestras con roturas repartidas en todo el registro: quedan a ambos lados de la descarga
+    df["Muestra"] = [f"M-{i % 500}" for i in range(len(df))]
+    registro = RegistroEnsayos()
+    registro.extender(df)
+    # El DataFrame de la tabla comparte los arreglos del registro: no debe contarse dos veces
+    sin_tabla = tamano_aproximado(registro)
+    registro.dataframe()
+    sin_doble_conteo = tamano_aproximado(registro) == sin_tabla
+    # Diez PDF de 1 MB; el primero se vuelve a abrir, así que el más antiguo en uso es el segundo
+    pdfs = CacheLRU((f"pdf{i}", bytes(MB)) for i in range(10))
+    pdfs["pdf0"]
+    estado = {"registro_ensayos": registro, "pdfs_generados": pdfs}
+
+    # ~13 MB: con 8 MB basta descartar los PDF de uso más antiguo, sin tocar los ensayos
+    controlar_memoria(estado, presupuesto_mb=8, sesion="bench")
+    orden_lru = list(pdfs) == ["pdf6", "pdf7", "pdf8", "pdf9", "pdf0"] and registro.filas_en_disco == 0
+
+    # Con 2 MB queda solo el PDF más reciente y los ensayos antiguos pasan a disco
+    inicio = time.perf_counter()
+    medicion = controlar_memoria(estado, presupuesto_mb=2, sesion="bench")
+    ms = (time.perf_counter() - inicio) * 1000
+    recuperado = pd.concat(registro.bloques(), ignore_index=True)
+    descargado = len(registro) == MIN_FILAS_EN_MEMORIA and registro.filas_en_disco == len(df) - MIN_FILAS_EN_MEMORIA
+    completo = recuperado.equals(tipar_ensayos(df).reset_index(drop=True))
+
+    # El ajuste resistencia-edad con los bloques es el mismo que con todos los ensayos en memoria
+    ajuste = ajustar_ensayos(pd.concat(registro.bloques(COLUMNAS_AJUSTE), ignore_index=True))
+    ajuste_completo = ajuste.dataframe().equals(ajustar_ensayos(tipar_ensayos(df)).dataframe())
+
+    # Aún sobre el presupuesto, unos pocos ensayos nuevos no crean otro archivo (histéresis)
+    for fila in df.iloc[:5].to_dict("records"):
+        registro.agregar(fila)
+        controlar_memoria(estado, presupuesto_mb=0.5, sesion="bench")
+    sin_archivos_chicos = registro.filas_en_disco == len(df) - MIN_FILAS_EN_MEMORIA
+
+    detalle = (f"{medicion.total / MB:.2f} MB tras el control ({ms:.0f} ms); {len(pdfs)} PDF en caché, "
+               f"{registro.filas_en_disco} ensayos en disco, {len(recuperado)} recuperados; "
+               f"registro {sin_tabla / MB:.2f} MB con o sin tabla: {sin_doble_conteo}; "
+               f"ajuste igual: {ajuste_completo}; sin descargas de pocas filas: {sin_archivos_chicos}")
+    pasa = (orden_lru and descargado and completo and medicion.total <= 2 * MB
+            and sin_doble_conteo and ajuste_completo and sin_archivos_chicos)
+    return pasa, detalle
+
+
+# ========================================
+# ARRANQUE DE PÁGINAS
+# ========================================
+
+# Librerías que una página no debe importar al abrirse: ReportLab solo al pedir un PDF y
+# matplotlib solo en las páginas que siempre muestran un gráfico
+PAGINAS_ARRANQUE = {
+    "Inicio.py": ("pandas", "matplotlib", "reportlab"),
+    "pages/compresión_cilindros.py": ("matplotlib", "reportlab"),
+    "pages/granulometria.py": ("reportlab",),
+    "ensayos/cubos_cemento.py": ("reportlab",),
+    "pages/memoria_sesiones.py": ("matplotlib", "reportlab"),
+}
+
+
+def _importaciones_pagina(ruta):
+    """Código con los import de nivel superior de una página (sin ejecutar la página)."""
+    import ast
+
+    arbol = ast.parse((RAIZ / ruta).read_text(encoding="utf-8"))
+    return "\n".join(ast.unparse(n) for n in arbol.body if isinstance(n, (ast.Import, ast.ImportFrom)))
+
+
+def _importar_pagina(ruta, *opciones):
+    # Streamlit se importa antes de la marca: lo que sigue es el costo propio de la página
+    codigo = (
+        "import sys, streamlit\n"
+        "print('--pagina--', file=sys.stderr, flush=True)\n"
+        f"{_importaciones_pagina(ruta)}\n"
+        "print(' '.join(sorted(m for m in sys.modules if '.' not in m)))\n"
+    )
+    return subprocess.run([sys.executable, *opciones, "-c", codigo], capture_output=True, text=True, cwd=RAIZ)
+
+
+def _registrar_arranque():
+    for ruta, prohibidas in PAGINAS_ARRANQUE.items():
+        etiqueta = Path(ruta).stem
+
+        def arranque(ruta=ruta):
+            # Intérprete nuevo en cada ejecución: mide el arranque en frío completo
+            return lambda: _importar_pagina(ruta).check_returncode()
+
+        def importaciones(ruta=ruta, prohibidas=prohibidas):
+            salida = _importar_pagina(ruta, "-X", "importtime")
+            if salida.returncode != 0:
+                return False, salida.stderr.strip().splitlines()[-1]
+            # -X importtime: "import time: propio | acumulado | módulo"; los de primer nivel no tienen sangría
+            lineas = salida.stderr.split("--pagina--", 1)[-1].splitlines()
+            total_us = sum(
+                int(partes[1]) for partes in (l.split("|") for l in lineas if l.startswith("import time:"))
+                if len(partes) == 3 and not partes[2].startswith("  ")
+            )
+            cargadas = [m for m in prohibidas if m in salida.stdout.split()]
+            detalle = f"importaciones propias {total_us / 1000:.0f} ms"
+            return not cargadas, detalle + (f"; carga {', '.join(cargadas)}" if cargadas else "")
+
+        benchmark(f"arranque/{etiqueta}")(arranque)
+        verificacion(f"arranque/{etiqueta}_sin_librerias_pesadas")(importaciones)
+
+
+_registrar_arranque()
+
+
+# ========================================
+# EJECUCIÓN
+# ========================================
+
+def _rss_pico_mb():
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    if resource is None:
+        return 0.0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def medir(nombre):
+    """Mide un benchmark dentro del proceso actual."""
+    funcion = BENCHMARKS[nombre]()
+    rss_antes = _rss_pico_mb()
+    inicio = time.perf_counter()
+    funcion()
+    tiempos = [time.perf_counter() - inicio]
+    pico_mb = _rss_pico_mb() - rss_antes
+    while sum(tiempos) < TIEMPO_OBJETIVO_S and len(tiempos) < MAX_REPETICIONES:
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    pico_python_mb = None
+    if min(tiempos) <= MAX_TIEMPO_TRACEMALLOC_S:
+        tracemalloc.start()
+        funcion()
+        pico_python_mb = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+    return {
+        "tiempo_s": min(tiempos),
+        "mediana_s": statistics.median(tiempos),
+        "repeticiones": len(tiempos),
+        "pico_memoria_mb": round(pico_mb, 2),
+        "pico_python_mb": pico_python_mb,
+    }
+
+
+def _medir_en_subproceso(nombre):
+    salida = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--interno", nombre],
+        capture_output=True,
+        text=True,
+        cwd=RAIZ,
+    )
+    if salida.returncode != 0:
+        return {"error": salida.stderr.strip().splitlines()[-1] if salida.stderr.strip() else "falló"}
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def _verificar(filtro):
+    fallas = 0
+    for nombre in VERIFICACIONES:
+        if filtro not in nombre:
+            continue
+        salida = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--verificacion-interna", nombre],
+            capture_output=True,
+            text=True,
+            cwd=RAIZ,
+        )
+        if salida.returncode != 0:
+            pasa, detalle = False, salida.stderr.strip().splitlines()[-1] if salida.stderr.strip() else "falló"
+        else:
+            resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+            pasa, detalle = resultado["pasa"], resultado["detalle"]
+        fallas += not pasa
+        print(f"{'PASA ' if pasa else 'FALLA'} {nombre:52} {detalle}")
+    return 1 if fallas else 0
+
+
+def _version():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, cwd=RAIZ
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def _comparar(resultados, base, tolerancia):
+    regresiones = []
+    sin_base = []
+    print(f"\n{'benchmark':52} {'base (s)':>10} {'actual (s)':>10} {'cambio':>8}")
+    for nombre, actual in resultados.items():
+        anterior = base.get("resultados", {}).get(nombre)
+        if "tiempo_s" not in actual:
+            continue
+        if not anterior or "tiempo_s" not in anterior:
+            # Benchmark nuevo: hay que regenerar la línea base con --guardar
+            print(f"{nombre:52} {'-':>10} {actual['tiempo_s']:10.4f} {'sin base':>8}")
+            sin_base.append(nombre)
+            continue
+        cambio = actual["tiempo_s"] / anterior["tiempo_s"] - 1
+        marca = "  <-- regresión" if cambio > tolerancia else ""
+        print(f"{nombre:52} {anterior['tiempo_s']:10.4f} {actual['tiempo_s']:10.4f} {cambio:+8.0%}{marca}")
+        if marca:
+            regresiones.append(nombre)
+    if sin_base:
+        print(f"\n{len(sin_base)} benchmarks sin línea base (no se comparan); regenerarla con --guardar")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="filtro", default="", help="Solo benchmarks cuyo nombre contiene este texto")
+    parser.add_argument("--guardar", type=Path, help="Guarda los resultados como línea base JSON")
+    parser.add_argument("--comparar", type=Path, help="Compara con una línea base JSON")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Aumento de tiempo tolerado (0.25 = 25%%)")
+    parser.add_argument("--verificar", action="store_true", help="Corre las verificaciones pasa/falla")
+    parser.add_argument("--interno", help=argparse.SUPPRESS)
+    parser.add_argument("--verificacion-interna", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.interno:
+        print(json.dumps(medir(args.interno)))
+        return 0
+    if args.verificacion_interna:
+        pasa, detalle = VERIFICACIONES[args.verificacion_interna]()
+        print(json.dumps({"pasa": pasa, "detalle": detalle}))
+        return 0
+    if args.verificar:
+        return _verificar(args.filtro)
+
+    resultados = {}
+    print(f"{'benchmark':52} {'tiempo (s)':>10} {'mediana':>10} {'RSS MB':>8} {'py MB':>8}")
+    for nombre in BENCHMARKS:
+        if args.filtro not in nombre:
+            continue
+        resultado = _medir_en_subproceso(nombre)
+        resultados[nombre] = resultado
+        if "error" in resultado:
+            print(f"{nombre:52} ERROR {resultado['error']}")
+        else:
+            pico_python = resultado["pico_python_mb"]
+            print(
+                f"{nombre:52} {resultado['tiempo_s']:10.4f} {resultado['mediana_s']:10.4f} "
+                f"{resultado['pico_memoria_mb']:8.1f} {'-' if pico_python is None else f'{pico_python:8.1f}':>8}"
+            )
+
+    if args.guardar:
+        args.guardar.parent.mkdir(parents=True, exist_ok=True)
+        args.guardar.write_text(json.dumps({
+            "version": _version(),
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "resultados": resultados,
+        }, indent=2, ensure_ascii=False))
+
+    if args.comparar:
+        regresiones = _comparar(resultados, json.loads(args.comparar.read_text()), args.tolerancia)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones por encima de {args.tolerancia:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
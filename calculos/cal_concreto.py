@@ -3,6 +3,11 @@
 # ========================================
 import math
 
+import numpy as np
+
+from utils.factores_ld import factor_ld_array
+
+
 def area_cilindro(diametro_mm):
 
     """
@@ -65,4 +70,173 @@ def evolucion_resistencia(fc, resistencia):
     if fc > 0:
         return round((resistencia / fc) * 100, 2)
     else:
-        return  0.0
\ No newline at end of file
+        return  0.0
+
+# ========================================
+# FUNCIONES DE CÁLCULO POR LOTES
+# ========================================
+# Columnas de la tabla de resultados de cilindros (st.session_state.df_ensayos)
+COLUMNAS_ENSAYOS = [
+    "Muestra",
+    "Fecha",
+    "Edad(d)",
+    "F'c(MPa)",
+    "Diámetro(mm)",
+    "Altura(mm)",
+    "Densidad(kg/m3)",
+    "Carga Máxima(kN)",
+    "Resistencia(MPa)",
+    "Evolución(%)",
+    "Tipo Falla",
+]
+
+# Columnas de entrada para recalcular densidad y evolución ("Peso(kg)" no se muestra en la tabla)
+COLUMNA_PESO = "Peso(kg)"
+COLUMNA_FC = "F'c(MPa)"
+
+
+def _como_arreglo(valores):
+    """Convierte escalares, listas, arreglos o columnas de DataFrame en un arreglo float64."""
+    return np.asarray(valores, dtype=np.float64)
+
+
+def area_cilindro_lote(diametro_mm):
+    """
+    Calcula el área de la sección transversal para un arreglo de cilindros.
+
+    Parámetros:
+    - diametro_mm: Diámetros en mm (arreglo o columna)
+    - área en mm², NaN donde el diámetro no es positivo
+    """
+    diametro_mm = _como_arreglo(diametro_mm)
+    area_mm2 = np.pi * (diametro_mm / 2) ** 2
+    return np.where(diametro_mm > 0, area_mm2, np.nan)
+
+
+def volumen_cilindro_lote(diametro_mm, altura_mm):
+    """
+    Calcula el volumen para un arreglo de cilindros.
+
+    Parámetros:
+    - diametro_mm: Diámetros en mm
+    - altura_mm: Alturas en mm
+    - volumen en m³, NaN donde diámetro o altura no son positivos
+    """
+    diametro_mm = _como_arreglo(diametro_mm)
+    altura_mm = _como_arreglo(altura_mm)
+    volumen_m3 = np.pi * (diametro_mm / 2) ** 2 * altura_mm / 1e9
+    return np.where((diametro_mm > 0) & (altura_mm > 0), volumen_m3, np.nan)
+
+
+def densidad_cilindro_lote(volumen_m3, peso_kg):
+    """
+    Calcula la densidad para un arreglo de cilindros con el mismo redondeo
+    de densidad_cilindro (al 10 kg/m³ más cercano).
+
+    Parámetros:
+    - volumen_m3: Volúmenes en m³
+    - peso_kg: Pesos en kg
+    - densidad en kg/m³, NaN donde volumen o peso no son positivos
+    """
+    volumen_m3 = _como_arreglo(volumen_m3)
+    peso_kg = _como_arreglo(peso_kg)
+    valido = (volumen_m3 > 0) & (peso_kg > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        densidad = np.round(peso_kg / volumen_m3, 2)
+    return np.where(valido, np.round(densidad / 10) * 10, np.nan)
+
+
+def resistencia_compresion_lote(carga_kn, diametro_mm):
+    """
+    Calcula la resistencia a la compresión para un arreglo de cilindros.
+
+    Parámetros:
+    - carga_kn: Cargas aplicadas en kN
+    - diametro_mm: Diámetros en mm
+    - resistencia en MPa redondeada a 2 decimales, NaN donde carga o diámetro no son positivos
+    """
+    carga_kn = _como_arreglo(carga_kn)
+    area_mm2 = area_cilindro_lote(diametro_mm)
+    resistencia_mpa = np.round(carga_kn * 1000 / area_mm2, 2)
+    return np.where(carga_kn > 0, resistencia_mpa, np.nan)
+
+
+def evolucion_resistencia_lote(fc, resistencia):
+    """
+    Evalua % de evolucion para un arreglo de ensayos. Igual que evolucion_resistencia,
+    devuelve 0.0 donde fc no es positivo.
+    """
+    fc = _como_arreglo(fc)
+    resistencia = _como_arreglo(resistencia)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        evolucion = np.round(resistencia / fc * 100, 2)
+    return np.where(fc > 0, evolucion, 0.0)
+
+
+def factor_ld_lote(altura_mm, diametro_mm):
+    """
+    Obtiene el factor de corrección L/D (NTC 673) para un arreglo de cilindros.
+
+    Parámetros:
+    - altura_mm: Alturas en mm
+    - diametro_mm: Diámetros en mm
+    - factor de corrección; 1.0 para L/D >= 2.00 y NaN para L/D < 1.00
+    """
+    altura_mm = _como_arreglo(altura_mm)
+    diametro_mm = _como_arreglo(diametro_mm)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel_ld = altura_mm / diametro_mm
+    return factor_ld_array(rel_ld)
+
+
+def compute_cylinder_results(df):
+    """
+    Calcula en una sola pasada las columnas derivadas de la tabla de ensayos
+    ("Densidad(kg/m3)", "Resistencia(MPa)" y "Evolución(%)").
+
+    Parámetros:
+    - df: DataFrame con las columnas de COLUMNAS_ENSAYOS. Si incluye "Peso(kg)" se
+      recalcula la densidad y si incluye "F'c(MPa)" se recalcula la evolución.
+    - devuelve una copia del DataFrame; las filas inválidas quedan en NaN en vez de None
+    """
+    resultado = df.copy()
+    diametro = _como_arreglo(resultado["Diámetro(mm)"])
+    altura = _como_arreglo(resultado["Altura(mm)"])
+
+    resistencia = resistencia_compresion_lote(resultado["Carga Máxima(kN)"], diametro)
+    factor = factor_ld_lote(altura, diametro)
+    resultado["Resistencia(MPa)"] = np.round(resistencia * factor, 2)
+
+    if COLUMNA_PESO in resultado.columns:
+        volumen = volumen_cilindro_lote(diametro, altura)
+        resultado["Densidad(kg/m3)"] = densidad_cilindro_lote(volumen, resultado[COLUMNA_PESO])
+
+    if COLUMNA_FC in resultado.columns:
+        evolucion = evolucion_resistencia_lote(resultado[COLUMNA_FC], resultado["Resistencia(MPa)"])
+        resultado["Evolución(%)"] = np.where(np.isnan(resultado["Resistencia(MPa)"]), np.nan, evolucion)
+
+    return resultado
+
+
+# ========================================
+# CUBOS DE MORTERO (NTC 220)
+# ========================================
+
+AREA_CUBO_MM2 = 50 * 50
+
+
+def resistencia_cubo(fuerza_kn, area_mm2=AREA_CUBO_MM2):
+    """
+    Calcula la resistencia a la compresión de un cubo de mortero: R = F / A.
+
+    Parámetros:
+    - fuerza_kn: Fuerza máxima en kN
+    - area_mm2: Área de la cara cargada en mm² (cubos de 50 mm por defecto)
+    """
+    return (fuerza_kn * 1000) / area_mm2 if fuerza_kn > 0 else 0.0
+
+
+def resistencia_cubo_lote(fuerza_kn, area_mm2=AREA_CUBO_MM2):
+    """Versión por lotes de resistencia_cubo; 0.0 donde la fuerza no es positiva."""
+    fuerza_kn = _como_arreglo(fuerza_kn)
+    return np.where(fuerza_kn > 0, fuerza_kn * 1000 / area_mm2, 0.0)
@@ -0,0 +1,195 @@
+# ========================================
+# CONFORMIDAD DE LA RESISTENCIA A COMPRESIÓN (NSR-10 C.5.6.3 / ACI 318)
+# ========================================
+import math
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from calculos.estadisticas import AcumuladorWelford
+
+# Los criterios de aceptación se aplican a la resistencia a la edad de diseño
+EDAD_DISENO = 28
+
+# Resultados consecutivos en el promedio móvil
+VENTANA = 3
+
+# Tolerancia de un resultado individual: f'c - 3.5 MPa hasta 35 MPa, 0.90 f'c por encima
+TOLERANCIA_INDIVIDUAL_MPA = 3.5
+FC_LIMITE_TOLERANCIA_MPA = 35.0
+
+
+def limite_individual(fc: float) -> float:
+    """Resistencia mínima de un resultado individual para la clase f'c."""
+    if fc <= FC_LIMITE_TOLERANCIA_MPA:
+        return fc - TOLERANCIA_INDIVIDUAL_MPA
+    return 0.9 * fc
+
+
+def _edad(valor) -> Optional[int]:
+    # "28", "28 (+-20h)", 28 o el int8 de la tabla tipada; vacío, NaN o <NA> -> None
+    try:
+        return int(float(str(valor).split(" ")[0]))
+    except ValueError:
+        return None
+
+
+class EvaluacionResultado(NamedTuple):
+    indice: int                  # Posición del resultado en su clase
+    resultado_mpa: float         # Promedio de los cilindros de la muestra
+    media_movil_mpa: float       # Promedio de los últimos VENTANA resultados; NaN si aún no hay suficientes
+    bajo_individual: bool        # Resultado menor que limite_individual(fc)
+    bajo_media_movil: bool       # Promedio móvil menor que f'c
+
+
+class ClaseConformidad:
+    """
+    Historial de resultados de una clase f'c con sus ventanas móviles.
+
+    Un resultado es el promedio de los cilindros consecutivos de una misma muestra; si el
+    siguiente cilindro registrado es de la misma muestra se actualiza el último resultado en
+    lugar de abrir uno nuevo. Agregar un cilindro cuesta O(1): la ventana solo mira los últimos
+    VENTANA resultados y la desviación se lleva con un acumulador de Welford de los resultados
+    cerrados, al que se suma el resultado abierto al consultar.
+    """
+
+    def __init__(self, fc: float):
+        self.fc = float(fc)
+        self.limite_individual = limite_individual(self.fc)
+        self.muestras: List[str] = []
+        self.resultados: List[float] = []
+        self.medias_moviles: List[float] = []
+        self.bajo_individual: List[bool] = []
+        self.bajo_media_movil: List[bool] = []
+        self._cerrados = AcumuladorWelford()
+        self._suma_abierto = 0.0
+        self._n_abierto = 0
+        # Cambia con cada cilindro agregado (p.ej. para reutilizar el gráfico de control)
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.resultados)
+
+    def agregar(self, muestra: str, resistencia_mpa: float) -> EvaluacionResultado:
+        """
+        Agrega un cilindro y devuelve la evaluación del resultado al que pertenece.
+
+        Parámetros:
+        - muestra: Nombre de la muestra; cilindros consecutivos con el mismo nombre forman un resultado
+        - resistencia_mpa: Resistencia del cilindro
+        """
+        if self.muestras and self.muestras[-1] == muestra:
+            self._suma_abierto += resistencia_mpa
+            self._n_abierto += 1
+        else:
+            if self.resultados:
+                self._cerrados.agregar(self.resultados[-1])
+            self._suma_abierto, self._n_abierto = resistencia_mpa, 1
+            for lista, valor in ((self.muestras, muestra), (self.resultados, 0.0), (self.medias_moviles, math.nan),
+                                 (self.bajo_individual, False), (self.bajo_media_movil, False)):
+                lista.append(valor)
+
+        resultado = self._suma_abierto / self._n_abierto
+        self.resultados[-1] = resultado
+        if len(self.resultados) >= VENTANA:
+            self.medias_moviles[-1] = sum(self.resultados[-VENTANA:]) / VENTANA
+        self.bajo_individual[-1] = resultado < self.limite_individual
+        self.bajo_media_movil[-1] = self.medias_moviles[-1] < self.fc
+        self.version += 1
+        return self.evaluacion(-1)
+
+    def evaluacion(self, indice: int) -> EvaluacionResultado:
+        indice = indice % len(self.resultados)
+        return EvaluacionResultado(
+            indice,
+            self.resultados[indice],
+            self.medias_moviles[indice],
+            self.bajo_individual[indice],
+            self.bajo_media_movil[indice],
+        )
+
+    @property
+    def acumulador(self) -> AcumuladorWelford:
+        """Estadísticas de todos los resultados, incluido el que sigue abierto."""
+        if not self.resultados:
+            return AcumuladorWelford()
+        return self._cerrados.combinar(AcumuladorWelford.desde_arreglo([self.resultados[-1]]))
+
+    @property
+    def desviacion(self) -> float:
+        return self.acumulador.desviacion
+
+    @property
+    def cumple(self) -> bool:
+        """Ningún resultado bajo el límite individual ni promedio móvil bajo f'c."""
+        return not (any(self.bajo_individual) or any(self.bajo_media_movil))
+
+    def resumen(self) -> Dict[str, Any]:
+        acumulador = self.acumulador
+        return {
+            "F'c(MPa)": self.fc,
+            "Resultados": len(self.resultados),
+            "Media (MPa)": acumulador.media if acumulador.n else math.nan,
+            "Desv (MPa)": acumulador.desviacion,
+            "Última media móvil (MPa)": self.medias_moviles[-1] if self.medias_moviles else math.nan,
+            f"Bajo f'c - {TOLERANCIA_INDIVIDUAL_MPA:g}": int(sum(self.bajo_individual)),
+            "Media móvil bajo f'c": int(sum(self.bajo_media_movil)),
+            "Cumple": self.cumple,
+        }
+
+    def arreglos(self) -> Dict[str, np.ndarray]:
+        """Series para el gráfico de control."""
+        return {
+            "resultado": np.asarray(self.resultados, dtype=np.float64),
+            "media_movil": np.asarray(self.medias_moviles, dtype=np.float64),
+            "bajo_individual": np.asarray(self.bajo_individual, dtype=bool),
+        }
+
+
+class ControlConformidad:
+    """
+    Clases de conformidad por f'c de los cilindros a EDAD_DISENO días.
+
+    Se guarda en la sesión junto al registro de ensayos y se alimenta cilindro por cilindro, así
+    la página no recalcula las ventanas sobre todo el historial en cada rerun.
+    """
+
+    def __init__(self, edad_diseno: int = EDAD_DISENO):
+        self.edad_diseno = edad_diseno
+        self.clases: Dict[float, ClaseConformidad] = {}
+
+    @classmethod
+    def desde_registros(cls, registros: Iterable[Dict[str, Any]], edad_diseno: int = EDAD_DISENO) -> "ControlConformidad":
+        """
+        Arma el control a partir de ensayos ya registrados (p.ej. df_ensayos.to_dict("records")).
+
+        Parámetros:
+        - registros: Diccionarios con las columnas de df_ensayos, en orden de registro
+        """
+        control = cls(edad_diseno)
+        for ensayo in registros:
+            control.agregar(ensayo)
+        return control
+
+    def agregar(self, ensayo: Dict[str, Any]) -> Optional[EvaluacionResultado]:
+        """
+        Agrega un cilindro; devuelve None si no es de la edad de diseño o no tiene resistencia.
+
+        Parámetros:
+        - ensayo: Diccionario con Muestra, Edad(d), F'c(MPa) y Resistencia(MPa)
+        """
+        fc = ensayo.get("F'c(MPa)")
+        resistencia = ensayo.get("Resistencia(MPa)")
+        if _edad(ensayo.get("Edad(d)")) != self.edad_diseno or fc is None or resistencia is None:
+            return None
+        fc, resistencia = float(fc), float(resistencia)
+        if math.isnan(fc) or math.isnan(resistencia) or fc <= 0:
+            return None
+        clase = self.clases.get(fc)
+        if clase is None:
+            clase = self.clases[fc] = ClaseConformidad(fc)
+        return clase.agregar(str(ensayo.get("Muestra")), resistencia)
+
+    def resumen(self) -> List[Dict[str, Any]]:
+        """Una fila por clase f'c, de menor a mayor."""
+        return [self.clases[fc].resumen() for fc in sorted(self.clases)]
@@ -0,0 +1,166 @@
+# ========================================
+# ESTADÍSTICAS DE RESISTENCIA (CUBOS DE MORTERO)
+# ========================================
+import math
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Rango máximo entre cubos de una misma mezcla y edad, en % del promedio (NTC 220 / ASTM C109):
+# 8.7 % con tres cubos y 7.6 % con dos
+RANGO_MAX_PCT = {2: 7.6, 3: 8.7}
+
+EDADES_CUBOS = (3, 7, 28)
+
+
+class AcumuladorWelford:
+    """
+    Media, varianza, mínimo y máximo de una serie que se actualizan en O(1) por dato.
+
+    Usa el algoritmo de Welford (estable aunque la media sea grande frente a la dispersión) y se
+    puede combinar con otro acumulador (Chan et al.), así las estadísticas de un lote guardadas
+    en la base de datos se actualizan sin volver a leer el historial.
+    """
+
+    __slots__ = ("n", "media", "m2", "minimo", "maximo")
+
+    def __init__(self, n: int = 0, media: float = 0.0, m2: float = 0.0,
+                 minimo: float = math.inf, maximo: float = -math.inf):
+        self.n = n
+        self.media = media
+        self.m2 = m2
+        self.minimo = minimo
+        self.maximo = maximo
+
+    @classmethod
+    def desde_arreglo(cls, valores) -> "AcumuladorWelford":
+        """Acumulador de un conjunto de valores (se ignoran los NaN)."""
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        if not valores.size:
+            return cls()
+        media = float(valores.mean())
+        return cls(int(valores.size), media, float(((valores - media) ** 2).sum()),
+                   float(valores.min()), float(valores.max()))
+
+    def agregar(self, valor: float):
+        self.n += 1
+        delta = valor - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valor - self.media)
+        self.minimo = min(self.minimo, valor)
+        self.maximo = max(self.maximo, valor)
+
+    def combinar(self, otro: "AcumuladorWelford") -> "AcumuladorWelford":
+        """Devuelve un acumulador nuevo con los datos de ambos."""
+        if not otro.n:
+            return AcumuladorWelford(self.n, self.media, self.m2, self.minimo, self.maximo)
+        if not self.n:
+            return AcumuladorWelford(otro.n, otro.media, otro.m2, otro.minimo, otro.maximo)
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        return AcumuladorWelford(
+            n,
+            self.media + delta * otro.n / n,
+            self.m2 + otro.m2 + delta * delta * self.n * otro.n / n,
+            min(self.minimo, otro.minimo),
+            max(self.maximo, otro.maximo),
+        )
+
+    @property
+    def desviacion(self) -> float:
+        """Desviación estándar muestral (n - 1), como pandas .std()."""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan
+
+    @property
+    def cv_pct(self) -> float:
+        return self.desviacion / self.media * 100 if self.n > 1 and self.media > 0 else math.nan
+
+    def __repr__(self):
+        return f"AcumuladorWelford(n={self.n}, media={self.media:.3f}, desviacion={self.desviacion:.3f})"
+
+
+class DepuracionCubos(NamedTuple):
+    atipico: np.ndarray          # Cubos descartados por rango
+    rango_pct: float             # Rango de los cubos que quedan, en % de su promedio
+    rango_max_pct: float         # Límite aplicable; NaN si no hay suficientes cubos
+    repetir_ensayo: bool         # Aun descartando un cubo el rango excede el límite
+
+
+def depurar_cubos(resistencia_mpa, validos=None) -> DepuracionCubos:
+    """
+    Marca cubos atípicos según el rango permitido de NTC 220 / ASTM C109.
+
+    Si el rango (máximo - mínimo) supera el límite, se descarta el cubo que más se aleja del
+    promedio y se revisa otra vez el rango de los que quedan. Si todavía excede, el ensayo de
+    esa edad se debe repetir.
+
+    Parámetros:
+    - resistencia_mpa: Resistencia de los cubos de una misma mezcla y edad
+    - validos: Cubos que se consideran (los marcados como no válidos se ignoran)
+    """
+    resistencia = np.asarray(resistencia_mpa, dtype=np.float64)
+    considerados = ~np.isnan(resistencia) & (resistencia > 0)
+    if validos is not None:
+        considerados &= np.asarray(validos, dtype=bool)
+    atipico = np.zeros(resistencia.shape, dtype=bool)
+
+    def rango(mascara) -> Tuple[float, float]:
+        valores = resistencia[mascara]
+        limite = RANGO_MAX_PCT.get(min(valores.size, 3), math.nan)
+        if valores.size < 2:
+            return math.nan, limite
+        return float((valores.max() - valores.min()) / valores.mean() * 100), limite
+
+    rango_pct, limite = rango(considerados)
+    if rango_pct > limite and considerados.sum() >= 3:
+        media = resistencia[considerados].mean()
+        distancia = np.where(considerados, np.abs(resistencia - media), -np.inf)
+        atipico[int(distancia.argmax())] = True
+        rango_pct, limite = rango(considerados & ~atipico)
+    return DepuracionCubos(atipico, rango_pct, limite, bool(rango_pct > limite))
+
+
+def acumuladores_por_grupo(claves, valores) -> dict:
+    """
+    Acumuladores por clave (p.ej. (lote, edad)) calculados con NumPy para muchos datos a la vez.
+
+    Parámetros:
+    - claves: Lista de claves, una por valor
+    - valores: Valores numéricos; los NaN se ignoran
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    if not valores.size:
+        return {}
+    indice = {}
+    inversa = np.fromiter((indice.setdefault(c, len(indice)) for c in claves), dtype=np.intp, count=len(valores))
+    unicas = list(indice)
+    ok = ~np.isnan(valores)
+    inversa, valores = inversa[ok], valores[ok]
+    k = len(unicas)
+    n = np.bincount(inversa, minlength=k)
+    suma = np.bincount(inversa, weights=valores, minlength=k)
+    media = np.divide(suma, n, out=np.zeros(k), where=n > 0)
+    m2 = np.bincount(inversa, weights=(valores - media[inversa]) ** 2, minlength=k)
+    minimo = np.full(k, np.inf)
+    maximo = np.full(k, -np.inf)
+    np.minimum.at(minimo, inversa, valores)
+    np.maximum.at(maximo, inversa, valores)
+    return {
+        unicas[i]: AcumuladorWelford(int(n[i]), float(media[i]), float(m2[i]), float(minimo[i]), float(maximo[i]))
+        for i in range(k) if n[i]
+    }
+
+
+def resumen(acumulador: Optional[AcumuladorWelford]) -> dict:
+    """Valores para mostrar: media, mínimo, máximo, desviación y CV."""
+    if acumulador is None or not acumulador.n:
+        return {"n": 0, "Media": math.nan, "Mín": math.nan, "Máx": math.nan, "Desv": math.nan, "CV %": math.nan}
+    return {
+        "n": acumulador.n,
+        "Media": acumulador.media,
+        "Mín": acumulador.minimo,
+        "Máx": acumulador.maximo,
+        "Desv": acumulador.desviacion,
+        "CV %": acumulador.cv_pct,
+    }
@@ -0,0 +1,275 @@
+# ========================================
+# FUNCIONES DE CÁLCULO GRANULOMÉTRICO
+# ========================================
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+# Tamices para el módulo de finura (NTC 77 / ASTM C125), en mm
+TAMICES_MODULO_FINURA_MM = (75.0, 37.5, 19.0, 9.5, 4.75, 2.36, 1.18, 0.6, 0.3, 0.15)
+
+# Tolerancia relativa para reconocer un tamiz (el catálogo usa 4.74 para el N4)
+TOLERANCIA_TAMIZ = 0.02
+
+# Diferencia máxima admitida entre el peso inicial y la suma de retenidos (NTC 77)
+PERDIDA_MAX_PCT = 0.3
+
+
+class ResultadoGranulometria(NamedTuple):
+    """
+    Resultados de analizar_granulometria. Con una muestra los arreglos por tamiz son 1-D y los
+    valores por muestra son escalares; con N muestras son (N, tamices) y (N,).
+    """
+    retenido_pct: np.ndarray
+    acumulado_pct: np.ndarray
+    pasante_pct: np.ndarray
+    modulo_finura: np.ndarray
+    perdida_pct: np.ndarray          # (peso inicial - retenidos) / peso inicial; NaN sin peso
+    perdida_excesiva: np.ndarray     # |pérdida| mayor que PERDIDA_MAX_PCT
+    desviacion: np.ndarray           # Puntos de % fuera de la franja por tamiz; 0 si está dentro
+    dentro_limites: np.ndarray       # Por tamiz
+    cumple: np.ndarray               # Todos los tamices dentro de la franja
+    desviacion_max: np.ndarray       # Peor desviación de la muestra
+
+
+def indices_modulo_finura(tamiz_mm) -> np.ndarray:
+    """Máscara de los tamices que cuentan para el módulo de finura."""
+    tamiz_mm = np.asarray(tamiz_mm, dtype=np.float64)
+    normalizados = np.asarray(TAMICES_MODULO_FINURA_MM)
+    return np.isclose(tamiz_mm[:, None], normalizados[None, :], rtol=TOLERANCIA_TAMIZ, atol=0).any(axis=1)
+
+
+def porcentajes_granulometria(retenido_g, peso_muestra_g):
+    """
+    Calcula los porcentajes de un análisis granulométrico.
+
+    Parámetros:
+    - retenido_g: Masa retenida en cada tamiz, en g, del tamiz mayor al menor; 2-D para varias
+      muestras (una por fila)
+    - peso_muestra_g: Peso inicial de la muestra en g (o uno por muestra)
+    - devuelve (% retenido, % retenido acumulado, % pasante); ceros si el peso no es positivo
+    """
+    retenido_g = np.asarray(retenido_g, dtype=np.float64)
+    peso = np.asarray(peso_muestra_g, dtype=np.float64)
+    if retenido_g.ndim == 2 and peso.ndim == 1:
+        peso = peso[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        retenido_pct = np.where(peso > 0, retenido_g / peso * 100, 0.0)
+    acumulado_pct = np.cumsum(retenido_pct, axis=-1)
+    return retenido_pct, acumulado_pct, 100 - acumulado_pct
+
+
+def analizar_granulometria(
+    tamiz_mm,
+    retenido_g,
+    peso_inicial_g,
+    limite_min=None,
+    limite_max=None,
+    fondo_g=0.0,
+) -> ResultadoGranulometria:
+    """
+    Análisis granulométrico completo de una o muchas muestras en una sola pasada.
+
+    Parámetros:
+    - tamiz_mm: Aberturas de los tamices, del mayor al menor (las mismas para todas las muestras)
+    - retenido_g: Masa retenida por tamiz, (tamices,) o (muestras, tamices)
+    - peso_inicial_g: Peso inicial, escalar o uno por muestra
+    - limite_min, limite_max: Franja de % pasante por tamiz; sin ella no se evalúa la franja.
+      NaN en un tamiz significa sin límite
+    - fondo_g: Masa en el fondo, escalar o una por muestra; entra en la pérdida de masa
+    """
+    tamiz_mm = np.asarray(tamiz_mm, dtype=np.float64)
+    retenido = np.asarray(retenido_g, dtype=np.float64)
+    una_muestra = retenido.ndim == 1
+    retenido = np.atleast_2d(retenido)
+    peso = np.broadcast_to(np.asarray(peso_inicial_g, dtype=np.float64), retenido.shape[:1])
+    fondo = np.broadcast_to(np.asarray(fondo_g, dtype=np.float64), retenido.shape[:1])
+
+    retenido_pct, acumulado_pct, pasante_pct = porcentajes_granulometria(retenido, peso)
+    modulo_finura = acumulado_pct[:, indices_modulo_finura(tamiz_mm)].sum(axis=1) / 100
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        perdida_pct = np.where(peso > 0, (peso - retenido.sum(axis=1) - fondo) / peso * 100, np.nan)
+    perdida_excesiva = np.abs(perdida_pct) > PERDIDA_MAX_PCT
+
+    if limite_min is None and limite_max is None:
+        desviacion = np.zeros_like(pasante_pct)
+    else:
+        minimo = np.asarray(limite_min if limite_min is not None else np.nan, dtype=np.float64)
+        maximo = np.asarray(limite_max if limite_max is not None else np.nan, dtype=np.float64)
+        # fmax ignora los NaN: un tamiz sin límite nunca se desvía
+        desviacion = np.fmax(np.fmax(minimo - pasante_pct, pasante_pct - maximo), 0.0)
+    dentro_limites = desviacion == 0
+    resultado = ResultadoGranulometria(
+        retenido_pct,
+        acumulado_pct,
+        pasante_pct,
+        modulo_finura,
+        perdida_pct,
+        perdida_excesiva,
+        desviacion,
+        dentro_limites,
+        dentro_limites.all(axis=1),
+        desviacion.max(axis=1, initial=0.0),
+    )
+    if una_muestra:
+        return ResultadoGranulometria(*(valor[0] for valor in resultado))
+    return resultado
+
+
+def alinear_tamices(tamiz_muestra, tamiz_catalogo) -> Optional[np.ndarray]:
+    """
+    Índices del catálogo que corresponden a cada tamiz de la muestra, o None si alguno no está.
+
+    Parámetros:
+    - tamiz_muestra: Aberturas usadas en el ensayo
+    - tamiz_catalogo: Aberturas de la franja (p.ej. LimitesAgregado.tamiz_mm)
+    """
+    tamiz_muestra = np.asarray(tamiz_muestra, dtype=np.float64)
+    tamiz_catalogo = np.asarray(tamiz_catalogo, dtype=np.float64)
+    coincide = np.isclose(tamiz_muestra[:, None], tamiz_catalogo[None, :], rtol=TOLERANCIA_TAMIZ, atol=0)
+    if not coincide.any(axis=1).all():
+        return None
+    return coincide.argmax(axis=1)
+
+
+# ========================================
+# CLASIFICACIÓN CONTRA TODO EL CATÁLOGO
+# ========================================
+
+class ClasificacionGranulometrica(NamedTuple):
+    """Resultado de ClasificadorGranulometrico.clasificar para N muestras y M franjas."""
+    bandas: list                 # Claves del catálogo, en orden (M)
+    cumple: np.ndarray           # (N, M)
+    desviacion_max: np.ndarray   # (N, M) peor desviación en puntos de %; NaN si no es evaluable
+    evaluable: np.ndarray        # (M,) la muestra tiene tamices que cubren la franja
+    modulo_finura: np.ndarray    # (N,)
+
+    def franjas_que_cumple(self, muestra: int = 0) -> list:
+        return [banda for banda, ok in zip(self.bandas, self.cumple[muestra]) if ok]
+
+
+class ClasificadorGranulometrico:
+    """
+    Evalúa muchas muestras contra todas las franjas del catálogo en una sola operación.
+
+    Al construirlo se unen los tamices de todas las franjas en una sola rejilla (fundiendo los
+    que difieren menos de TOLERANCIA_TAMIZ, p.ej. 4.74 y 4.75). Cada franja tiene límites solo en
+    los tamices que especifica (NTC 174); en los demás tamices de la rejilla quedan NaN y no se
+    evalúan, para no exigirle a la muestra límites interpolados que la norma no fija.
+    """
+
+    def __init__(self, catalogo):
+        self.bandas = list(catalogo)
+        tamices = np.sort(np.concatenate([np.asarray(l.tamiz_mm, dtype=np.float64) for l in catalogo.values()]))
+        # Fundir tamices casi iguales: se conserva el primero de cada grupo
+        nuevo_grupo = np.r_[True, tamices[1:] > tamices[:-1] * (1 + TOLERANCIA_TAMIZ)]
+        self.tamiz_mm = tamices[nuevo_grupo]
+        self._log_tamiz = np.log10(self.tamiz_mm)
+
+        forma = (len(self.bandas), len(self.tamiz_mm))
+        self.limite_min = np.full(forma, np.nan)
+        self.limite_max = np.full(forma, np.nan)
+        self.tamiz_min_banda = np.empty(len(self.bandas))
+        for i, limites in enumerate(catalogo.values()):
+            propios = self._indice_rejilla(limites.tamiz_mm)
+            self.limite_min[i, propios] = np.asarray(limites.limite_min, dtype=np.float64)
+            self.limite_max[i, propios] = np.asarray(limites.limite_max, dtype=np.float64)
+            self.tamiz_min_banda[i] = self.tamiz_mm[propios].min()
+        for arreglo in (self.tamiz_mm, self.limite_min, self.limite_max, self.tamiz_min_banda):
+            arreglo.flags.writeable = False
+
+    def _indice_rejilla(self, tamiz_mm) -> np.ndarray:
+        """Índice del tamiz más cercano de la rejilla (en escala logarítmica)."""
+        log_tamiz = np.log10(np.asarray(tamiz_mm, dtype=np.float64))
+        return np.abs(log_tamiz[:, None] - self._log_tamiz[None, :]).argmin(axis=1)
+
+    def _log_ajustado(self, tamiz_mm) -> np.ndarray:
+        """log10 de los tamices; los que coinciden con la rejilla se toman exactos, sin interpolar."""
+        tamiz_mm = np.asarray(tamiz_mm, dtype=np.float64)
+        cercano = self._indice_rejilla(tamiz_mm)
+        exacto = np.isclose(tamiz_mm, self.tamiz_mm[cercano], rtol=TOLERANCIA_TAMIZ, atol=0)
+        return np.where(exacto, self._log_tamiz[cercano], np.log10(tamiz_mm))
+
+    def limites_en(self, tamiz_mm):
+        """
+        Límites (mínimo, máximo) de todas las franjas en los tamices dados, cada uno (M, K).
+        NaN donde la franja no especifica límites (entre dos tamices de la rejilla se interpola
+        solo si la franja fija ambos).
+        """
+        x = self._log_ajustado(tamiz_mm)
+        u = self._log_tamiz
+        j = np.clip(np.searchsorted(u, x, side="right") - 1, 0, len(u) - 2)
+        t = (x - u[j]) / (u[j + 1] - u[j])
+        fuera = (x < u[0]) | (x > u[-1])
+
+        def interpolar(matriz):
+            izquierda, derecha = matriz[:, j], matriz[:, j + 1]
+            valor = np.where(t == 1, derecha, izquierda + t * (derecha - izquierda))
+            valor = np.where(t == 0, izquierda, valor)
+            return np.where(fuera, np.nan, valor)
+
+        return interpolar(self.limite_min), interpolar(self.limite_max)
+
+    def _pasante_en_rejilla(self, tamiz_mm, pasante_pct) -> np.ndarray:
+        """
+        Interpola el % pasante de N muestras (N, K) sobre la rejilla (N, S) en el eje log10.
+        Por encima del tamiz mayor del ensayo pasa el 100 %; por debajo del menor es NaN.
+        """
+        orden = np.argsort(tamiz_mm)
+        x = self._log_ajustado(tamiz_mm)[orden]
+        y = np.asarray(pasante_pct)[:, orden]
+        if len(x) == 1:
+            j = np.zeros(len(self._log_tamiz), dtype=int)
+            t = np.zeros(len(self._log_tamiz))
+            y = np.concatenate([y, y], axis=1)
+        else:
+            j = np.clip(np.searchsorted(x, self._log_tamiz, side="right") - 1, 0, len(x) - 2)
+            t = np.clip((self._log_tamiz - x[j]) / (x[j + 1] - x[j]), 0.0, 1.0)
+        valor = y[:, j] + t * (y[:, j + 1] - y[:, j])
+        tolerancia = np.log10(1 + TOLERANCIA_TAMIZ)
+        valor[:, self._log_tamiz > x[-1] + tolerancia] = 100.0
+        valor[:, self._log_tamiz < x[0] - tolerancia] = np.nan
+        return valor
+
+    def clasificar(self, tamiz_mm, retenido_g, peso_inicial_g, fondo_g=0.0) -> ClasificacionGranulometrica:
+        """
+        Clasifica N muestras ensayadas con los mismos tamices contra las M franjas.
+
+        Parámetros:
+        - tamiz_mm: Tamices del ensayo, del mayor al menor (K)
+        - retenido_g: Masa retenida, (K,) o (N, K)
+        - peso_inicial_g: Peso inicial, escalar o uno por muestra
+        - fondo_g: Masa en el fondo, escalar o una por muestra
+        """
+        tamiz_mm = np.asarray(tamiz_mm, dtype=np.float64)
+        r = analizar_granulometria(tamiz_mm, np.atleast_2d(retenido_g), peso_inicial_g, fondo_g=fondo_g)
+
+        # (N, 1, S) contra (1, M, S): cada franja se compara solo en sus tamices (fuera de ellos los
+        # límites son NaN y np.fmax los ignora)
+        pasante = self._pasante_en_rejilla(tamiz_mm, r.pasante_pct)[:, None, :]
+        desviacion = np.fmax(np.fmax(self.limite_min[None] - pasante, pasante - self.limite_max[None]), 0.0)
+        # Sin el tamiz más fino de la franja no se puede saber si la muestra la cumple
+        evaluable = self.tamiz_min_banda >= tamiz_mm.min() / (1 + TOLERANCIA_TAMIZ)
+        desviacion_max = np.where(evaluable[None, :], desviacion.max(axis=2), np.nan)
+        return ClasificacionGranulometrica(
+            self.bandas,
+            desviacion_max == 0,
+            desviacion_max,
+            evaluable,
+            r.modulo_finura,
+        )
+
+
+_clasificador = (None, None)
+
+
+def clasificador_catalogo() -> ClasificadorGranulometrico:
+    """Clasificador del catálogo de utils/gram_limites.txt; se reconstruye si el archivo cambia."""
+    from utils.limites_granulometria import cargar_limites
+
+    global _clasificador
+    catalogo = cargar_limites()
+    if _clasificador[0] is not catalogo:
+        _clasificador = (catalogo, ClasificadorGranulometrico(catalogo))
+    return _clasificador[1]
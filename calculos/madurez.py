@@ -0,0 +1,180 @@
+# ========================================
+# DESARROLLO DE RESISTENCIA CON LA EDAD
+# ========================================
+import math
+from typing import Any, Dict, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+EDAD_REFERENCIA = 28
+
+# ACI 209R: f(t) = t / (a + b·t) · f28; cemento tipo I con curado húmedo
+ALFA_ACI209 = 4.0
+BETA_ACI209 = 0.85
+
+METODO_LOG = 0       # f(t) = a + b·ln(t), ajustado con dos o más edades distintas
+METODO_ACI209 = 1    # Solo una edad: se ajusta f28 con la curva de ACI 209R
+NOMBRES_METODO = {METODO_LOG: "log(edad)", METODO_ACI209: "ACI 209"}
+
+# Diferencia mínima de ln(edad) para considerar que un grupo tiene edades distintas
+_VARIANZA_MIN = 1e-9
+
+
+class AjusteResistencia(NamedTuple):
+    claves: List[Any]            # Familia (p.ej. muestra) de cada ajuste
+    a: np.ndarray                # Ordenada en ln(t) = 0; NaN con ACI 209
+    b: np.ndarray                # MPa por unidad de ln(t); NaN con ACI 209
+    f28: np.ndarray              # Parámetro f28 de ACI 209; NaN con log(edad)
+    metodo: np.ndarray           # METODO_LOG o METODO_ACI209
+    n: np.ndarray                # Cilindros usados
+    edades: np.ndarray           # Edades distintas
+    edad_max: np.ndarray         # Mayor edad ensayada (días)
+
+    def predecir(self, edad_d=EDAD_REFERENCIA) -> np.ndarray:
+        """Resistencia estimada de cada familia a la edad dada (días)."""
+        edad_d = np.asarray(edad_d, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log = self.a + self.b * np.log(edad_d)
+            aci = self.f28 * crecimiento_aci209(edad_d)
+        return np.where(self.metodo == METODO_LOG, log, aci)
+
+    def dataframe(self, fc=None) -> pd.DataFrame:
+        """
+        Tabla con una fila por familia y la resistencia estimada a 28 días.
+
+        Parámetros:
+        - fc: f'c de cada familia (opcional) para mostrar la estimación en % de f'c
+        """
+        estimada = self.predecir(EDAD_REFERENCIA)
+        tabla = pd.DataFrame({
+            "Familia": self.claves,
+            "Cilindros": self.n,
+            "Edades": self.edades,
+            "Edad máx.(d)": self.edad_max,
+            "Método": [NOMBRES_METODO[m] for m in self.metodo],
+            "a (MPa)": self.a,
+            "b (MPa/ln d)": self.b,
+            f"Estimada {EDAD_REFERENCIA} d (MPa)": estimada,
+        })
+        if fc is not None:
+            fc = np.asarray(fc, dtype=np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                tabla[f"Estimada {EDAD_REFERENCIA} d (% f'c)"] = np.where(fc > 0, estimada / fc * 100, np.nan)
+        return tabla
+
+
+def crecimiento_aci209(edad_d, alfa: float = ALFA_ACI209, beta: float = BETA_ACI209):
+    """Fracción de f28 alcanzada a la edad dada según ACI 209R: t / (alfa + beta·t)."""
+    edad_d = np.asarray(edad_d, dtype=np.float64)
+    return edad_d / (alfa + beta * edad_d)
+
+
+def ajustar_resistencia(claves, edad_d, resistencia_mpa) -> AjusteResistencia:
+    """
+    Ajusta la curva resistencia-edad de muchas familias a la vez.
+
+    Las sumas de mínimos cuadrados (Σx, Σy, Σx², Σxy con x = ln t) se acumulan por familia
+    con np.bincount, así miles de familias se resuelven sin un bucle en Python. Las familias
+    con una sola edad no determinan la pendiente y se ajustan con la curva de ACI 209R.
+
+    Parámetros:
+    - claves: Familia de cada cilindro (p.ej. nombre de la muestra o de la mezcla)
+    - edad_d: Edad de rotura en días
+    - resistencia_mpa: Resistencia de cada cilindro; se ignoran NaN y valores no positivos
+    """
+    edad = pd.to_numeric(pd.Series(np.asarray(edad_d, dtype=object)), errors="coerce").to_numpy(np.float64)
+    y = np.asarray(resistencia_mpa, dtype=np.float64)
+    claves = np.asarray(claves, dtype=object)
+    ok = (edad > 0) & (y > 0)
+    edad, y, claves = edad[ok], y[ok], claves[ok]
+
+    codigos, unicas = pd.factorize(claves, sort=False)
+    k = len(unicas)
+    vacio = np.empty(0)
+    if not k:
+        return AjusteResistencia([], vacio, vacio, vacio, np.empty(0, dtype=np.int8),
+                                 np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), vacio)
+
+    x = np.log(edad)
+    n = np.bincount(codigos, minlength=k)
+    sx = np.bincount(codigos, weights=x, minlength=k)
+    sy = np.bincount(codigos, weights=y, minlength=k)
+    media_x = sx / n
+    # Sumas centradas: evitan la cancelación de n·Σx² - (Σx)² cuando las edades son parecidas
+    dx = x - media_x[codigos]
+    sxx = np.bincount(codigos, weights=dx * dx, minlength=k)
+    sxy = np.bincount(codigos, weights=dx * y, minlength=k)
+
+    con_pendiente = sxx > _VARIANZA_MIN * n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        b = np.where(con_pendiente, sxy / sxx, np.nan)
+        a = np.where(con_pendiente, sy / n - b * media_x, np.nan)
+
+        # ACI 209 con alfa y beta fijos: f = f28·g(t) es lineal en f28, f28 = Σg·y / Σg²
+        g = crecimiento_aci209(edad)
+        sgy = np.bincount(codigos, weights=g * y, minlength=k)
+        sgg = np.bincount(codigos, weights=g * g, minlength=k)
+        f28 = np.where(con_pendiente, np.nan, sgy / sgg)
+
+    # Edades distintas por familia: pares (familia, edad) únicos
+    pares = np.unique(np.stack([codigos, np.round(edad, 3)]), axis=1)
+    edades = np.bincount(pares[0].astype(np.intp), minlength=k)
+    edad_max = np.full(k, -np.inf)
+    np.maximum.at(edad_max, codigos, edad)
+
+    return AjusteResistencia(
+        list(unicas), a, b, f28,
+        np.where(con_pendiente, METODO_LOG, METODO_ACI209).astype(np.int8),
+        n, edades, edad_max,
+    )
+
+
+# Columnas de la tabla de ensayos que usan ajustar_ensayos y fc_por_familia
+COLUMNAS_AJUSTE = ["Muestra", "Edad(d)", "Resistencia(MPa)", "F'c(MPa)"]
+
+
+def ajustar_ensayos(df: pd.DataFrame, columna_familia: str = "Muestra") -> AjusteResistencia:
+    """
+    Ajuste por familia para una tabla de ensayos de cilindros (df_ensayos o el historial).
+
+    Parámetros:
+    - df: DataFrame con Edad(d), Resistencia(MPa) y la columna de familia
+    - columna_familia: Columna que agrupa los cilindros de una misma mezcla
+    """
+    return ajustar_resistencia(df[columna_familia].to_numpy(), df["Edad(d)"].to_numpy(),
+                               df["Resistencia(MPa)"].to_numpy())
+
+
+def fc_por_familia(df: pd.DataFrame, ajuste: AjusteResistencia, columna_familia: str = "Muestra") -> np.ndarray:
+    """f'c registrado de cada familia del ajuste (el último si hay varios)."""
+    if not ajuste.claves:
+        return np.empty(0)
+    fc = df.groupby(columna_familia, sort=False)["F'c(MPa)"].last()
+    return fc.reindex(ajuste.claves).to_numpy(np.float64)
+
+
+def resistencia_estimada(ajuste: AjusteResistencia, familia, edad_d=EDAD_REFERENCIA) -> float:
+    """Resistencia estimada de una familia; NaN si no tiene ajuste."""
+    try:
+        i = ajuste.claves.index(familia)
+    except ValueError:
+        return math.nan
+    return float(ajuste.predecir(edad_d)[i])
+
+
+def ajuste_en_cache(cache: Dict[str, Any], version, df: pd.DataFrame) -> AjusteResistencia:
+    """
+    Devuelve el ajuste guardado si los datos no cambiaron (misma versión) o lo recalcula.
+
+    Parámetros:
+    - cache: Diccionario de la sesión (p.ej. st.session_state)
+    - version: Valor que cambia cuando cambian los ensayos (p.ej. registro.version)
+    - df: Tabla de ensayos
+    """
+    guardado = cache.get("ajuste_resistencia")
+    if guardado is not None and guardado[0] == version:
+        return guardado[1]
+    ajuste = ajustar_ensayos(df)
+    cache["ajuste_resistencia"] = (version, ajuste)
+    return ajuste
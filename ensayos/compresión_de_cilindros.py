@@ -2,7 +2,9 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 from calculos.cal_concreto import area_cilindro, resistencia_compresion, evolucion_resistencia , volumen_cilindro, densidad_cilindro
-from utils.factores_ld import factor_ld
+from utils.factores_ld import factor_ld_for
+from utils.datos_referencia import datos_referencia
+from utils.registro_ensayos import ensayos_vacios, tipar_ensayos
 
 # ========================================
 # BARRA LATERAL PRESENTACIÓN
@@ -60,18 +62,11 @@ st.title("Ensayo de Compresión de Cilindros de Concreto")
 #  AUXILIARES
 # ========================================
 
-TIPOS_FALLA = [
-    "Tipo 1: conos bien formados en ambos extremos",
-    "Tipo 2: cono bien formado en un extremo",
-    "Tipo 3: fisuras verticales  a traves de ambos extremos",
-    "Tipo 4: fractura diagonal sin fisuras",
-    "Tipo 5: fracturas en los lados en la parte superior o inferior",
-    "Tipo 6: extremo puntiagudo",
-]
+referencia = datos_referencia()
 
 # Inicializar estado de sesión
 if "df_ensayos" not in st.session_state:
-    st.session_state.df_ensayos = pd.DataFrame(columns=["Muestra", "Fecha", "Edad(d)",  "Diámetro(mm)", "Altura(mm)", "Densidad(kg/m3)", "Carga Máxima(kN)", "Resistencia(MPa)", "Evolución(%)", "Tipo Falla"])
+    st.session_state.df_ensayos = ensayos_vacios(["Muestra", "Fecha", "Edad(d)",  "Diámetro(mm)", "Altura(mm)", "Densidad(kg/m3)", "Carga Máxima(kN)", "Resistencia(MPa)", "Evolución(%)", "Tipo Falla"])
 
 df_ensayos = st.session_state.df_ensayos
 
@@ -131,11 +126,11 @@ with col2:
 
 with col3:
 
-    edad = st.selectbox("Edad (días)", ["1 (+- 0.5h)", "3 (+-2h)", "7 (+-6h)", "28 (+-20h)", "90 (48h)"])  
+    edad = st.selectbox("Edad (días)", referencia.edades_cilindros)  
     altura = st.number_input("Altura (mm)", min_value=1.0, value=float(altura_default), step=0.1)
-    tipo_falla = st.selectbox("Tipo de Falla", TIPOS_FALLA)
+    tipo_falla = st.selectbox("Tipo de Falla", referencia.tipos_falla)
     rel_ld = altura / diametro
-    factor_ld_value = factor_ld.loc[factor_ld["ld"] == round(rel_ld, 2), "factor"].values[0] if 1.0 <= rel_ld <= 1.99 else 1.0
+    factor_ld_value = factor_ld_for(rel_ld) if 1.0 <= rel_ld <= 1.99 else 1.0
 
     # Calcular resistencia
 if dimensiones == "Otras dimensiones" and 1.0 <= rel_ld <= 1.99:
@@ -161,7 +156,7 @@ else:
 # Botón para registrar ensayo
 if st.button("Registrar Ensayo", type="primary"):
     if muestra and carga > 0:
-        nuevo_ensayo = pd.DataFrame({
+        nuevo_ensayo = tipar_ensayos(pd.DataFrame({
             "Muestra": [muestra],
             "Fecha": [fecha],       
             "Edad(d)": [edad.split(" ")[0]],
@@ -172,7 +167,7 @@ if st.button("Registrar Ensayo", type="primary"):
             "Resistencia(MPa)": [resistencia],
             "Evolución(%)": [evolucion],
             "Tipo Falla": [tipo_falla[:6]],
-        })
+        }))
         
         st.session_state.df_ensayos = pd.concat([st.session_state.df_ensayos, nuevo_ensayo], ignore_index=True)
         st.success("Ensayo registrado correctamente")
@@ -188,7 +183,12 @@ st.markdown("### Resultados", help="para descargar resultados en formato csv use
 if not st.session_state.df_ensayos.empty:
     # Mostrar tabla
     df_display = st.session_state.df_ensayos.copy()
-    st.dataframe(df_display, width= "content", hide_index=True)
+    st.dataframe(df_display, width= "content", hide_index=True, column_config={
+        "Fecha": st.column_config.DateColumn(format="DD/MM/YYYY"),
+        "Diámetro(mm)": st.column_config.NumberColumn(format="%.1f"),
+        "Altura(mm)": st.column_config.NumberColumn(format="%.1f"),
+        "Carga Máxima(kN)": st.column_config.NumberColumn(format="%.2f"),
+    })
     
 else:
     st.info("No se han registrado ensayos aún. Completa el formulario para agregar resultados.")
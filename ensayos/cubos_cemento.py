@@ -1,7 +1,13 @@
+import math
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import date
+from calculos.cal_concreto import resistencia_cubo_lote
+from calculos.estadisticas import EDADES_CUBOS, AcumuladorWelford, depurar_cubos
+from utils.graficos import barras_cubos, figura_png
+from utils.tabla_editable import tabla_editable
+from utils.almacenamiento import POR_PAGINA, obtener_almacen
+from utils.memoria_sesion import controlar_memoria
 
 # ========================================
 # BARRA LATERAL PRESENTACIÓN
@@ -98,7 +104,7 @@ col1, col2, col3 = st.columns(3)
 
 with col1:
     lote_cemento = st.text_input("Lote de Cemento:", value="")
-    edad_ensayo = st.selectbox("Edad de Ensayo (días):", [3, 7, 28], index=2)
+    edad_ensayo = st.selectbox("Edad de Ensayo (días):", list(EDADES_CUBOS), index=2)
 
 with col2:
     fecha_fabricacion = st.date_input("Fecha de Fabricación:")
@@ -119,80 +125,49 @@ st.write("### Resultados de Compresión - Cubos de 50 mm")
 # Inicializar datos
 num_cubos = st.number_input("Número de Cubos a Ensayar:", min_value=1, max_value=10, value=3, step=1)
 
-# Crear tabla de entrada
-datos_cubos = []
-cols_header = st.columns([1, 2, 2, 2, 2, 2])
-with cols_header[0]:
-    st.write("**Cubo No.**")
-with cols_header[1]:
-    st.write("**Masa (g)**")
-with cols_header[2]:
-    st.write("**Fuerza Máxima (kN)**")
-with cols_header[3]:
-    st.write("**Resistencia (MPa)**")
-with cols_header[4]:
-    st.write("**Observaciones**")
-with cols_header[5]:
-    st.write("**Válido**")
-
-for i in range(num_cubos):
-    cols = st.columns([1, 2, 2, 2, 2, 2])
-    
-    with cols[0]:
-        st.write(f"#{i+1}")
-    
-    with cols[1]:
-        masa = st.number_input(
-            f"Masa cubo {i+1}",
-            min_value=0.0,
-            value=330.0,
-            step=0.1,
-            label_visibility="collapsed",
-            key=f"masa_{i}"
-        )
-    
-    with cols[2]:
-        fuerza_kn = st.number_input(
-            f"Fuerza cubo {i+1}",
-            min_value=0.0,
-            value=0.0,
-            step=0.1,
-            label_visibility="collapsed",
-            key=f"fuerza_{i}"
-        )
-    
-    # Calcular resistencia: R = F / A, donde A = 50mm x 50mm = 2500 mm²
-    resistencia_mpa = (fuerza_kn * 1000) / 2500 if fuerza_kn > 0 else 0.0
-    
-    with cols[3]:
-        st.write(f"{resistencia_mpa:.2f}")
-    
-    with cols[4]:
-        observaciones = st.text_input(
-            f"Observaciones cubo {i+1}",
-            value="",
-            label_visibility="collapsed",
-            key=f"obs_{i}"
-        )
-    
-    with cols[5]:
-        valido = st.checkbox(
-            f"Válido {i+1}",
-            value=True,
-            label_visibility="collapsed",
-            key=f"valido_{i}"
-        )
-    
-    datos_cubos.append({
-        'Cubo': f"#{i+1}",
-        'Masa (g)': masa,
-        'Fuerza (kN)': fuerza_kn,
-        'Resistencia (MPa)': resistencia_mpa,
-        'Observaciones': observaciones,
-        'Válido': valido
+# Tabla de entrada: se agregan o quitan filas al cambiar el número de cubos
+entrada = st.session_state.get("cubos_entrada")
+if entrada is None or len(entrada) != num_cubos:
+    anteriores = len(entrada) if entrada is not None else 0
+    nuevas = pd.DataFrame({
+        'Cubo': [f"#{i+1}" for i in range(anteriores, num_cubos)],
+        'Masa (g)': 330.0,
+        'Fuerza (kN)': 0.0,
+        'Observaciones': "",
+        'Válido': True,
     })
-
-df_cubos = pd.DataFrame(datos_cubos)
+    filas = [entrada.iloc[:num_cubos]] if anteriores else []
+    st.session_state.cubos_entrada = pd.concat(filas + [nuevas], ignore_index=True)
+
+
+def con_resultado(df):
+    # Válidos con fuerza registrada: las filas nuevas llegan con 0 kN hasta que se ensaya el cubo
+    return df['Válido'].astype(bool) & (df['Resistencia (MPa)'] > 0)
+
+
+def calcular_resistencias(entrada):
+    # Resistencia: R = F / A, donde A = 50mm x 50mm = 2500 mm²
+    df = entrada.fillna({'Masa (g)': 0.0, 'Fuerza (kN)': 0.0, 'Observaciones': "", 'Válido': False})
+    df.insert(3, 'Resistencia (MPa)', resistencia_cubo_lote(df['Fuerza (kN)']))
+    # Cubo descartado automáticamente si el rango excede el permitido por NTC 220
+    df['Atípico'] = depurar_cubos(df['Resistencia (MPa)'], con_resultado(df)).atipico
+    return df
+
+
+df_cubos = tabla_editable(
+    "cubos_entrada",
+    calcular_resistencias,
+    editables=['Masa (g)', 'Fuerza (kN)', 'Observaciones', 'Válido'],
+    column_config={
+        'Cubo': st.column_config.TextColumn('Cubo No.'),
+        'Masa (g)': st.column_config.NumberColumn(min_value=0.0, step=0.1, format="%.1f"),
+        'Fuerza (kN)': st.column_config.NumberColumn('Fuerza Máxima (kN)', min_value=0.0, step=0.1, format="%.1f"),
+        'Resistencia (MPa)': st.column_config.NumberColumn(format="%.2f"),
+        'Válido': st.column_config.CheckboxColumn(),
+        'Atípico': st.column_config.CheckboxColumn(help="Descartado por rango (NTC 220)"),
+    },
+    use_container_width=True,
+)
 
 st.divider()
 
@@ -202,28 +177,43 @@ st.divider()
 
 st.write("### Análisis de Resultados")
 
-# Filtrar solo cubos válidos
-df_validos = df_cubos[df_cubos['Válido'] == True]
+# Cubos válidos, ya ensayados, que no fueron descartados por rango
+validos = (con_resultado(df_cubos) & ~df_cubos['Atípico']).to_numpy()
+depuracion = depurar_cubos(df_cubos['Resistencia (MPa)'], con_resultado(df_cubos))
+estadisticas = AcumuladorWelford.desde_arreglo(df_cubos['Resistencia (MPa)'].to_numpy()[validos])
 
-if len(df_validos) > 0:
-    col1, col2, col3, col4 = st.columns(4)
+if estadisticas.n > 0:
+    col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        resistencia_media = df_validos['Resistencia (MPa)'].mean()
-        st.metric("Resistencia Media", f"{resistencia_media:.2f} MPa")
+        st.metric("Resistencia Media", f"{estadisticas.media:.2f} MPa")
     
     with col2:
-        resistencia_min = df_validos['Resistencia (MPa)'].min()
-        st.metric("Resistencia Mínima", f"{resistencia_min:.2f} MPa")
+        st.metric("Resistencia Mínima", f"{estadisticas.minimo:.2f} MPa")
     
     with col3:
-        resistencia_max = df_validos['Resistencia (MPa)'].max()
-        st.metric("Resistencia Máxima", f"{resistencia_max:.2f} MPa")
+        st.metric("Resistencia Máxima", f"{estadisticas.maximo:.2f} MPa")
     
     with col4:
-        coef_variacion = (df_validos['Resistencia (MPa)'].std() / resistencia_media * 100) if resistencia_media > 0 else 0
+        coef_variacion = 0.0 if math.isnan(estadisticas.cv_pct) else estadisticas.cv_pct
         st.metric("Coef. Variación", f"{coef_variacion:.2f} %")
 
+    with col5:
+        rango = "-" if math.isnan(depuracion.rango_pct) else f"{depuracion.rango_pct:.2f} %"
+        st.metric("Rango", rango, help=f"Máximo permitido: {depuracion.rango_max_pct} % (NTC 220)")
+
+    if depuracion.atipico.any():
+        st.info(f"Cubo {df_cubos['Cubo'][depuracion.atipico].iloc[0]} descartado: el rango excedía el permitido")
+    if depuracion.repetir_ensayo:
+        st.warning("El rango entre cubos supera el permitido por NTC 220; se debe repetir el ensayo a esta edad")
+
+# Estadísticas del lote en todo el historial (una fila por edad, sin leer los cubos guardados)
+if lote_cemento.strip():
+    historial_lote = obtener_almacen().estadisticas_cubos(lote_cemento.strip())
+    if len(historial_lote):
+        st.write(f"**Historial del lote {lote_cemento.strip()}**")
+        st.dataframe(historial_lote.round(2), hide_index=True, use_container_width=True)
+
 st.divider()
 
 # ========================================
@@ -232,21 +222,8 @@ st.divider()
 
 st.write("### Gráfico de Resistencia por Cubo")
 
-fig, ax = plt.subplots(figsize=(10, 6))
-
-colores = ['green' if valido else 'red' for valido in df_cubos['Válido']]
-ax.bar(df_cubos['Cubo'], df_cubos['Resistencia (MPa)'], color=colores, alpha=0.7, edgecolor='black')
-
-if len(df_validos) > 0:
-    ax.axhline(y=df_validos['Resistencia (MPa)'].mean(), color='blue', linestyle='--', linewidth=2, label='Resistencia Media')
-
-ax.set_xlabel('Cubo', fontsize=12, fontweight='bold')
-ax.set_ylabel('Resistencia (MPa)', fontsize=12, fontweight='bold')
-ax.grid(True, alpha=0.3, axis='y')
-ax.legend(fontsize=11)
-plt.tight_layout()
-
-st.pyplot(fig)
+fig = barras_cubos(df_cubos['Cubo'], df_cubos['Resistencia (MPa)'], validos)
+st.image(figura_png(fig))
 
 st.divider()
 
@@ -264,5 +241,74 @@ if st.button("Descargar Resultados como CSV"):
     )
 
 if st.button("Descargar Gráfico"):
-    fig.savefig("grafico_compresion_cubos.png", dpi=300, bbox_inches='tight')
+    with open("grafico_compresion_cubos.png", "wb") as archivo:
+        archivo.write(figura_png(fig, dpi=300, bbox_inches='tight'))
     st.success("Gráfico descargado como 'grafico_compresion_cubos.png'")
+
+if st.button("Guardar en historial", type="primary"):
+    if lote_cemento.strip():
+        datos_lote = {
+            "Lote": lote_cemento.strip(),
+            "Tipo Cemento": tipo_cemento,
+            "Fecha": fecha,
+            "Fecha Fabricación": fecha_fabricacion,
+            "Edad(d)": edad_ensayo,
+            "Humedad (%)": humedad_ambiente,
+            "Temperatura (°C)": temperatura_ambiente,
+            "Laboratorista": laboratorista,
+        }
+        # Los cubos sin fuerza o descartados por rango se guardan como no válidos (la causa del rango va en observaciones)
+        df_guardar = df_cubos.assign(**{
+            'Válido': validos,
+            'Observaciones': df_cubos['Observaciones'].where(
+                ~df_cubos['Atípico'], (df_cubos['Observaciones'] + " Atípico NTC 220").str.strip()
+            ),
+        }).drop(columns='Atípico')
+        obtener_almacen().guardar_cubos({**fila, **datos_lote} for fila in df_guardar.to_dict("records"))
+        st.success(f"{len(df_cubos)} cubos guardados en el historial")
+    else:
+        st.error("Ingresa el lote de cemento para guardar los resultados")
+
+st.divider()
+
+# ========================================
+# SECCIÓN 7: HISTORIAL (SQLite local)
+# ========================================
+
+st.write("### Historial de Cubos")
+
+almacen = obtener_almacen()
+col1, col2, col3 = st.columns([4, 2, 2])
+with col1:
+    filtro_lote = st.text_input("Lote", key="hist_lote", placeholder="Todos")
+with col2:
+    filtro_edad = st.selectbox("Edad (días)", ["Todas", *EDADES_CUBOS], key="hist_edad")
+
+filtros = {
+    "lote": filtro_lote.strip() or None,
+    "edad": None if filtro_edad == "Todas" else filtro_edad,
+}
+total_historial = almacen.contar_cubos(**filtros)
+paginas = max(1, math.ceil(total_historial / POR_PAGINA))
+with col3:
+    pagina = st.number_input("Página", min_value=1, max_value=paginas, value=1, step=1, key="hist_pagina")
+
+if total_historial:
+    st.dataframe(almacen.consultar_cubos(pagina - 1, **filtros), use_container_width=True, hide_index=True)
+    st.caption(f"{total_historial} cubos guardados · página {pagina} de {paginas}")
+
+    if st.button("Exportar historial filtrado (Parquet)"):
+        from utils.archivo_parquet import parquet_bytes
+
+        historial = pd.concat(almacen.iterar_cubos(**filtros), ignore_index=True)
+        st.download_button(
+            label="Descargar Parquet",
+            data=parquet_bytes(historial, "cubos"),
+            file_name="historial_cubos.parquet",
+            mime="application/vnd.apache.parquet",
+            on_click="ignore",
+        )
+else:
+    st.info("No hay cubos guardados con estos filtros.")
+
+controlar_memoria()
@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import date
+from calculos.granulometria import porcentajes_granulometria
+from utils.graficos import figura_png, nueva_figura
 
 # ========================================
 # BARRA LATERAL PRESENTACIÓN
@@ -129,11 +130,13 @@ with col_c6:
 with col_c7:
     st.write("**% Pasante**")
 
+# Los porcentajes se calculan de una vez con los valores actuales de los widgets
+retenido_actual = [st.session_state.get(f"pasa_{idx}", 0.0) for idx in df_display.index]
+retenido_pct, acumulado_pct, pasante_pct = porcentajes_granulometria(retenido_actual, peso_muestra)
+
 pasa_inputs = []
-retenido_acumulado = 0.0
-pasante_values = []
 
-for idx, row in df_display.iterrows():
+for pos, (idx, row) in enumerate(df_display.iterrows()):
     col_1, col_2, col_3, col_4, col_5, col_6, col_7 = st.columns(7)
     with col_1:
         st.write(f"{row['Tamiz (mm)']}")
@@ -153,21 +156,17 @@ for idx, row in df_display.iterrows():
         pasa_inputs.append(pasa_value)
 
     with col_5:
-        retenido_porcentaje = (pasa_value / peso_muestra * 100) if peso_muestra > 0 else 0
-        st.write(f"{retenido_porcentaje:.2f}")
+        st.write(f"{retenido_pct[pos]:.2f}")
     
     with col_6:
-        retenido_acumulado += retenido_porcentaje
-        st.write(f"{retenido_acumulado:.2f}")
+        st.write(f"{acumulado_pct[pos]:.2f}")
     
     
     with col_7:
-        pasante_porcentaje = 100 - retenido_acumulado
-        pasante_values.append(pasante_porcentaje)
-        st.write(f"{pasante_porcentaje:.2f}")
+        st.write(f"{pasante_pct[pos]:.2f}")
         
 df_display['Retenido (g)'] = pasa_inputs
-df_display['% Pasante'] = pasante_values
+df_display['% Pasante'] = pasante_pct
 
 # Mostrar total de pasante
 col_1, col_2, col_3, col_4, col_5, col_6, col_7 = st.columns(7)
@@ -179,7 +178,8 @@ with col_5:
 # SECCIÓN 2: GRÁFICO GRANULOMÉTRICO
 # ========================================
 
-fig, ax = plt.subplots(figsize=(10, 6))
+fig = nueva_figura()
+ax = fig.subplots()
 
 # Graficar límites máximos y mínimos
 ax.plot(df_agg['tamiz_mm'], df_agg['limite_max'], 'r--o', label='Límite Máximo', linewidth=1, markersize=6)
@@ -203,9 +203,9 @@ ax.set_xscale('log')
 # Invertir eje x
 ax.invert_xaxis()
 
-plt.tight_layout()
+fig.tight_layout()
 
-st.pyplot(fig)
+st.image(figura_png(fig))
 
 # un boton para descargar la pantalla como imagen
 if st.button("Descargar gráfico"):
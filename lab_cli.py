@@ -0,0 +1,256 @@
+"""
+Línea de comandos para cálculos e informes por lotes, sin Streamlit.
+
+Ejemplos:
+    python lab_cli.py cilindros ensayos.csv -o resultados.csv --pdf informe.pdf
+    python lab_cli.py cilindros ensayos.parquet --por-obra informes.zip
+    python lab_cli.py cubos cubos.csv -o resultados.csv
+    python lab_cli.py granulometria tamices.csv --agregado Arena -o resultados.csv --pdf informes/
+    python lab_cli.py archivar archivo/ --desde 2026-09-01 --hasta 2026-09-30
+
+Solo se importan pandas, matplotlib o reportlab cuando el comando los necesita, para que
+arranque rápido en tareas programadas (cron).
+"""
+import argparse
+import sys
+from pathlib import Path
+
+
+def _leer_tabla(ruta: Path):
+    import pandas as pd
+
+    if ruta.suffix.lower() in (".parquet", ".pq"):
+        return pd.read_parquet(ruta)
+    return pd.read_csv(ruta)
+
+
+def _escribir_tabla(df, ruta: Path):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    if ruta.suffix.lower() in (".parquet", ".pq"):
+        df.to_parquet(ruta, index=False)
+    else:
+        df.to_csv(ruta, index=False)
+
+
+def _encabezado(args):
+    encabezado = {}
+    for clave in ("ciudad", "obra", "desarrollado_por"):
+        valor = getattr(args, clave, None)
+        if valor:
+            encabezado[clave] = valor
+    return encabezado or None
+
+
+def _mostrar_progreso(completados, total, nombre, error):
+    estado = f"ERROR: {error}" if error else "ok"
+    print(f"[{completados}/{total}] {nombre} {estado}", file=sys.stderr)
+
+
+def comando_cilindros(args) -> int:
+    from calculos.cal_concreto import compute_cylinder_results
+
+    df = compute_cylinder_results(_leer_tabla(args.entrada))
+    invalidos = int(df["Resistencia(MPa)"].isna().sum())
+    if invalidos:
+        print(f"{invalidos} filas con datos inválidos (resistencia vacía)", file=sys.stderr)
+
+    if args.salida:
+        _escribir_tabla(df, args.salida)
+    if args.pdf:
+        from utils.report.compresion_cilindros_pdf import compresion_cilindros_pdf_lote
+
+        args.pdf.parent.mkdir(parents=True, exist_ok=True)
+        args.pdf.write_bytes(compresion_cilindros_pdf_lote(df, _encabezado(args)))
+    if args.por_obra:
+        from utils.report.lote import exportar_informes, trabajos_cilindros_por_obra
+
+        if "Obra" not in df.columns:
+            print("La entrada no tiene columna 'Obra'", file=sys.stderr)
+            return 2
+        trabajos = trabajos_cilindros_por_obra(df, _encabezado(args))
+        resultado = exportar_informes(trabajos, args.por_obra, progreso=_mostrar_progreso, max_procesos=args.procesos)
+        if resultado.errores:
+            return 1
+    if not (args.salida or args.pdf or args.por_obra):
+        df.to_csv(sys.stdout, index=False)
+    return 0
+
+
+def comando_cubos(args) -> int:
+    from calculos.cal_concreto import resistencia_cubo_lote
+
+    df = _leer_tabla(args.entrada)
+    df["Resistencia (MPa)"] = resistencia_cubo_lote(df["Fuerza (kN)"])
+    if "Válido" not in df.columns:
+        df["Válido"] = True
+
+    if args.salida:
+        _escribir_tabla(df, args.salida)
+    else:
+        df.to_csv(sys.stdout, index=False)
+
+    if "Lote" in df.columns:
+        validos = df[df["Válido"].astype(bool)]
+        resumen = validos.groupby("Lote")["Resistencia (MPa)"].agg(["count", "mean", "min", "max", "std"])
+        resumen["cv_%"] = resumen["std"] / resumen["mean"] * 100
+        print(resumen.round(2).to_string(), file=sys.stderr)
+    return 0
+
+
+def comando_granulometria(args) -> int:
+    import numpy as np
+    import pandas as pd
+
+    from calculos.granulometria import alinear_tamices, analizar_granulometria, clasificador_catalogo
+    from utils.limites_granulometria import cargar_limites
+
+    df = _leer_tabla(args.entrada)
+    if "Muestra" not in df.columns:
+        df["Muestra"] = args.entrada.stem
+    if "Agregado" not in df.columns:
+        if not args.agregado:
+            print("Indica --agregado o incluye una columna 'Agregado'", file=sys.stderr)
+            return 2
+        df["Agregado"] = args.agregado
+
+    catalogo = cargar_limites()
+    claves = ["Muestra", "Agregado", "Tamiz (mm)"]
+    calculados, resumenes = [], []
+    for agregado, grupo in df.groupby("Agregado", sort=False):
+        # Todas las muestras del agregado en una sola llamada: una fila por muestra, una columna por tamiz
+        retenido = grupo.pivot_table(
+            index="Muestra", columns="Tamiz (mm)", values="Retenido (g)", aggfunc="sum", sort=False
+        ).sort_index(axis=1, ascending=False)
+        tamices = retenido.columns.to_numpy(dtype=float)
+        por_muestra = grupo.groupby("Muestra", sort=False)
+        if "Peso inicial (g)" in grupo.columns:
+            peso = por_muestra["Peso inicial (g)"].first().reindex(retenido.index).to_numpy(dtype=float)
+        else:
+            peso = retenido.sum(axis=1).to_numpy()
+        fondo = por_muestra["Fondo (g)"].first().reindex(retenido.index).fillna(0.0).to_numpy(dtype=float) \
+            if "Fondo (g)" in grupo.columns else 0.0
+
+        limites = catalogo.get(str(agregado))
+        indices = alinear_tamices(tamices, limites.tamiz_mm) if limites else None
+        if indices is None:
+            print(f"Sin franja de '{agregado}' para estos tamices; no se evalúan límites", file=sys.stderr)
+            limite_min = limite_max = None
+        else:
+            limite_min, limite_max = limites.limite_min[indices], limites.limite_max[indices]
+
+        r = analizar_granulometria(tamices, retenido.fillna(0.0).to_numpy(), peso, limite_min, limite_max, fondo)
+        clasificacion = clasificador_catalogo().clasificar(tamices, retenido.fillna(0.0).to_numpy(), peso, fondo)
+        n = len(retenido)
+        bloque = pd.DataFrame({
+            "Muestra": np.repeat(retenido.index.to_numpy(), len(tamices)),
+            "Agregado": agregado,
+            "Tamiz (mm)": np.tile(tamices, n),
+            "Retenido (g)": retenido.to_numpy().ravel(),
+            "% Retenido": r.retenido_pct.ravel(),
+            "% Retenido Acumulado": r.acumulado_pct.ravel(),
+            "% Pasante": r.pasante_pct.ravel(),
+            "Dentro de franja": r.dentro_limites.ravel() if indices is not None else np.nan,
+        })
+        # Tamices que una muestra no tenía en la entrada
+        calculados.append(bloque[~np.isnan(bloque["Retenido (g)"].to_numpy())])
+        resumenes.append(pd.DataFrame({
+            "Muestra": retenido.index,
+            "Agregado": agregado,
+            "MF": r.modulo_finura,
+            "Pérdida %": r.perdida_pct,
+            "Cumple": r.cumple if indices is not None else np.nan,
+            "Desv. máx": r.desviacion_max if indices is not None else np.nan,
+            "Franjas que cumple": [", ".join(clasificacion.franjas_que_cumple(i)) for i in range(n)],
+        }))
+
+    extras = [c for c in df.columns if c not in claves and c != "Retenido (g)"]
+    resultados = pd.concat(calculados, ignore_index=True).merge(
+        df[claves + extras], on=claves, how="left"
+    )
+    print(pd.concat(resumenes, ignore_index=True).round(2).to_string(index=False), file=sys.stderr)
+
+    if args.salida:
+        _escribir_tabla(resultados, args.salida)
+    elif not args.pdf:
+        resultados.to_csv(sys.stdout, index=False)
+
+    if args.pdf:
+        from utils.report.lote import TrabajoInforme, exportar_informes
+
+        columnas = ["Tamiz (mm)", "% Retenido", "% Retenido Acumulado", "% Pasante"]
+        trabajos = [
+            TrabajoInforme(
+                nombre=f"granulometria_{muestra}",
+                tipo="granulometria",
+                resultados=grupo[columnas].reset_index(drop=True),
+                encabezado=_encabezado(args),
+                muestra=str(muestra),
+                tipo_agregado=str(agregado),
+            )
+            for (muestra, agregado), grupo in resultados.groupby(["Muestra", "Agregado"], sort=False)
+        ]
+        resultado = exportar_informes(trabajos, args.pdf, progreso=_mostrar_progreso, max_procesos=args.procesos)
+        if resultado.errores:
+            return 1
+    return 0
+
+
+def comando_archivar(args) -> int:
+    from utils.almacenamiento import obtener_almacen
+    from utils.archivo_parquet import archivar_almacen
+
+    escritas = archivar_almacen(
+        obtener_almacen(), args.destino, tablas=args.tablas, desde=args.desde, hasta=args.hasta
+    )
+    for tabla, filas in escritas.items():
+        print(f"{tabla}: {filas} filas archivadas en {args.destino / tabla}", file=sys.stderr)
+    return 0
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="lab_cli", description="Cálculos e informes del laboratorio por lotes")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    def comunes(sub):
+        sub.add_argument("entrada", type=Path, help="Archivo CSV o Parquet")
+        sub.add_argument("-o", "--salida", type=Path, help="Tabla de resultados (.csv o .parquet)")
+        sub.add_argument("--ciudad")
+        sub.add_argument("--obra")
+        sub.add_argument("--desarrollado-por", dest="desarrollado_por")
+        sub.add_argument("--procesos", type=int, help="Procesos para generar informes en paralelo")
+
+    cilindros = subparsers.add_parser("cilindros", help="Resistencia, densidad y evolución de cilindros (NTC 673)")
+    comunes(cilindros)
+    cilindros.add_argument("--pdf", type=Path, help="Informe PDF con todos los resultados")
+    cilindros.add_argument("--por-obra", type=Path, help="Carpeta o .zip con un informe PDF por obra")
+    cilindros.set_defaults(funcion=comando_cilindros)
+
+    cubos = subparsers.add_parser("cubos", help="Resistencia de cubos de mortero (NTC 220)")
+    comunes(cubos)
+    cubos.set_defaults(funcion=comando_cubos)
+
+    granulometria = subparsers.add_parser("granulometria", help="Porcentajes granulométricos (NTC 174)")
+    comunes(granulometria)
+    granulometria.add_argument("--agregado", help="Tipo de agregado si la entrada no tiene columna 'Agregado'")
+    granulometria.add_argument("--pdf", type=Path, help="Carpeta o .zip con un informe PDF por muestra")
+    granulometria.set_defaults(funcion=comando_granulometria)
+
+    archivar = subparsers.add_parser(
+        "archivar", help="Copia el historial de SQLite al archivo Parquet por mes (reemplaza los meses archivados)"
+    )
+    archivar.add_argument("destino", type=Path, help="Carpeta del archivo")
+    archivar.add_argument("--desde", help="Fecha inicial (aaaa-mm-dd o dd/mm/aaaa); se archiva desde el inicio de su mes")
+    archivar.add_argument("--hasta", help="Fecha final, incluida; se archiva hasta el final de su mes")
+    archivar.add_argument("--tablas", nargs="+", choices=("cilindros", "cubos", "granulometrias"),
+                          default=["cilindros", "cubos", "granulometrias"])
+    archivar.set_defaults(funcion=comando_archivar)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = crear_parser().parse_args(argv)
+    return args.funcion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
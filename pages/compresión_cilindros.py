@@ -1,9 +1,17 @@
+import math
 import streamlit as st
 import pandas as pd
 from datetime import date
 from calculos.cal_concreto import area_cilindro, resistencia_compresion, evolucion_resistencia , volumen_cilindro, densidad_cilindro
-from utils.report.compresion_cilindros_pdf import compresion_cilindros_pdf as generar_pdf
-from utils.factores_ld import factor_ld
+from utils.report.cache_pdf import clave_pdf, pdf_en_cache
+from utils.factores_ld import factor_ld_for
+from utils.datos_referencia import datos_referencia
+from utils.registro_ensayos import RegistroEnsayos
+from utils.almacenamiento import POR_PAGINA, obtener_almacen
+from calculos.conformidad import EDAD_DISENO, ControlConformidad
+from calculos.madurez import COLUMNAS_AJUSTE, EDAD_REFERENCIA, ajuste_en_cache, fc_por_familia
+from utils.instrumentacion import fragmento
+from utils.memoria_sesion import CacheLRU, controlar_memoria
 
 # ========================================
 # CONFIGURACIÓN INICIAL
@@ -80,20 +88,22 @@ st.markdown(css, unsafe_allow_html=True)
 #  AUXILIARES
 # ========================================
 
-TIPOS_FALLA = [
-    "Tipo 1: conos bien formados en ambos extremos",
-    "Tipo 2: cono bien formado en un extremo",
-    "Tipo 3: fisuras verticales  a traves de ambos extremos",
-    "Tipo 4: fractura diagonal sin fisuras",
-    "Tipo 5: fracturas en los lados en la parte superior o inferior",
-    "Tipo 6: extremo puntiagudo",
-]
+referencia = datos_referencia()
+
+ALTURA_MAX_TABLA = 600  # px; unas 16 filas visibles
 
 # Inicializar estado de sesión
-if "df_ensayos" not in st.session_state:
-    st.session_state.df_ensayos = pd.DataFrame(columns=["Muestra", "Fecha", "Edad(d)",  "Diámetro(mm)", "Altura(mm)", "Densidad(kg/m3)", "Carga Máxima(kN)", "Resistencia(MPa)", "Evolución(%)", "Tipo Falla"])
+if "registro_ensayos" not in st.session_state:
+    st.session_state.registro_ensayos = RegistroEnsayos()
+
+registro = st.session_state.registro_ensayos
 
-df_ensayos = st.session_state.df_ensayos
+# Conformidad por clase f'c; se actualiza con cada ensayo registrado
+if "conformidad" not in st.session_state:
+    st.session_state.conformidad = ControlConformidad.desde_registros(registro.dataframe().to_dict("records"))
+    st.session_state.cartas_control = CacheLRU()
+
+conformidad = st.session_state.conformidad
 
 # Inicializar encabezado PDF (si no existe)
 if "pdf_encabezado" not in st.session_state:
@@ -105,6 +115,13 @@ if "pdf_encabezado" not in st.session_state:
         "desarrollado_por": "Daniel Ramírez",
     }
 
+if "pdfs_generados" not in st.session_state:
+    st.session_state.pdfs_generados = CacheLRU()
+
+# Cada sección es un fragmento: cambiar un widget vuelve a ejecutar solo su sección. Las acciones
+# que cambian datos de otras secciones (registrar un ensayo, guardar el encabezado) piden un
+# rerun de la página completa.
+
 col1, col2, col3 = st.columns([5,3,2])
 
 with col1:
@@ -132,144 +149,390 @@ with col3:
     )
 
 
+@fragmento("cilindros/encabezado")
+def seccion_encabezado():
+    # Formulario compacto (entre título y "Registro de Ensayo")
+    with st.form("form_encabezado_pdf", clear_on_submit=False):
+        c1, c2, c3, c4 = st.columns([2, 2, 3, 3])
+        with c1:
+            ciudad = st.text_input("Ciudad", value=st.session_state.pdf_encabezado["ciudad"])
+        with c2:
+            fecha_gen = st.text_input("Fecha generación", value=st.session_state.pdf_encabezado["fecha_generacion"])
+        with c3:
+            obra = st.text_input("Obra", value=st.session_state.pdf_encabezado["obra"])
+        with c4:
+            desarrollado_por = st.text_input("Elaborado por", value=st.session_state.pdf_encabezado["desarrollado_por"])
+
+        guardar_hdr = st.form_submit_button("Guardar encabezado", use_container_width=True)
+
+    if guardar_hdr:
+        st.session_state.pdf_encabezado = {
+            "ciudad": ciudad.strip(),
+            "fecha_generacion": fecha_gen.strip(),
+            "obra": obra.strip(),
+            "desarrollado_por": desarrollado_por.strip(),
+        }
+        # El encabezado cambia la clave del PDF de la sección de exportación
+        st.rerun()
+
+
+@fragmento("cilindros/registro")
+def seccion_registro():
+    st.markdown("### Registro de Ensayo")
+
+    # Mensaje del último registro (se muestra después del rerun de la página)
+    aviso = st.session_state.pop("aviso_registro", None)
+    if aviso:
+        st.success(aviso[0])
+        if aviso[1]:
+            st.warning(aviso[1])
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        muestra = st.text_input("Nombre de la muestra", placeholder="Ej: Muestra 1")
+        dimensiones = st.selectbox("Dimensiones del cilindro", ["100x200 mm", "150x300 mm", "Otras dimensiones"], help="Selecciona las dimensiones estándar o elige 'Otras dimensiones' para ingresar medidas personalizadas")
+        peso = st.number_input("Peso (kg)", value= None , placeholder="Ej: 3,5")
+
+        # Asignar valores de diámetro y altura según dimensiones
+        if dimensiones == "100x200 mm":
+            diametro_default = 100
+            altura_default = 200
+        elif dimensiones == "150x300 mm":
+            diametro_default = 150
+            altura_default = 300
+        else:
+            diametro_default = 100
+            altura_default = 100
+
+    with col2:
+        fc = st.number_input("F'c (MPa)", min_value=15.0, step= 1.0)
+        diametro = st.number_input("Diámetro (mm)", min_value=1.0, value=float(diametro_default), step=0.1)
+        area = area_cilindro(diametro)
+
+        with st.container(border=True):
+            carga = st.number_input("Carga (kN)", min_value=1.0, step=0.1)
+
+
+    with col3:
+
+        edad = st.selectbox("Edad (días)", referencia.edades_cilindros)  
+        altura = st.number_input("Altura (mm)", min_value=1.0, value=float(altura_default), step=0.1)
+        tipo_falla = st.selectbox("Tipo de Falla", referencia.tipos_falla)
+        rel_ld = altura / diametro
+        factor_ld_value = factor_ld_for(rel_ld) if 1.0 <= rel_ld <= 1.99 else 1.0
+
+        # Calcular resistencia
+    if dimensiones == "Otras dimensiones" and 1.0 <= rel_ld <= 1.99:
+        resistencia = resistencia_compresion(carga, diametro)
+        resistencia = round(resistencia * factor_ld_value, 2)
+        evolucion = evolucion_resistencia(fc, resistencia)
+
+    elif dimensiones != "Otras dimensiones" and carga > 0 and diametro > 0:
+        resistencia = resistencia_compresion(carga, diametro)
+        evolucion = evolucion_resistencia(fc, resistencia)
+    else:
+        st.error("La relación L/D debe estar entre 1.00 y 2.00 para cilindros de otras dimensiones.")
+
+    # Calcular densidad
+    if peso == None:
+        peso = 0.0
+    if diametro > 0 and altura > 0:
+        volumen = volumen_cilindro(diametro, altura)
+        densidad = densidad_cilindro(volumen, float(peso))
+    else:
+        densidad = 0.0
+
+    # Botón para registrar ensayo
+    if st.button("Registrar Ensayo", type="primary"):
+        if muestra and carga > 0:
+            ensayo = {
+                "Muestra": muestra,
+                "Fecha": fecha,
+                "Edad(d)": edad.split(" ")[0],
+                "F'c(MPa)": fc,
+                "Diámetro(mm)": diametro,
+                "Altura(mm)": altura,
+                "Densidad(kg/m3)": densidad,
+                "Carga Máxima(kN)": carga,
+                "Resistencia(MPa)": resistencia,
+                "Evolución(%)": evolucion,
+                "Tipo Falla": tipo_falla[:6],
+            }
+            registro.agregar(ensayo)
+            evaluacion = conformidad.agregar(ensayo)
+            obtener_almacen().guardar_cilindros([
+                {**ensayo, "Peso(kg)": peso, "Obra": st.session_state.pdf_encabezado["obra"]}
+            ])
+            advertencia = None
+            if evaluacion is not None and evaluacion.bajo_individual:
+                advertencia = (
+                    f"El resultado de {muestra} ({evaluacion.resultado_mpa:.2f} MPa) está por debajo del "
+                    f"límite individual ({conformidad.clases[fc].limite_individual:g} MPa)"
+                )
+            st.session_state.aviso_registro = ("Ensayo registrado correctamente", advertencia)
+            # Tabla, conformidad, ajuste, exportación e historial dependen del nuevo ensayo
+            st.rerun()
+        else:
+            st.error("Completa todos los campos obligatorios: muestra y carga")
+
+
+@fragmento("cilindros/importacion")
+def seccion_importacion():
+    with st.expander("Importar archivo de la prensa (CSV o Excel)", expanded="resumen_importacion" in st.session_state):
+        resumen = st.session_state.pop("resumen_importacion", None)
+        if resumen is not None:
+            st.success(f"{resumen.importadas} de {resumen.filas} filas importadas")
+            if len(resumen.invalidos):
+                st.warning(f"{len(resumen.invalidos)} filas descartadas por datos inválidos")
+                st.dataframe(resumen.invalidos, use_container_width=True, hide_index=True, height=200)
+                st.download_button(
+                    "Descargar filas descartadas",
+                    data=resumen.invalidos.to_csv(index=False).encode("utf-8"),
+                    file_name="filas_descartadas.csv",
+                    mime="text/csv",
+                    on_click="ignore",
+                )
+
+        # Al terminar se cambia la clave para vaciar el selector de archivo
+        version = st.session_state.get("importacion_version", 0)
+        archivo = st.file_uploader(
+            "Archivo",
+            type=["csv", "txt", "xlsx"],
+            key=f"archivo_prensa_{version}",
+            help="Columnas reconocidas: muestra, fecha, edad, f'c, diámetro, altura, peso, carga y tipo de falla "
+                 "(también en inglés). Sin altura se asume L/D = 2.",
+        )
+        if st.button("Importar", disabled=archivo is None):
+            from utils.importacion import importar_ensayos
+
+            almacen = obtener_almacen()
+
+            def al_importar(bloque):
+                registro.extender(bloque)
+                almacen.guardar_cilindros(bloque.to_dict("records"))
+                for ensayo in bloque[["Muestra", "Edad(d)", "F'c(MPa)", "Resistencia(MPa)"]].to_dict("records"):
+                    conformidad.agregar(ensayo)
+
+            try:
+                with st.spinner("Importando..."):
+                    resumen = importar_ensayos(
+                        archivo, nombre=archivo.name, obra=st.session_state.pdf_encabezado["obra"] or None,
+                        al_importar=al_importar,
+                    )
+            except (ValueError, ImportError) as error:
+                st.error(str(error))
+            else:
+                st.session_state.resumen_importacion = resumen
+                st.session_state.importacion_version = version + 1
+                st.rerun()
 
-# Formulario compacto (entre título y "Registro de Ensayo")
-with st.form("form_encabezado_pdf", clear_on_submit=False):
-    c1, c2, c3, c4 = st.columns([2, 2, 3, 3])
-    with c1:
-        ciudad = st.text_input("Ciudad", value=st.session_state.pdf_encabezado["ciudad"])
-    with c2:
-        fecha_gen = st.text_input("Fecha generación", value=st.session_state.pdf_encabezado["fecha_generacion"])
-    with c3:
-        obra = st.text_input("Obra", value=st.session_state.pdf_encabezado["obra"])
-    with c4:
-        desarrollado_por = st.text_input("Elaborado por", value=st.session_state.pdf_encabezado["desarrollado_por"])
-
-    guardar_hdr = st.form_submit_button("Guardar encabezado", use_container_width=True)
-
-if guardar_hdr:
-    st.session_state.pdf_encabezado = {
-        "ciudad": ciudad.strip(),
-        "fecha_generacion": fecha_gen.strip(),
-        "obra": obra.strip(),
-        "desarrollado_por": desarrollado_por.strip(),
-    }
-   
 
-st.markdown("### Registro de Ensayo")
+# ========================================
+# SECCIÓN 2: TABLA DE RESULTADOS
+# ========================================
+@fragmento("cilindros/resultados")
+def seccion_resultados():
+    st.markdown("### Resultados", help="para descargar resultados en formato csv use el icono de descarga contenido en el grupo de iconos de la esquina superior derecha de esta tabla")
+
+    df_ensayos = registro.dataframe()
+
+    if not df_ensayos.empty:
+        # Mostrar tabla
+        df_display = df_ensayos
+
+        # Altura dinámica según número de ensayos (filas), con tope: con importaciones de miles de
+        # filas la tabla se desplaza en lugar de crecer
+        altura_tabla = min(38 + (len(df_display) * 35), ALTURA_MAX_TABLA)  # header + filas
+
+        st.dataframe(
+            df_display,
+            use_container_width=True,
+            hide_index=True,
+            height=altura_tabla,
+            # Medidas en float32 y fecha como datetime (TIPOS_ENSAYOS): se muestran como en el PDF
+            column_config={
+                "Fecha": st.column_config.DateColumn(format="DD/MM/YYYY"),
+                "F'c(MPa)": st.column_config.NumberColumn(format="%.1f"),
+                "Diámetro(mm)": st.column_config.NumberColumn(format="%.1f"),
+                "Altura(mm)": st.column_config.NumberColumn(format="%.1f"),
+                "Densidad(kg/m3)": st.column_config.NumberColumn(format="%.2f"),
+                "Carga Máxima(kN)": st.column_config.NumberColumn(format="%.2f"),
+                "Resistencia(MPa)": st.column_config.NumberColumn(format="%.2f"),
+                "Evolución(%)": st.column_config.NumberColumn(format="%.2f"),
+            },
+        )
+        if registro.filas_en_disco:
+            st.caption(
+                f"Se muestran los {len(registro)} ensayos más recientes; los {registro.filas_en_disco} "
+                "anteriores se pasaron a disco para liberar memoria y se incluyen en el PDF."
+            )
+        
+    else:
+        st.info("No se han registrado ensayos aún. Completa el formulario para agregar resultados.")
 
-col1, col2, col3 = st.columns(3)
 
-with col1:
-    muestra = st.text_input("Nombre de la muestra", placeholder="Ej: Muestra 1")
-    dimensiones = st.selectbox("Dimensiones del cilindro", ["100x200 mm", "150x300 mm", "Otras dimensiones"], help="Selecciona las dimensiones estándar o elige 'Otras dimensiones' para ingresar medidas personalizadas")
-    peso = st.number_input("Peso (kg)", value= None , placeholder="Ej: 3,5")
-
-    # Asignar valores de diámetro y altura según dimensiones
-    if dimensiones == "100x200 mm":
-        diametro_default = 100
-        altura_default = 200
-    elif dimensiones == "150x300 mm":
-        diametro_default = 150
-        altura_default = 300
-    else:
-        diametro_default = 100
-        altura_default = 100
+# ========================================
+# CONFORMIDAD (promedios móviles por clase f'c)
+# ========================================
+@fragmento("cilindros/conformidad")
+def seccion_conformidad():
+    st.markdown(
+        f"### Conformidad a {EDAD_DISENO} días",
+        help="Cada resultado es el promedio de los cilindros consecutivos de una misma muestra. "
+             "Se evalúa el promedio de tres resultados consecutivos contra f'c y cada resultado "
+             "contra f'c - 3.5 MPa (0.90 f'c por encima de 35 MPa).",
+    )
 
-with col2:
-    fc = st.number_input("F'c (MPa)", min_value=15.0, step= 1.0)
-    diametro = st.number_input("Diámetro (mm)", min_value=1.0, value=float(diametro_default), step=0.1)
-    area = area_cilindro(diametro)
+    if not conformidad.clases:
+        st.info(f"Registra ensayos a {EDAD_DISENO} días para ver los promedios móviles y el gráfico de control.")
+        return
 
-    with st.container(border=True):
-        carga = st.number_input("Carga (kN)", min_value=1.0, step=0.1)
+    st.dataframe(
+        pd.DataFrame(conformidad.resumen()),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Media (MPa)": st.column_config.NumberColumn(format="%.2f"),
+            "Desv (MPa)": st.column_config.NumberColumn(format="%.2f"),
+            "Última media móvil (MPa)": st.column_config.NumberColumn(format="%.2f"),
+        },
+    )
+    clases_fc = sorted(conformidad.clases)
+    fc_carta = st.selectbox("Clase f'c (MPa)", clases_fc, format_func=lambda v: f"{v:g}", key="fc_carta_control")
+    clase = conformidad.clases[fc_carta]
 
+    # El gráfico solo se vuelve a dibujar cuando la clase recibe un cilindro nuevo
+    version, png = st.session_state.cartas_control.get(fc_carta, (None, None))
+    if version != clase.version:
+        # matplotlib se importa la primera vez que hay un gráfico que dibujar
+        from utils.graficos import carta_control, figura_png
 
-with col3:
+        fig = carta_control(clase.fc, clase.limite_individual, **clase.arreglos())
+        png = figura_png(fig)
+        st.session_state.cartas_control[fc_carta] = (clase.version, png)
+    st.image(png)
 
-    edad = st.selectbox("Edad (días)", ["1 (+- 0.5h)", "3 (+-2h)", "7 (+-6h)", "28 (+-20h)", "90 (48h)"])  
-    altura = st.number_input("Altura (mm)", min_value=1.0, value=float(altura_default), step=0.1)
-    tipo_falla = st.selectbox("Tipo de Falla", TIPOS_FALLA)
-    rel_ld = altura / diametro
-    factor_ld_value = factor_ld.loc[factor_ld["ld"] == round(rel_ld, 2), "factor"].values[0] if 1.0 <= rel_ld <= 1.99 else 1.0
-
-    # Calcular resistencia
-if dimensiones == "Otras dimensiones" and 1.0 <= rel_ld <= 1.99:
-    resistencia = resistencia_compresion(carga, diametro)
-    resistencia = round(resistencia * factor_ld_value, 2)
-    evolucion = evolucion_resistencia(fc, resistencia)
-
-elif dimensiones != "Otras dimensiones" and carga > 0 and diametro > 0:
-    resistencia = resistencia_compresion(carga, diametro)
-    evolucion = evolucion_resistencia(fc, resistencia)
-else:
-    st.error("La relación L/D debe estar entre 1.00 y 2.00 para cilindros de otras dimensiones.")
-
-# Calcular densidad
-if peso == None:
-    peso = 0.0
-if diametro > 0 and altura > 0:
-    volumen = volumen_cilindro(diametro, altura)
-    densidad = densidad_cilindro(volumen, float(peso))
-else:
-    densidad = 0.0
-
-# Botón para registrar ensayo
-if st.button("Registrar Ensayo", type="primary"):
-    if muestra and carga > 0:
-        nuevo_ensayo = pd.DataFrame({
-            "Muestra": [muestra],
-            "Fecha": [fecha],       
-            "Edad(d)": [edad.split(" ")[0]],
-            "Diámetro(mm)": [diametro],
-            "Altura(mm)": [altura],
-            "Densidad(kg/m3)": [densidad],            
-            "Carga Máxima(kN)": [carga],
-            "Resistencia(MPa)": [resistencia],
-            "Evolución(%)": [evolucion],
-            "Tipo Falla": [tipo_falla[:6]],
-        })
-        
-        st.session_state.df_ensayos = pd.concat([st.session_state.df_ensayos, nuevo_ensayo], ignore_index=True)
-        st.success("Ensayo registrado correctamente")
-    else:
-        st.error("Completa todos los campos obligatorios: muestra y carga")
 
 # ========================================
-# SECCIÓN 2: TABLA DE RESULTADOS
+# DESARROLLO DE RESISTENCIA (ajuste por muestra)
 # ========================================
-st.divider()
-st.markdown("### Resultados", help="para descargar resultados en formato csv use el icono de descarga contenido en el grupo de iconos de la esquina superior derecha de esta tabla")
-
-if not st.session_state.df_ensayos.empty:
-    # Mostrar tabla
-    df_display = st.session_state.df_ensayos.copy()
-
-    # Altura dinámica según número de ensayos (filas)
-    altura_tabla = 38 + (len(df_display) * 35)  # header + filas
+@fragmento("cilindros/desarrollo")
+def seccion_desarrollo():
+    st.markdown(
+        "### Desarrollo de resistencia",
+        help=f"Curva resistencia-edad por muestra: f = a + b·ln(edad) con dos o más edades, o la curva "
+             f"de ACI 209R (cemento tipo I, curado húmedo) con una sola edad. Estima la resistencia a "
+             f"{EDAD_REFERENCIA} días a partir de las roturas tempranas.",
+    )
 
+    df_ensayos = registro.dataframe()
+    if df_ensayos.empty:
+        st.info("Registra ensayos de una muestra a distintas edades para estimar su resistencia a 28 días.")
+        return
+
+    # La tabla se recalcula solo cuando cambia el registro (versión). Con ensayos descargados a disco
+    # el ajuste usa todos, leyendo solo sus columnas: las roturas de una muestra pueden quedar a
+    # ambos lados de la descarga
+    guardada = st.session_state.get("tabla_desarrollo")
+    if guardada is None or guardada[0] != registro.version:
+        df_ajuste = pd.concat(registro.bloques(COLUMNAS_AJUSTE), ignore_index=True)
+        ajuste = ajuste_en_cache(st.session_state, registro.version, df_ajuste)
+        guardada = (registro.version, ajuste.dataframe(fc_por_familia(df_ajuste, ajuste)))
+        st.session_state.tabla_desarrollo = guardada
     st.dataframe(
-        df_display,
+        guardada[1],
         use_container_width=True,
         hide_index=True,
-        height=altura_tabla
+        column_config={
+            "a (MPa)": st.column_config.NumberColumn(format="%.2f"),
+            "b (MPa/ln d)": st.column_config.NumberColumn(format="%.2f"),
+            f"Estimada {EDAD_REFERENCIA} d (MPa)": st.column_config.NumberColumn(format="%.2f"),
+            f"Estimada {EDAD_REFERENCIA} d (% f'c)": st.column_config.NumberColumn(format="%.1f"),
+        },
     )
-    
-else:
-    st.info("No se han registrado ensayos aún. Completa el formulario para agregar resultados.")
 
+
+# ========================================
+# EXPORTACIÓN PDF
+# ========================================
+@fragmento("cilindros/exportacion")
+def seccion_exportacion():
+    df_ensayos = registro.dataframe()
+
+    # El PDF solo se construye al pedirlo; se guarda por hash de resultados + encabezado
+    clave = (
+        clave_pdf(df_ensayos, st.session_state.pdf_encabezado, registro.filas_en_disco)
+        if not df_ensayos.empty
+        else None
+    )
+
+    def construir_pdf():
+        # ReportLab solo se importa cuando se pide un PDF
+        from utils.report.compresion_cilindros_pdf import compresion_cilindros_pdf, compresion_cilindros_pdf_lote
+
+        if registro.filas_en_disco:
+            # Ensayos descargados a disco y los de memoria, por bloques
+            return compresion_cilindros_pdf_lote(registro.bloques(), st.session_state.pdf_encabezado)
+        return compresion_cilindros_pdf(df_ensayos, st.session_state.pdf_encabezado)
+
+    if st.button("Generar PDF", type="secondary", disabled=df_ensayos.empty):
+        pdf_en_cache(st.session_state.pdfs_generados, clave, construir_pdf)
+
+    if clave in st.session_state.pdfs_generados:
+        st.download_button(
+            label="Descargar PDF",
+            data=st.session_state.pdfs_generados[clave],
+            file_name=f"ensayos_compresion_{date.today().isoformat()}.pdf",
+            mime="application/pdf",
+            type="primary",
+            on_click="ignore",
+        )
+
+
+# ========================================
+# SECCIÓN 3: HISTORIAL (SQLite local)
+# ========================================
+@fragmento("cilindros/historial")
+def seccion_historial():
+    st.markdown("### Historial", help="Ensayos guardados en este equipo; se consultan por páginas")
+
+    almacen = obtener_almacen()
+    h1, h2, h3 = st.columns([4, 2, 2])
+    with h1:
+        filtro_muestra = st.text_input("Muestra", key="hist_muestra", placeholder="Todas")
+    with h2:
+        filtro_edad = st.selectbox("Edad (días)", ["Todas", "1", "3", "7", "28", "90"], key="hist_edad")
+
+    filtros = {
+        "muestra": filtro_muestra.strip() or None,
+        "edad": None if filtro_edad == "Todas" else filtro_edad,
+    }
+    total_historial = almacen.contar_cilindros(**filtros)
+    paginas = max(1, math.ceil(total_historial / POR_PAGINA))
+    with h3:
+        pagina = st.number_input("Página", min_value=1, max_value=paginas, value=1, step=1, key="hist_pagina")
+
+    if total_historial:
+        st.dataframe(almacen.consultar_cilindros(pagina - 1, **filtros), use_container_width=True, hide_index=True)
+        st.caption(f"{total_historial} ensayos guardados · página {pagina} de {paginas}")
+    else:
+        st.info("No hay ensayos guardados con estos filtros.")
+
+
+seccion_encabezado()
+seccion_registro()
+seccion_importacion()
 st.divider()
-pdf_data = (
-    generar_pdf(st.session_state.df_ensayos, st.session_state.pdf_encabezado)
-    if not st.session_state.df_ensayos.empty
-    else b""
-)
-st.download_button(
-    label="Generar PDF",
-    data=pdf_data,
-    file_name=f"ensayos_compresion_{date.today().isoformat()}.pdf",
-    mime="application/pdf",
-    type="secondary",
-    disabled=st.session_state.df_ensayos.empty,
-)
+seccion_resultados()
+st.divider()
+seccion_conformidad()
+st.divider()
+seccion_desarrollo()
+st.divider()
+seccion_exportacion()
+st.divider()
+seccion_historial()
 
+# PDF, cartas y ensayos antiguos se liberan si la sesión pasa del presupuesto de memoria
+controlar_memoria()
@@ -1,9 +1,14 @@
+import math
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
 from datetime import date, datetime
-from utils.report.granulometria_pdf import granulometria_pdf
+from utils.datos_referencia import datos_referencia
+from utils.grafico_granulometria import grafico_granulometria
+from utils.tabla_editable import tabla_editable
+from calculos.granulometria import PERDIDA_MAX_PCT, analizar_granulometria, clasificador_catalogo
+from utils.report.cache_pdf import clave_pdf, pdf_en_cache
+from utils.almacenamiento import POR_PAGINA, obtener_almacen
+from utils.memoria_sesion import CacheLRU, controlar_memoria
 
 
 # ========================================
@@ -144,16 +149,14 @@ with col2:
 
 with col3:
     try:
-        df = pd.read_csv('utils/gram_limites.txt')
-        df["tamaño-tmn"] = df.apply(
-        lambda x: f"#{x['#tamanio']}-{x['TMN']}"
-        if x["#tamanio"].isdigit()
-        else x["TMN"],
-        axis=1
-)
-        agg = st.selectbox("Selecciona el tipo de agregado", options=df['tamaño-tmn'].unique(), index=0, key='TMN_select')
-        df_agg = df[df['tamaño-tmn'] == agg].copy()
-        df_agg = df_agg.sort_values('tamiz_mm', ascending=False)
+        catalogo = datos_referencia().limites
+        agg = st.selectbox("Selecciona el tipo de agregado", options=list(catalogo), index=0, key='TMN_select')
+        limites = catalogo[agg]
+        df_agg = pd.DataFrame({
+            "tamiz_mm": limites.tamiz_mm,
+            "limite_min": limites.limite_min,
+            "limite_max": limites.limite_max,
+        })
     except FileNotFoundError:
         st.error("Archivo 'gram_limites.txt' no encontrado")
         st.stop()
@@ -169,141 +172,177 @@ st.write(f"### Límites Granulométricos y resultados ensayo - {agg}")
 col1, col2, col3, = st.columns([4,3,3])
 with col1:
     peso_muestra = st.number_input("Peso inicial (g)", value = 100.0,  step = 0.1 )
+with col2:
+    fondo_g = st.number_input("Fondo (g)", min_value=0.0, value=0.0, step=0.1, help="Masa que pasa el último tamiz")
+
+# Entrada por tipo de agregado: se conserva al cambiar de agregado y volver
+clave_tamices = f"tamices_{agg}"
+if clave_tamices not in st.session_state:
+    st.session_state[clave_tamices] = pd.DataFrame({
+        'Tamiz (mm)': limites.tamiz_mm,
+        'Límite Máx (%)': limites.limite_max,
+        'Límite Mín (%)': limites.limite_min,
+        'Retenido (g)': 0.0,
+    })
+
+
+def analizar(retenido):
+    return analizar_granulometria(
+        limites.tamiz_mm, retenido, peso_muestra, limites.limite_min, limites.limite_max, fondo_g=fondo_g
+    )
+
+
+def calcular_porcentajes(entrada):
+    retenido = entrada['Retenido (g)'].fillna(0.0).to_numpy(dtype=float)
+    resultado = analizar(retenido)
+    return entrada.assign(**{
+        'Retenido (g)': retenido,
+        '% Retenido': resultado.retenido_pct,
+        '% Retenido Acumulado': resultado.acumulado_pct,
+        '% Pasante': resultado.pasante_pct,
+        'Dentro de franja': resultado.dentro_limites,
+    })
+
+
+df_display = tabla_editable(
+    clave_tamices,
+    calcular_porcentajes,
+    editables=['Retenido (g)'],
+    column_config={
+        'Tamiz (mm)': st.column_config.NumberColumn(format="%g"),
+        'Retenido (g)': st.column_config.NumberColumn(
+            'Retenido (g) 🖊️', min_value=0.0, max_value=max(peso_muestra, 0.0), step=0.1, format="%.2f", required=True
+        ),
+        '% Retenido': st.column_config.NumberColumn('Retenido (%)', format="%.2f"),
+        '% Retenido Acumulado': st.column_config.NumberColumn('% Ret. Acum.', format="%.2f"),
+        '% Pasante': st.column_config.NumberColumn(format="%.2f"),
+        'Dentro de franja': st.column_config.CheckboxColumn(),
+    },
+    use_container_width=True,
+)
 
-df_display = df_agg[['tamiz_mm', 'limite_max', 'limite_min']].copy()
-df_display.columns = ['Tamiz (mm)', 'Límite Máx (%)', 'Límite Mín (%)']
-# df_display[""]
-df_display['Retenido (g)'] = 0.0
-
-# Crear inputs para la columna Retenido (g)
-
-col_c1, col_c2, col_c3, col_c4, col_c5, col_c6, col_c7 = st.columns(7, gap="small")
-
-with col_c1:
-    st.write("**Tamiz (mm)**")
-with col_c2:
-    st.write("**Límite Máx (%)**")
-with col_c3:
-    st.write("**Límite Mín (%)**")
-with col_c4:
-    st.write("**Retenido (g) 🖊️**")
-with col_c5:
-    st.write("**Retenido (%)**")
-with col_c6:
-    st.write("**% Ret. Acum.**")
-with col_c7:
-    st.write("**% Pasante**")
-
-pasa_inputs = []
-retenido_acumulado = 0.0
-pasante_values = []
-retenido_porcentaje_values = []
-retenido_acumulado_values = []
-
-
-
-for idx, row in df_display.iterrows():
-    col_1, col_2, col_3, col_4, col_5, col_6, col_7 = st.columns(7, gap="small")
-    with col_1:
-        st.write(f"{row['Tamiz (mm)']}")
-    with col_2:
-        st.write(f"{row['Límite Máx (%)']}")
-    with col_3:
-        st.write(f"{row['Límite Mín (%)']}")
-    with col_4:
-        pasa_value = st.number_input(
-            f"Retenido (g) {idx}",
-            min_value=0.0,
-            max_value= peso_muestra,
-            value=0.0,
-            label_visibility="collapsed",
-            key=f"pasa_{idx}"
+# Resumen de la muestra
+resultado = analizar(df_display['Retenido (g)'].to_numpy())
+total_retenido = df_display['Retenido (g)'].sum()
+col_1, col_2, col_3, col_4 = st.columns(4)
+with col_1:
+    st.metric("Total retenido", f"{total_retenido:.2f} g")
+with col_2:
+    st.metric("Módulo de finura", f"{resultado.modulo_finura:.2f}")
+with col_3:
+    st.metric("Pérdida de masa", "-" if math.isnan(resultado.perdida_pct) else f"{resultado.perdida_pct:.2f} %")
+with col_4:
+    st.metric("Franja granulométrica", "Cumple" if resultado.cumple else f"No cumple ({resultado.desviacion_max:.1f} pts)")
+
+if (df_display['Retenido (g)'] > peso_muestra).any():
+    st.warning("Hay tamices con un retenido mayor que el peso inicial de la muestra")
+elif total_retenido > 0 and resultado.perdida_excesiva:
+    st.warning(f"La suma de retenidos y fondo difiere del peso inicial en más de {PERDIDA_MAX_PCT} % (NTC 77)")
+
+# Todas las franjas del catálogo de una vez, para no tener que probarlas una por una
+if total_retenido > 0:
+    clasificacion = clasificador_catalogo().clasificar(
+        df_display['Tamiz (mm)'].to_numpy(), df_display['Retenido (g)'].to_numpy(), peso_muestra, fondo_g
+    )
+    franjas = clasificacion.franjas_que_cumple()
+    with st.expander(f"Franjas que cumple la muestra: {', '.join(franjas) if franjas else 'ninguna'}"):
+        st.dataframe(
+            pd.DataFrame({
+                "Franja": clasificacion.bandas,
+                "Cumple": clasificacion.cumple[0],
+                "Desviación máx (pts)": clasificacion.desviacion_max[0],
+                "Evaluable": clasificacion.evaluable,
+            }),
+            hide_index=True,
+            use_container_width=True,
         )
-        pasa_inputs.append(pasa_value)
-
-    with col_5:
-        retenido_porcentaje = (pasa_value / peso_muestra * 100) if peso_muestra > 0 else 0
-        retenido_porcentaje_values.append(retenido_porcentaje)
-        st.write(f"{retenido_porcentaje:.2f}")
-    
-    with col_6:
-        retenido_acumulado += retenido_porcentaje
-        retenido_acumulado_values.append(retenido_acumulado)
-        st.write(f"{retenido_acumulado:.2f}")
-    
-    
-    with col_7:
-        pasante_porcentaje = 100 - retenido_acumulado
-        pasante_values.append(pasante_porcentaje)
-        st.write(f"{pasante_porcentaje:.2f}")
-        
-df_display['Retenido (g)'] = pasa_inputs
-df_display['% Retenido'] = retenido_porcentaje_values
-df_display['% Retenido Acumulado'] = retenido_acumulado_values
-df_display['% Pasante'] = pasante_values
-
-# Mostrar total de pasante
-col_1, col_2, col_3, col_4, col_5, col_6, col_7 = st.columns(7)
-with col_5:
-    total_pasante = sum(pasa_inputs)
-    st.write(f"**{total_pasante:.2f}**")
 
 # ========================================
 # SECCIÓN 2: GRÁFICO GRANULOMÉTRICO
 # ========================================
 
-fig, ax = plt.subplots(figsize=(10, 6))
-
-# Graficar límites máximos y mínimos
-ax.plot(df_agg['tamiz_mm'], df_agg['limite_max'], 'r--o', label='Límite Máximo', linewidth=1, markersize=6)
-ax.plot(df_agg['tamiz_mm'], df_agg['limite_min'], 'b--o', label='Límite Mínimo', linewidth=1, markersize=6)
+# La figura con los límites se construye una vez por tipo de agregado y se guarda en la
+# sesión; en cada rerun solo cambia la línea de % Pasante
+if "graficos_granulometria" not in st.session_state:
+    st.session_state.graficos_granulometria = CacheLRU()
+grafico = grafico_granulometria(st.session_state.graficos_granulometria, agg, limites)
+st.image(grafico.png(df_display['% Pasante'].to_numpy()))
+fig = grafico.fig
 
-ax.plot(df_display['Tamiz (mm)'], df_display['% Pasante'], 'y--s', label='% Pasante', linewidth=1, markersize=6)
+df_pdf = df_display[["Tamiz (mm)", "% Retenido", "% Retenido Acumulado", "% Pasante"]].copy()
+if "pdfs_generados" not in st.session_state:
+    st.session_state.pdfs_generados = CacheLRU()
 
-# Llenar el área entre límites
-ax.fill_between(df_agg['tamiz_mm'], df_agg['limite_min'], df_agg['limite_max'], alpha=0.2, color='lightgreen')
 
-# Configurar ejes
-ax.set_xlabel('Tamiz (mm)', fontsize=10)
-ax.set_ylabel('Porcentaje Retenido Acumulado (%)', fontsize=10)
-# ax.set_title(f'Límites Granulométricos - Norma NTC174 ({agg})', fontsize=14, fontweight='bold')
-ax.grid(True, alpha=0.5)
-ax.legend(fontsize=10)
+def construir_pdf_granulometria():
+    # ReportLab solo se importa cuando se pide un PDF
+    from utils.report.granulometria_pdf import granulometria_pdf
 
-# Configurar escala logarítmica en eje x
-ax.set_xscale('log')
+    # Compatibilidad con despliegues donde la función PDF aún no tiene el parámetro encabezado.
+    try:
+        return granulometria_pdf(
+            muestra,
+            agg,
+            df_pdf,
+            fig,
+            st.session_state.pdf_encabezado,
+        )
+    except TypeError:
+        return granulometria_pdf(muestra, agg, df_pdf, fig)
+
+
+# El PDF (y el PNG del gráfico) solo se construye al pedirlo; se guarda por hash del contenido
+clave = clave_pdf(df_pdf, st.session_state.pdf_encabezado, muestra, agg)
+if st.button("Generar PDF", type="secondary"):
+    pdf_en_cache(st.session_state.pdfs_generados, clave, construir_pdf_granulometria)
+
+if clave in st.session_state.pdfs_generados:
+    st.download_button(
+        label="Descargar PDF",
+        data=st.session_state.pdfs_generados[clave],
+        file_name=f"granulometria_{date.today().isoformat()}.pdf",
+        mime="application/pdf",
+        type="primary",
+        on_click="ignore",
+    )
 
-tamices = df_agg["tamiz_mm"].values
+if st.button("Guardar en historial", type="primary"):
+    obtener_almacen().guardar_granulometria(
+        {
+            "Muestra": muestra.strip() or "Muestra de ensayo",
+            "Agregado": agg,
+            "Fecha": fecha,
+            "Peso inicial (g)": peso_muestra,
+            "Obra": st.session_state.pdf_encabezado["obra"],
+        },
+        df_display,
+    )
+    st.success("Ensayo guardado en el historial")
 
-ax.set_xticks(tamices)
-ax.set_xticklabels([f"{t:g}" for t in tamices])
+st.divider()
 
-ax.xaxis.set_minor_locator(ticker.NullLocator()) 
+# ========================================
+# SECCIÓN 3: HISTORIAL (SQLite local)
+# ========================================
 
-# Invertir eje x
-ax.invert_xaxis()
+st.write("### Historial de ensayos")
 
-plt.tight_layout()
+almacen = obtener_almacen()
+col1, col2 = st.columns([6, 2])
+with col1:
+    filtro_muestra = st.text_input("Muestra", key="hist_muestra", placeholder="Todas")
 
-st.pyplot(fig, use_container_width = False)
+filtros = {"muestra": filtro_muestra.strip() or None}
+total_historial = almacen.contar_granulometrias(**filtros)
+paginas = max(1, math.ceil(total_historial / POR_PAGINA))
+with col2:
+    pagina = st.number_input("Página", min_value=1, max_value=paginas, value=1, step=1, key="hist_pagina")
 
-df_pdf = df_display[["Tamiz (mm)", "% Retenido", "% Retenido Acumulado", "% Pasante"]].copy()
-# Compatibilidad con despliegues donde la función PDF aún no tiene el parámetro encabezado.
-try:
-    pdf_data = granulometria_pdf(
-        muestra,
-        agg,
-        df_pdf,
-        fig,
-        st.session_state.pdf_encabezado,
-    )
-except TypeError:
-    pdf_data = granulometria_pdf(muestra, agg, df_pdf, fig)
-st.download_button(
-    label="Generar PDF",
-    data=pdf_data,
-    file_name=f"granulometria_{date.today().isoformat()}.pdf",
-    mime="application/pdf",
-    type="secondary",
-)
+if total_historial:
+    st.dataframe(almacen.consultar_granulometrias(pagina - 1, **filtros), use_container_width=True, hide_index=True)
+    st.caption(f"{total_historial} ensayos guardados · página {pagina} de {paginas}")
+else:
+    st.info("No hay ensayos guardados con estos filtros.")
 
+# Gráficos y PDF guardados se liberan si la sesión pasa del presupuesto de memoria
+controlar_memoria()
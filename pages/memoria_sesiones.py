@@ -0,0 +1,146 @@
+import hmac
+import os
+import pandas as pd
+import streamlit as st
+from datetime import datetime
+from utils.instrumentacion import tiempos_recientes
+from utils.memoria_sesion import (
+    MAX_FILAS_EN_MEMORIA,
+    MB,
+    MIN_FILAS_EN_MEMORIA,
+    PRESUPUESTO_MB,
+    controlar_memoria,
+    sesiones_activas,
+)
+
+try:
+    import resource      # Solo en Linux / macOS
+except ImportError:
+    resource = None
+
+# ========================================
+# CONFIGURACIÓN INICIAL
+# ========================================
+
+st.set_page_config(page_title="Memoria de sesiones", layout="wide")
+
+st.title("Memoria de Sesiones")
+
+# ========================================
+# ACCESO
+# ========================================
+
+# Vista de administración: muestra datos de todas las sesiones del servidor. Solo se habilita
+# definiendo LAB_CONCRETO_CLAVE_ADMIN y se pide esa clave una vez por sesión.
+clave_admin = os.environ.get("LAB_CONCRETO_CLAVE_ADMIN", "")
+if not clave_admin:
+    st.info("Vista de administración deshabilitada. Define LAB_CONCRETO_CLAVE_ADMIN en el servidor para usarla.")
+    st.stop()
+
+if not st.session_state.get("admin_memoria"):
+    clave = st.text_input("Clave de administración:", type="password")
+    if not clave:
+        st.stop()
+    if not hmac.compare_digest(clave.encode(), clave_admin.encode()):
+        st.error("Clave incorrecta")
+        st.stop()
+    st.session_state.admin_memoria = True
+    st.rerun()
+
+st.caption(
+    "Bytes aproximados que retiene cada sesión abierta en este servidor. "
+    f"Presupuesto por sesión: {PRESUPUESTO_MB:g} MB (LAB_CONCRETO_MEMORIA_SESION_MB); al superarlo se "
+    f"descartan PDF y gráficos guardados y, si hay más de {MAX_FILAS_EN_MEMORIA} ensayos en memoria, "
+    f"los más antiguos pasan a disco (quedan {MIN_FILAS_EN_MEMORIA})."
+)
+
+# Esta página también cuenta como actividad de la sesión
+actual = controlar_memoria()
+sesiones = sesiones_activas()
+
+# ========================================
+# SECCIÓN 1: RESUMEN DEL SERVIDOR
+# ========================================
+
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.metric("Sesiones activas", len(sesiones))
+
+with col2:
+    st.metric("Memoria de sesiones", f"{sum(m.total for m in sesiones) / MB:.1f} MB")
+
+with col3:
+    st.metric("Presupuesto por sesión", f"{PRESUPUESTO_MB:g} MB")
+
+with col4:
+    if resource is not None:
+        # ru_maxrss está en KB en Linux
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        st.metric("Pico del proceso", f"{pico:.0f} MB")
+    else:
+        st.metric("Pico del proceso", "-")
+
+st.divider()
+
+# ========================================
+# SECCIÓN 2: SESIONES
+# ========================================
+
+st.write("### Sesiones")
+
+st.dataframe(
+    pd.DataFrame({
+        "Sesión": [m.sesion[:8] + (" (esta)" if m.sesion == actual.sesion else "") for m in sesiones],
+        "Memoria (MB)": [m.total / MB for m in sesiones],
+        "Mayor clave": [next(iter(m.por_clave), "-") for m in sesiones],
+        "Ensayos en disco": [m.filas_en_disco for m in sesiones],
+        "Descartes de caché": [m.descartes for m in sesiones],
+        "Última actividad": [datetime.fromtimestamp(m.hora) for m in sesiones],
+    }),
+    hide_index=True,
+    use_container_width=True,
+    column_config={
+        "Memoria (MB)": st.column_config.ProgressColumn(format="%.2f", min_value=0.0, max_value=PRESUPUESTO_MB),
+        "Última actividad": st.column_config.DatetimeColumn(format="DD/MM/YYYY HH:mm"),
+    },
+)
+
+st.divider()
+
+# ========================================
+# SECCIÓN 3: ESTA SESIÓN
+# ========================================
+
+col1, col2 = st.columns(2)
+
+with col1:
+    st.write("### Memoria por clave")
+    st.dataframe(
+        pd.DataFrame({
+            "Clave": list(actual.por_clave),
+            "KB": [b / 1024 for b in actual.por_clave.values()],
+        }),
+        hide_index=True,
+        use_container_width=True,
+        column_config={"KB": st.column_config.NumberColumn(format="%.1f")},
+    )
+
+with col2:
+    st.write("### Tiempos de fragmentos")
+    tiempos = pd.DataFrame(tiempos_recientes(), columns=["fragmento", "ms", "hora"])
+    if len(tiempos):
+        st.dataframe(
+            tiempos.groupby("fragmento")["ms"]
+            .agg(Ejecuciones="count", Promedio="mean", Máximo="max")
+            .reset_index()
+            .rename(columns={"fragmento": "Fragmento"}),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Promedio": st.column_config.NumberColumn("Promedio (ms)", format="%.1f"),
+                "Máximo": st.column_config.NumberColumn("Máximo (ms)", format="%.1f"),
+            },
+        )
+    else:
+        st.info("Aún no se ejecutan fragmentos en esta sesión.")
@@ -0,0 +1,495 @@
+import math
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from calculos.estadisticas import AcumuladorWelford, acumuladores_por_grupo, resumen
+
+# Base de datos local (un solo PC de laboratorio, sin red). Se puede cambiar con LAB_CONCRETO_BD.
+RUTA_BD = Path(
+    os.environ.get(
+        "LAB_CONCRETO_BD",
+        Path(__file__).resolve().parent.parent / "datos" / "laboratorio.sqlite3",
+    )
+)
+
+POR_PAGINA = 50
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS cilindros (
+    id INTEGER PRIMARY KEY,
+    muestra TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    edad_d INTEGER,
+    fc_mpa REAL,
+    diametro_mm REAL,
+    altura_mm REAL,
+    peso_kg REAL,
+    densidad_kg_m3 REAL,
+    carga_kn REAL,
+    resistencia_mpa REAL,
+    evolucion_pct REAL,
+    tipo_falla TEXT,
+    obra TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_cilindros_muestra ON cilindros (muestra);
+CREATE INDEX IF NOT EXISTS ix_cilindros_fc ON cilindros (fc_mpa);
+CREATE INDEX IF NOT EXISTS ix_cilindros_edad ON cilindros (edad_d);
+CREATE INDEX IF NOT EXISTS ix_cilindros_fecha ON cilindros (fecha);
+
+CREATE TABLE IF NOT EXISTS cubos (
+    id INTEGER PRIMARY KEY,
+    lote TEXT NOT NULL,
+    tipo_cemento TEXT,
+    fecha TEXT NOT NULL,
+    fecha_fabricacion TEXT,
+    edad_d INTEGER,
+    cubo TEXT,
+    masa_g REAL,
+    fuerza_kn REAL,
+    resistencia_mpa REAL,
+    observaciones TEXT,
+    valido INTEGER,
+    humedad_pct REAL,
+    temperatura_c REAL,
+    laboratorista TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_cubos_lote ON cubos (lote);
+CREATE INDEX IF NOT EXISTS ix_cubos_edad ON cubos (edad_d);
+CREATE INDEX IF NOT EXISTS ix_cubos_fecha ON cubos (fecha);
+
+-- Acumuladores de Welford por lote y edad (solo cubos válidos); se actualizan al guardar
+CREATE TABLE IF NOT EXISTS estadisticas_cubos (
+    lote TEXT NOT NULL,
+    edad_d INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    media REAL NOT NULL,
+    m2 REAL NOT NULL,
+    minimo REAL NOT NULL,
+    maximo REAL NOT NULL,
+    PRIMARY KEY (lote, edad_d)
+);
+
+CREATE TABLE IF NOT EXISTS granulometrias (
+    id INTEGER PRIMARY KEY,
+    muestra TEXT NOT NULL,
+    agregado TEXT,
+    fecha TEXT NOT NULL,
+    peso_muestra_g REAL,
+    obra TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_granulometrias_muestra ON granulometrias (muestra);
+CREATE INDEX IF NOT EXISTS ix_granulometrias_fecha ON granulometrias (fecha);
+
+CREATE TABLE IF NOT EXISTS granulometria_tamices (
+    granulometria_id INTEGER NOT NULL REFERENCES granulometrias (id) ON DELETE CASCADE,
+    tamiz_mm REAL NOT NULL,
+    retenido_g REAL,
+    retenido_pct REAL,
+    retenido_acumulado_pct REAL,
+    pasante_pct REAL
+);
+CREATE INDEX IF NOT EXISTS ix_granulometria_tamices_id ON granulometria_tamices (granulometria_id);
+"""
+
+# (columna SQLite, columna de la tabla en pantalla)
+COLUMNAS_CILINDROS: List[Tuple[str, str]] = [
+    ("muestra", "Muestra"),
+    ("fecha", "Fecha"),
+    ("edad_d", "Edad(d)"),
+    ("fc_mpa", "F'c(MPa)"),
+    ("diametro_mm", "Diámetro(mm)"),
+    ("altura_mm", "Altura(mm)"),
+    ("peso_kg", "Peso(kg)"),
+    ("densidad_kg_m3", "Densidad(kg/m3)"),
+    ("carga_kn", "Carga Máxima(kN)"),
+    ("resistencia_mpa", "Resistencia(MPa)"),
+    ("evolucion_pct", "Evolución(%)"),
+    ("tipo_falla", "Tipo Falla"),
+    ("obra", "Obra"),
+]
+
+COLUMNAS_CUBOS: List[Tuple[str, str]] = [
+    ("lote", "Lote"),
+    ("tipo_cemento", "Tipo Cemento"),
+    ("fecha", "Fecha"),
+    ("fecha_fabricacion", "Fecha Fabricación"),
+    ("edad_d", "Edad(d)"),
+    ("cubo", "Cubo"),
+    ("masa_g", "Masa (g)"),
+    ("fuerza_kn", "Fuerza (kN)"),
+    ("resistencia_mpa", "Resistencia (MPa)"),
+    ("observaciones", "Observaciones"),
+    ("valido", "Válido"),
+    ("humedad_pct", "Humedad (%)"),
+    ("temperatura_c", "Temperatura (°C)"),
+    ("laboratorista", "Laboratorista"),
+]
+
+COLUMNAS_GRANULOMETRIAS: List[Tuple[str, str]] = [
+    ("id", "Id"),
+    ("muestra", "Muestra"),
+    ("agregado", "Agregado"),
+    ("fecha", "Fecha"),
+    ("peso_muestra_g", "Peso inicial (g)"),
+    ("obra", "Obra"),
+]
+
+COLUMNAS_TAMICES: List[Tuple[str, str]] = [
+    ("tamiz_mm", "Tamiz (mm)"),
+    ("retenido_g", "Retenido (g)"),
+    ("retenido_pct", "% Retenido"),
+    ("retenido_acumulado_pct", "% Retenido Acumulado"),
+    ("pasante_pct", "% Pasante"),
+]
+
+
+def _fecha_iso(valor) -> Optional[str]:
+    """Normaliza fechas (date, datetime o texto dd/mm/aaaa) a aaaa-mm-dd para que el índice ordene."""
+    if valor is None or valor is pd.NaT or valor == "":
+        return None
+    if isinstance(valor, (date, datetime)):
+        return valor.strftime("%Y-%m-%d")
+    texto = str(valor).strip()
+    for formato in ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%Y %H:%M"):
+        try:
+            return datetime.strptime(texto, formato).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return texto
+
+
+def _positivo(valor) -> bool:
+    try:
+        return float(valor) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+def _edad(valor) -> Optional[int]:
+    if valor is None or valor is pd.NA or valor == "":
+        return None
+    return int(str(valor).split(" ")[0])
+
+
+def _filas(registros: Iterable[Dict[str, Any]], columnas: List[Tuple[str, str]]):
+    """Convierte diccionarios con nombres de pantalla en tuplas para executemany."""
+    for registro in registros:
+        fila = []
+        for columna_bd, columna in columnas:
+            valor = registro.get(columna)
+            if columna_bd in ("fecha", "fecha_fabricacion"):
+                valor = _fecha_iso(valor)
+            elif columna_bd == "edad_d":
+                valor = _edad(valor)
+            elif columna_bd == "valido" and valor is not None:
+                valor = int(bool(valor))
+            elif isinstance(valor, np.float32):
+                # Medidas en float32 de la tabla tipada: el decimal más corto (101.6, no 101.59999847)
+                valor = float(str(valor))
+            elif hasattr(valor, "item"):
+                valor = valor.item()
+            fila.append(valor)
+        yield tuple(fila)
+
+
+class AlmacenLaboratorio:
+    """
+    Almacenamiento persistente de resultados en un archivo SQLite local.
+
+    Usa modo WAL para que las lecturas de otras sesiones no bloqueen las escrituras, inserta
+    por lotes con executemany y consulta por páginas (LIMIT/OFFSET) sobre columnas indexadas.
+    """
+
+    def __init__(self, ruta=RUTA_BD):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._conexion() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_ESQUEMA)
+            # Bases creadas antes de la tabla de estadísticas: se arma una vez desde los cubos
+            if con.execute("SELECT NOT EXISTS (SELECT 1 FROM estadisticas_cubos)").fetchone()[0]:
+                filas = con.execute(
+                    "SELECT lote, edad_d, resistencia_mpa FROM cubos WHERE valido = 1 AND edad_d IS NOT NULL"
+                ).fetchall()
+                self._sumar_estadisticas_cubos(con, [(l, e) for l, e, _ in filas], [r for _, _, r in filas])
+
+    @contextmanager
+    def _conexion(self):
+        con = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA foreign_keys=ON")
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _insertar(self, tabla: str, columnas: List[Tuple[str, str]], registros) -> int:
+        nombres = ", ".join(c for c, _ in columnas)
+        marcas = ", ".join("?" for _ in columnas)
+        with self._lock, self._conexion() as con:
+            cursor = con.executemany(
+                f"INSERT INTO {tabla} ({nombres}) VALUES ({marcas})",
+                _filas(registros, columnas),
+            )
+            return cursor.rowcount
+
+    def guardar_cilindros(self, registros: Iterable[Dict[str, Any]]) -> int:
+        """
+        Guarda ensayos de cilindros en una sola transacción.
+
+        Parámetros:
+        - registros: Diccionarios con las columnas de df_ensayos (más "F'c(MPa)", "Peso(kg)" y "Obra")
+        - devuelve el número de filas insertadas
+        """
+        return self._insertar("cilindros", COLUMNAS_CILINDROS, registros)
+
+    def guardar_cubos(self, registros: Iterable[Dict[str, Any]]) -> int:
+        """
+        Guarda resultados de cubos de cemento en una sola transacción y suma los válidos a las
+        estadísticas de su lote y edad.
+
+        Parámetros:
+        - registros: Diccionarios con las columnas de df_cubos más los datos del lote
+        """
+        registros = list(registros)
+        # Un cubo sin fuerza registrada (0 MPa) dañaría para siempre la media y el mínimo del lote
+        validos = [
+            r for r in registros
+            if r.get("Válido") and r.get("Lote") and r.get("Edad(d)") not in (None, "")
+            and _positivo(r.get("Resistencia (MPa)"))
+        ]
+        claves = [(str(r["Lote"]), _edad(r["Edad(d)"])) for r in validos]
+        valores = [r.get("Resistencia (MPa)") for r in validos]
+        nombres = ", ".join(c for c, _ in COLUMNAS_CUBOS)
+        marcas = ", ".join("?" for _ in COLUMNAS_CUBOS)
+        with self._lock, self._conexion() as con:
+            cursor = con.executemany(
+                f"INSERT INTO cubos ({nombres}) VALUES ({marcas})",
+                _filas(registros, COLUMNAS_CUBOS),
+            )
+            self._sumar_estadisticas_cubos(con, claves, valores)
+            return cursor.rowcount
+
+    @staticmethod
+    def _sumar_estadisticas_cubos(con, claves, valores):
+        """Combina los acumuladores de los cubos nuevos con los guardados: O(1) por lote y edad."""
+        valores = [math.nan if v is None else float(v) for v in valores]
+        for (lote, edad), nuevo in acumuladores_por_grupo(claves, valores).items():
+            fila = con.execute(
+                "SELECT n, media, m2, minimo, maximo FROM estadisticas_cubos WHERE lote = ? AND edad_d = ?",
+                (lote, edad),
+            ).fetchone()
+            total = AcumuladorWelford(*fila).combinar(nuevo) if fila else nuevo
+            con.execute(
+                "INSERT OR REPLACE INTO estadisticas_cubos (lote, edad_d, n, media, m2, minimo, maximo) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (lote, edad, total.n, total.media, total.m2, total.minimo, total.maximo),
+            )
+
+    def guardar_granulometria(self, encabezado: Dict[str, Any], df_tamices: pd.DataFrame) -> int:
+        """
+        Guarda un ensayo granulométrico con sus tamices.
+
+        Parámetros:
+        - encabezado: {"Muestra", "Agregado", "Fecha", "Peso inicial (g)", "Obra"}
+        - df_tamices: DataFrame con las columnas de COLUMNAS_TAMICES
+        - devuelve el id del ensayo
+        """
+        columnas_ensayo = COLUMNAS_GRANULOMETRIAS[1:]
+        nombres = ", ".join(c for c, _ in columnas_ensayo)
+        marcas = ", ".join("?" for _ in columnas_ensayo)
+        tamices = df_tamices.reindex(columns=[c for _, c in COLUMNAS_TAMICES])
+        with self._lock, self._conexion() as con:
+            cursor = con.execute(
+                f"INSERT INTO granulometrias ({nombres}) VALUES ({marcas})",
+                next(_filas([encabezado], columnas_ensayo)),
+            )
+            ensayo_id = cursor.lastrowid
+            con.executemany(
+                "INSERT INTO granulometria_tamices (granulometria_id, tamiz_mm, retenido_g, retenido_pct, "
+                "retenido_acumulado_pct, pasante_pct) VALUES (?, ?, ?, ?, ?, ?)",
+                ((ensayo_id, *map(float, fila)) for fila in tamices.itertuples(index=False)),
+            )
+        return ensayo_id
+
+    @staticmethod
+    def _filtros(muestra=None, lote=None, fc=None, edad=None, desde=None, hasta=None):
+        condiciones, parametros = [], []
+        if muestra:
+            condiciones.append("muestra = ?")
+            parametros.append(muestra)
+        if lote:
+            condiciones.append("lote = ?")
+            parametros.append(lote)
+        if fc is not None:
+            condiciones.append("fc_mpa = ?")
+            parametros.append(fc)
+        if edad is not None:
+            condiciones.append("edad_d = ?")
+            parametros.append(_edad(edad))
+        if desde is not None:
+            condiciones.append("fecha >= ?")
+            parametros.append(_fecha_iso(desde))
+        if hasta is not None:
+            condiciones.append("fecha <= ?")
+            parametros.append(_fecha_iso(hasta))
+        where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        return where, parametros
+
+    def _consultar(self, tabla, columnas, pagina, por_pagina, filtros) -> pd.DataFrame:
+        where, parametros = self._filtros(**filtros)
+        nombres = ", ".join(c for c, _ in columnas)
+        with self._conexion() as con:
+            filas = con.execute(
+                f"SELECT {nombres} FROM {tabla}{where} ORDER BY fecha DESC, id DESC LIMIT ? OFFSET ?",
+                [*parametros, por_pagina, pagina * por_pagina],
+            ).fetchall()
+        return pd.DataFrame.from_records(filas, columns=[c for _, c in columnas])
+
+    def _contar(self, tabla, filtros) -> int:
+        where, parametros = self._filtros(**filtros)
+        with self._conexion() as con:
+            return con.execute(f"SELECT COUNT(*) FROM {tabla}{where}", parametros).fetchone()[0]
+
+    def consultar_cilindros(self, pagina: int = 0, por_pagina: int = POR_PAGINA, **filtros) -> pd.DataFrame:
+        """
+        Devuelve una página de ensayos de cilindros, del más reciente al más antiguo.
+
+        Parámetros:
+        - pagina: Número de página, desde 0
+        - por_pagina: Filas por página
+        - filtros: muestra, fc, edad, desde, hasta
+        """
+        return self._consultar("cilindros", COLUMNAS_CILINDROS, pagina, por_pagina, filtros)
+
+    def contar_cilindros(self, **filtros) -> int:
+        return self._contar("cilindros", filtros)
+
+    def iterar_cilindros(self, tamano_bloque: int = 2000, **filtros) -> Iterator[pd.DataFrame]:
+        """
+        Recorre todos los ensayos de cilindros que cumplen los filtros en bloques de DataFrame,
+        en orden de fecha, sin cargar la consulta completa (p.ej. para el informe por lotes).
+
+        Parámetros:
+        - tamano_bloque: Filas por bloque
+        - filtros: muestra, fc, edad, desde, hasta
+        """
+        nombres = ", ".join(c for c, _ in COLUMNAS_CILINDROS)
+        yield from self._iterar(f"SELECT {nombres} FROM cilindros", COLUMNAS_CILINDROS, tamano_bloque, filtros)
+
+    def _iterar(self, consulta, columnas, tamano_bloque, filtros) -> Iterator[pd.DataFrame]:
+        where, parametros = self._filtros(**filtros)
+        with self._conexion() as con:
+            cursor = con.execute(f"{consulta}{where} ORDER BY fecha, id", parametros)
+            while True:
+                filas = cursor.fetchmany(tamano_bloque)
+                if not filas:
+                    return
+                yield pd.DataFrame.from_records(filas, columns=[c for _, c in columnas])
+
+    def consultar_cubos(self, pagina: int = 0, por_pagina: int = POR_PAGINA, **filtros) -> pd.DataFrame:
+        """
+        Devuelve una página de resultados de cubos.
+
+        Parámetros:
+        - filtros: lote, edad, desde, hasta
+        """
+        return self._consultar("cubos", COLUMNAS_CUBOS, pagina, por_pagina, filtros)
+
+    def contar_cubos(self, **filtros) -> int:
+        return self._contar("cubos", filtros)
+
+    def iterar_cubos(self, tamano_bloque: int = 2000, **filtros) -> Iterator[pd.DataFrame]:
+        """
+        Recorre los resultados de cubos en bloques, en orden de fecha.
+
+        Parámetros:
+        - filtros: lote, edad, desde, hasta
+        """
+        nombres = ", ".join(c for c, _ in COLUMNAS_CUBOS)
+        yield from self._iterar(f"SELECT {nombres} FROM cubos", COLUMNAS_CUBOS, tamano_bloque, filtros)
+
+    def acumuladores_cubos(self, lote: Optional[str] = None, edad=None) -> Dict[Tuple[str, int], AcumuladorWelford]:
+        """Acumuladores guardados por (lote, edad); una fila por grupo, sin leer los cubos."""
+        condiciones, parametros = [], []
+        if lote:
+            condiciones.append("lote = ?")
+            parametros.append(lote)
+        if edad is not None:
+            condiciones.append("edad_d = ?")
+            parametros.append(_edad(edad))
+        where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        with self._conexion() as con:
+            filas = con.execute(
+                f"SELECT lote, edad_d, n, media, m2, minimo, maximo FROM estadisticas_cubos{where} "
+                "ORDER BY lote, edad_d",
+                parametros,
+            ).fetchall()
+        return {(lote, edad): AcumuladorWelford(*resto) for lote, edad, *resto in filas}
+
+    def estadisticas_cubos(self, lote: Optional[str] = None, edad=None) -> pd.DataFrame:
+        """
+        Estadísticas de resistencia por lote y edad de todo el historial.
+
+        Parámetros:
+        - lote: Lote de cemento (todos si es None)
+        - edad: Edad en días (todas si es None)
+        """
+        filas = [
+            {"Lote": lote, "Edad(d)": edad, **resumen(acumulador)}
+            for (lote, edad), acumulador in self.acumuladores_cubos(lote, edad).items()
+        ]
+        return pd.DataFrame(filas, columns=["Lote", "Edad(d)", *resumen(None)])
+
+    def consultar_granulometrias(self, pagina: int = 0, por_pagina: int = POR_PAGINA, **filtros) -> pd.DataFrame:
+        """
+        Devuelve una página de ensayos granulométricos (sin tamices).
+
+        Parámetros:
+        - filtros: muestra, desde, hasta
+        """
+        return self._consultar("granulometrias", COLUMNAS_GRANULOMETRIAS, pagina, por_pagina, filtros)
+
+    def contar_granulometrias(self, **filtros) -> int:
+        return self._contar("granulometrias", filtros)
+
+    def iterar_granulometrias(self, tamano_bloque: int = 2000, **filtros) -> Iterator[pd.DataFrame]:
+        """
+        Recorre los ensayos granulométricos con sus tamices (una fila por tamiz), en bloques.
+
+        Parámetros:
+        - filtros: muestra, desde, hasta
+        """
+        nombres = ", ".join(c for c, _ in COLUMNAS_GRANULOMETRIAS + COLUMNAS_TAMICES)
+        consulta = (
+            f"SELECT {nombres} FROM (SELECT * FROM granulometrias "
+            "JOIN granulometria_tamices ON granulometria_tamices.granulometria_id = granulometrias.id)"
+        )
+        yield from self._iterar(consulta, COLUMNAS_GRANULOMETRIAS + COLUMNAS_TAMICES, tamano_bloque, filtros)
+
+    def tamices_granulometria(self, ensayo_id: int) -> pd.DataFrame:
+        """Devuelve los tamices de un ensayo granulométrico."""
+        nombres = ", ".join(c for c, _ in COLUMNAS_TAMICES)
+        with self._conexion() as con:
+            filas = con.execute(
+                f"SELECT {nombres} FROM granulometria_tamices WHERE granulometria_id = ? ORDER BY tamiz_mm DESC",
+                (ensayo_id,),
+            ).fetchall()
+        return pd.DataFrame.from_records(filas, columns=[c for _, c in COLUMNAS_TAMICES])
+
+
+@lru_cache(maxsize=None)
+def obtener_almacen(ruta=RUTA_BD) -> AlmacenLaboratorio:
+    """Devuelve una única instancia por proceso (el esquema se crea una sola vez)."""
+    return AlmacenLaboratorio(ruta)
@@ -0,0 +1,323 @@
+import shutil
+import uuid
+from datetime import date
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from utils.almacenamiento import (
+    COLUMNAS_CILINDROS,
+    COLUMNAS_CUBOS,
+    COLUMNAS_GRANULOMETRIAS,
+    COLUMNAS_TAMICES,
+    AlmacenLaboratorio,
+)
+
+# Archivo histórico de resultados en Parquet, una carpeta por tabla y una partición por mes:
+#
+#   archivo/cilindros/mes=2026-10/cilindros-<id>.parquet
+#
+# Cada tabla tiene un esquema fijo. Las columnas con pocos valores distintos (tipo de falla, edad,
+# agregado, obra, ...) quedan con codificación de diccionario: en disco cada valor se guarda una
+# vez por bloque y al leer llegan a pandas como category. Al cargar solo se leen las columnas
+# pedidas y los filtros por fecha descartan meses completos (carpetas) y grupos de filas por sus
+# estadísticas, sin abrirlos.
+
+TABLAS = ("cilindros", "cubos", "granulometrias")
+
+COLUMNA_MES = "mes"
+
+# Las magnitudes medidas tienen a lo sumo 2-3 decimales; float32 (7 cifras) basta y ocupa la mitad
+_F32 = pa.float32()
+_CATEGORIA = pa.dictionary(pa.int16(), pa.string())
+_CATEGORIA_CORTA = pa.dictionary(pa.int8(), pa.string())
+
+ESQUEMAS: Dict[str, pa.Schema] = {
+    "cilindros": pa.schema([
+        ("muestra", pa.string()),
+        ("fecha", pa.date32()),
+        # Edad en int8: Parquet la guarda con diccionario por página y se lee como category
+        ("edad_d", pa.int8()),
+        ("fc_mpa", _F32),
+        ("diametro_mm", _F32),
+        ("altura_mm", _F32),
+        ("peso_kg", _F32),
+        ("densidad_kg_m3", _F32),
+        ("carga_kn", _F32),
+        ("resistencia_mpa", _F32),
+        ("evolucion_pct", _F32),
+        ("tipo_falla", _CATEGORIA_CORTA),
+        ("obra", _CATEGORIA),
+    ]),
+    "cubos": pa.schema([
+        ("lote", _CATEGORIA),
+        ("tipo_cemento", _CATEGORIA_CORTA),
+        ("fecha", pa.date32()),
+        ("fecha_fabricacion", pa.date32()),
+        ("edad_d", pa.int8()),
+        ("cubo", _CATEGORIA_CORTA),
+        ("masa_g", _F32),
+        ("fuerza_kn", _F32),
+        ("resistencia_mpa", _F32),
+        ("observaciones", pa.string()),
+        ("valido", pa.bool_()),
+        ("humedad_pct", _F32),
+        ("temperatura_c", _F32),
+        ("laboratorista", _CATEGORIA),
+    ]),
+    # Una fila por tamiz con los datos del ensayo; "agregado" es el material ensayado
+    "granulometrias": pa.schema([
+        ("id", pa.int64()),
+        ("muestra", pa.string()),
+        ("agregado", _CATEGORIA_CORTA),
+        ("fecha", pa.date32()),
+        ("peso_muestra_g", _F32),
+        ("obra", _CATEGORIA),
+        ("tamiz_mm", _F32),
+        ("retenido_g", _F32),
+        ("retenido_pct", _F32),
+        ("retenido_acumulado_pct", _F32),
+        ("pasante_pct", _F32),
+    ]),
+}
+
+# Columnas que se muestran como category al leer (además de las de diccionario)
+_EDADES = ("edad_d",)
+
+# (columna del archivo, columna en pantalla): las mismas de SQLite
+COLUMNAS: Dict[str, List[Tuple[str, str]]] = {
+    "cilindros": COLUMNAS_CILINDROS,
+    "cubos": COLUMNAS_CUBOS,
+    "granulometrias": COLUMNAS_GRANULOMETRIAS + COLUMNAS_TAMICES,
+}
+
+_PARTICION = ds.partitioning(pa.schema([(COLUMNA_MES, pa.string())]), flavor="hive")
+
+
+def _esquema(tabla: str) -> pa.Schema:
+    try:
+        return ESQUEMAS[tabla]
+    except KeyError:
+        raise ValueError(f"Tabla desconocida: {tabla}; se esperaba una de {', '.join(TABLAS)}") from None
+
+
+def _fechas(valores: pd.Series) -> pd.Series:
+    """Fechas de SQLite (aaaa-mm-dd) o de la sesión (dd/mm/aaaa) como datetime64."""
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        return valores
+    texto = valores.astype("string")
+    fechas = pd.to_datetime(texto, format="%Y-%m-%d", errors="coerce")
+    pendientes = fechas.isna() & texto.notna()
+    if pendientes.any():
+        fechas[pendientes] = pd.to_datetime(texto[pendientes], format="%d/%m/%Y", errors="coerce")
+    return fechas
+
+
+def _columna(valores: pd.Series, tipo: pa.DataType) -> pa.Array:
+    if pa.types.is_dictionary(tipo):
+        texto = valores.astype("string").replace("", pd.NA)
+        return pa.array(texto, type=pa.string(), from_pandas=True).dictionary_encode().cast(tipo)
+    if pa.types.is_date32(tipo):
+        return pa.array(_fechas(valores).dt.date, type=tipo, from_pandas=True)
+    if pa.types.is_int8(tipo):
+        # "28 (+-20h)" o "28" como en el formulario
+        edad = pd.to_numeric(valores.astype("string").str.split(" ").str[0], errors="coerce")
+        return pa.array(edad.round().astype("Int8"), type=tipo, from_pandas=True)
+    if pa.types.is_boolean(tipo):
+        return pa.array(valores.astype("boolean"), type=tipo, from_pandas=True)
+    if pa.types.is_string(tipo):
+        return pa.array(valores.astype("string"), type=tipo, from_pandas=True)
+    return pa.array(pd.to_numeric(valores, errors="coerce"), type=tipo, from_pandas=True)
+
+
+def a_tabla_arrow(df: pd.DataFrame, tabla: str) -> pa.Table:
+    """
+    Convierte resultados al esquema fijo de la tabla.
+
+    Parámetros:
+    - df: DataFrame con los nombres de pantalla (df_ensayos, tabla de cubos, ...) o los de SQLite;
+      las columnas que falten quedan vacías
+    - tabla: "cilindros", "cubos" o "granulometrias"
+    """
+    esquema = _esquema(tabla)
+    pantalla = dict(COLUMNAS[tabla])
+    vacia = pd.Series([None] * len(df), index=df.index, dtype=object)
+    arreglos = []
+    for campo in esquema:
+        nombre = campo.name if campo.name in df.columns else pantalla.get(campo.name)
+        valores = df[nombre] if nombre in df.columns else vacia
+        arreglos.append(_columna(valores, campo.type))
+    return pa.Table.from_arrays(arreglos, schema=esquema)
+
+
+def escribir_archivo(df: pd.DataFrame, raiz, tabla: str, meses_reemplazados: Optional[set] = None) -> int:
+    """
+    Agrega resultados al archivo, en la partición del mes de cada fila.
+
+    Cada llamada escribe archivos nuevos, así se puede archivar por bloques o mes a mes. Con
+    meses_reemplazados, los meses del bloque que aún no están en el conjunto se borran antes de
+    escribir y se agregan a él: los bloques siguientes del mismo mes se suman, pero volver a
+    archivar un mes lo reemplaza en lugar de duplicar sus filas.
+
+    Parámetros:
+    - df: Resultados (ver a_tabla_arrow)
+    - raiz: Carpeta del archivo
+    - tabla: "cilindros", "cubos" o "granulometrias"
+    - meses_reemplazados: Meses ("aaaa-mm") ya reescritos en este archivado; None solo agrega
+    - devuelve el número de filas escritas; las filas sin fecha no se archivan
+    """
+    datos = a_tabla_arrow(df, tabla)
+    datos = datos.filter(datos.column("fecha").is_valid())
+    if not datos.num_rows:
+        return 0
+    meses = pa.array(pd.Series(datos.column("fecha").to_pandas(date_as_object=False)).dt.strftime("%Y-%m"))
+    if meses_reemplazados is not None:
+        for mes in set(meses.to_pylist()) - meses_reemplazados:
+            shutil.rmtree(Path(raiz) / tabla / f"{COLUMNA_MES}={mes}", ignore_errors=True)
+            meses_reemplazados.add(mes)
+    pq.write_to_dataset(
+        datos.append_column(COLUMNA_MES, meses),
+        Path(raiz) / tabla,
+        partitioning=_PARTICION,
+        basename_template=f"{tabla}-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return datos.num_rows
+
+
+def _mes(valor) -> pd.Period:
+    fecha = pd.Timestamp(valor) if isinstance(valor, date) else _fechas(pd.Series([str(valor)])).iloc[0]
+    if pd.isna(fecha):
+        raise ValueError(f"Fecha no válida: {valor}; se esperaba aaaa-mm-dd o dd/mm/aaaa")
+    return fecha.to_period("M")
+
+
+def _meses_completos(desde, hasta) -> Tuple[Optional[date], Optional[date]]:
+    """Extiende el rango al primer día del mes de desde y al último del mes de hasta."""
+    if desde is not None:
+        desde = _mes(desde).start_time.date()
+    if hasta is not None:
+        hasta = _mes(hasta).end_time.date()
+    return desde, hasta
+
+
+def archivar_almacen(almacen: AlmacenLaboratorio, raiz, tablas: Sequence[str] = TABLAS,
+                     tamano_bloque: int = 50_000, desde=None, hasta=None) -> Dict[str, int]:
+    """
+    Copia las tablas de SQLite al archivo Parquet por bloques.
+
+    Se archivan meses completos: el rango se extiende al inicio del mes de desde y al final del de
+    hasta, y cada mes con resultados reemplaza su partición. Repetir el archivado, o archivar rangos
+    que se solapan, deja el archivo igual que SQLite en esos meses, sin filas duplicadas.
+
+    Parámetros:
+    - almacen: AlmacenLaboratorio de origen
+    - raiz: Carpeta del archivo
+    - tablas: Tablas a archivar
+    - desde, hasta: Rango de fechas (p.ej. para archivar solo el mes que cerró); todo si son None
+    - devuelve las filas escritas por tabla
+    """
+    iteradores = {
+        "cilindros": almacen.iterar_cilindros,
+        "cubos": almacen.iterar_cubos,
+        "granulometrias": almacen.iterar_granulometrias,
+    }
+    desde, hasta = _meses_completos(desde, hasta)
+    escritas = {}
+    for tabla in tablas:
+        _esquema(tabla)
+        reemplazados: set = set()
+        escritas[tabla] = sum(
+            escribir_archivo(bloque, raiz, tabla, reemplazados)
+            for bloque in iteradores[tabla](tamano_bloque, desde=desde, hasta=hasta)
+        )
+    return escritas
+
+
+def _filtro(desde: Optional[date], hasta: Optional[date], condiciones: Dict[str, object]) -> Optional[ds.Expression]:
+    expresiones = []
+    if desde is not None:
+        desde = pd.Timestamp(desde).date()
+        # El mes descarta carpetas completas; la fecha, grupos de filas dentro de cada archivo
+        expresiones += [ds.field(COLUMNA_MES) >= desde.strftime("%Y-%m"), ds.field("fecha") >= desde]
+    if hasta is not None:
+        hasta = pd.Timestamp(hasta).date()
+        expresiones += [ds.field(COLUMNA_MES) <= hasta.strftime("%Y-%m"), ds.field("fecha") <= hasta]
+    for columna, valor in condiciones.items():
+        if valor is None:
+            continue
+        if isinstance(valor, (list, tuple, set)):
+            expresiones.append(ds.field(columna).isin(list(valor)))
+        else:
+            expresiones.append(ds.field(columna) == valor)
+    if not expresiones:
+        return None
+    filtro = expresiones[0]
+    for expresion in expresiones[1:]:
+        filtro = filtro & expresion
+    return filtro
+
+
+def leer_archivo(
+    raiz,
+    tabla: str,
+    columnas: Optional[Iterable[str]] = None,
+    desde=None,
+    hasta=None,
+    nombres_pantalla: bool = True,
+    **condiciones,
+) -> pd.DataFrame:
+    """
+    Lee del archivo solo las columnas y filas pedidas.
+
+    Parámetros:
+    - raiz: Carpeta del archivo
+    - tabla: "cilindros", "cubos" o "granulometrias"
+    - columnas: Columnas a leer (nombres del archivo, p.ej. "resistencia_mpa"); todas si es None
+    - desde, hasta: Rango de fechas (incluido)
+    - nombres_pantalla: Devuelve las columnas con los nombres de las tablas de la aplicación
+    - condiciones: Igualdad por columna del archivo, p.ej. edad_d=28, fc_mpa=21.0, tipo_falla=["Tipo 1", "Tipo 2"]
+    - devuelve un DataFrame vacío con las columnas pedidas si el archivo no existe
+    """
+    esquema = _esquema(tabla)
+    columnas = list(columnas) if columnas is not None else esquema.names
+    desconocidas = [c for c in [*columnas, *condiciones] if c not in esquema.names]
+    if desconocidas:
+        raise ValueError(f"Columnas desconocidas en {tabla}: {', '.join(desconocidas)}")
+
+    carpeta = Path(raiz) / tabla
+    if carpeta.is_dir():
+        conjunto = ds.dataset(carpeta, format="parquet", partitioning=_PARTICION,
+                              schema=esquema.append(pa.field(COLUMNA_MES, pa.string())))
+        datos = conjunto.to_table(columns=columnas, filter=_filtro(desde, hasta, condiciones))
+    else:
+        datos = esquema.empty_table().select(columnas)
+
+    df = datos.to_pandas(date_as_object=False)
+    for columna in _EDADES:
+        if columna in df.columns:
+            df[columna] = df[columna].astype("Int8").astype("category")
+    if nombres_pantalla:
+        df = df.rename(columns=dict(COLUMNAS[tabla]))
+    return df
+
+
+def parquet_bytes(df: pd.DataFrame, tabla: str) -> bytes:
+    """Un solo archivo Parquet con el esquema de la tabla (p.ej. para st.download_button)."""
+    buffer = BytesIO()
+    pq.write_table(a_tabla_arrow(df, tabla), buffer, compression="zstd")
+    return buffer.getvalue()
+
+
+def meses_archivados(raiz, tabla: str) -> List[str]:
+    """Particiones (aaaa-mm) presentes en el archivo, ordenadas."""
+    carpeta = Path(raiz) / tabla
+    if not carpeta.is_dir():
+        return []
+    prefijo = f"{COLUMNA_MES}="
+    return sorted(p.name[len(prefijo):] for p in carpeta.iterdir() if p.is_dir() and p.name.startswith(prefijo))
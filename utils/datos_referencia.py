@@ -0,0 +1,80 @@
+import threading
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Tuple
+
+import numpy as np
+
+from calculos.estadisticas import EDADES_CUBOS, RANGO_MAX_PCT
+from utils.factores_ld import FACTORES_LD_ARRAY, LD_MAX_CENTESIMAS, LD_MIN_CENTESIMAS
+from utils.limites_granulometria import RUTA_LIMITES, LimitesAgregado, cargar_limites
+
+# Tablas de norma compartidas por todas las sesiones del servidor. Cada sesión de Streamlit vuelve
+# a ejecutar la página en cada rerun; con esto las listas y catálogos se arman una sola vez por
+# proceso y todas las sesiones leen los mismos objetos (arreglos de solo lectura y mappingproxy,
+# para que ninguna página los modifique por accidente).
+#
+# Es un singleton de proceso y no st.cache_resource para que también lo usen lab_cli.py y los
+# benchmarks, que corren sin Streamlit.
+
+TIPOS_FALLA = (
+    "Tipo 1: conos bien formados en ambos extremos",
+    "Tipo 2: cono bien formado en un extremo",
+    "Tipo 3: fisuras verticales  a traves de ambos extremos",
+    "Tipo 4: fractura diagonal sin fisuras",
+    "Tipo 5: fracturas en los lados en la parte superior o inferior",
+    "Tipo 6: extremo puntiagudo",
+)
+
+# Edades de rotura de cilindros con su tolerancia (NTC 673)
+EDADES_CILINDROS = ("1 (+- 0.5h)", "3 (+-2h)", "7 (+-6h)", "28 (+-20h)", "90 (48h)")
+
+
+class DatosReferencia(NamedTuple):
+    tipos_falla: Tuple[str, ...]
+    edades_cilindros: Tuple[str, ...]
+    factores_ld: np.ndarray                       # Factor L/D por centésima desde ld_min
+    ld_min: float
+    ld_max: float
+    limites: Mapping[str, LimitesAgregado]        # Catálogo de gram_limites.txt
+    rango_max_cubos_pct: Mapping[int, float]      # NTC 220 por número de cubos
+    edades_cubos: Tuple[int, ...]
+
+
+_lock = threading.Lock()
+_datos = None
+_contadores = {"aciertos": 0, "fallos": 0}
+
+
+def datos_referencia() -> DatosReferencia:
+    """
+    Devuelve las tablas de referencia del proceso; se arman en la primera llamada y otra vez
+    solo si cambia gram_limites.txt.
+
+    - lanza FileNotFoundError si no existe el archivo de límites
+    """
+    global _datos
+    # cargar_limites solo vuelve a leer el archivo si cambió su mtime
+    catalogo = cargar_limites(RUTA_LIMITES)
+    with _lock:
+        if _datos is not None and _datos[0] is catalogo:
+            _contadores["aciertos"] += 1
+            return _datos[1]
+        _contadores["fallos"] += 1
+        datos = DatosReferencia(
+            tipos_falla=TIPOS_FALLA,
+            edades_cilindros=EDADES_CILINDROS,
+            factores_ld=FACTORES_LD_ARRAY,
+            ld_min=LD_MIN_CENTESIMAS / 100,
+            ld_max=LD_MAX_CENTESIMAS / 100,
+            limites=MappingProxyType(catalogo),
+            rango_max_cubos_pct=MappingProxyType(dict(RANGO_MAX_PCT)),
+            edades_cubos=tuple(EDADES_CUBOS),
+        )
+        _datos = (catalogo, datos)
+        return datos
+
+
+def contadores_cache() -> Dict[str, int]:
+    """Aciertos y fallos de datos_referencia desde que arrancó el proceso."""
+    with _lock:
+        return dict(_contadores)
@@ -1,35 +1,72 @@
-import pandas as pd
+import numpy as np
 
 #Los factores a continuación fueron claculados con interpolación, dada la base contenida en la norma ntc673
 
-factor_ld = pd.DataFrame({
-    "ld": [
-        1.00,1.01,1.02,1.03,1.04,1.05,1.06,1.07,1.08,1.09,
-        1.10,1.11,1.12,1.13,1.14,1.15,1.16,1.17,1.18,1.19,
-        1.20,1.21,1.22,1.23,1.24,1.25,1.26,1.27,1.28,1.29,
-        1.30,1.31,1.32,1.33,1.34,1.35,1.36,1.37,1.38,1.39,
-        1.40,1.41,1.42,1.43,1.44,1.45,1.46,1.47,1.48,1.49,
-        1.50,1.51,1.52,1.53,1.54,1.55,1.56,1.57,1.58,1.59,
-        1.60,1.61,1.62,1.63,1.64,1.65,1.66,1.67,1.68,1.69,
-        1.70,1.71,1.72,1.73,1.74,1.75,1.76,1.77,1.78,1.79,
-        1.80,1.81,1.82,1.83,1.84,1.85,1.86,1.87,1.88,1.89,
-        1.90,1.91,1.92,1.93,1.94,1.95,1.96,1.97,1.98,1.99,
-        2.00
-    ],
-    "factor": [
-        0.87,0.872,0.875,0.877,0.88,0.882,0.884,0.887,0.889,0.892,
-        0.894,0.896,0.899,0.901,0.904,0.906,0.908,0.911,0.913,0.916,
-        0.918,0.92,0.923,0.925,0.928,0.93,0.931,0.932,0.934,0.935,
-        0.936,0.937,0.938,0.94,0.941,0.942,0.943,0.944,0.946,0.947,
-        0.948,0.949,0.95,0.952,0.953,0.954,0.955,0.956,0.958,0.959,
-        0.96,0.961,0.962,0.962,0.963,0.964,0.965,0.966,0.966,0.967,
-        0.968,0.969,0.97,0.97,0.971,0.972,0.973,0.974,0.974,0.975,
-        0.976,0.977,0.978,0.978,0.979,0.98,0.981,0.982,0.982,0.983,
-        0.984,0.985,0.986,0.986,0.987,0.988,0.989,0.99,0.99,0.991,
-        0.992,0.993,0.994,0.994,0.995,0.996,0.997,0.998,0.998,0.999,
-        1.00
-    ]
-})
-
-# # tabla auxiliar que contiene factores de relación L/D para cilindros de ensayo de compresión"
-# print(factor_ld.tail(30))
\ No newline at end of file
+# Tabla auxiliar de factores de relación L/D para cilindros de ensayo de compresión.
+# La posición i corresponde a L/D = 1.00 + i/100, de modo que la búsqueda es un índice directo.
+LD_MIN_CENTESIMAS = 100
+LD_MAX_CENTESIMAS = 200
+
+FACTORES_LD = (
+    0.87,0.872,0.875,0.877,0.88,0.882,0.884,0.887,0.889,0.892,
+    0.894,0.896,0.899,0.901,0.904,0.906,0.908,0.911,0.913,0.916,
+    0.918,0.92,0.923,0.925,0.928,0.93,0.931,0.932,0.934,0.935,
+    0.936,0.937,0.938,0.94,0.941,0.942,0.943,0.944,0.946,0.947,
+    0.948,0.949,0.95,0.952,0.953,0.954,0.955,0.956,0.958,0.959,
+    0.96,0.961,0.962,0.962,0.963,0.964,0.965,0.966,0.966,0.967,
+    0.968,0.969,0.97,0.97,0.971,0.972,0.973,0.974,0.974,0.975,
+    0.976,0.977,0.978,0.978,0.979,0.98,0.981,0.982,0.982,0.983,
+    0.984,0.985,0.986,0.986,0.987,0.988,0.989,0.99,0.99,0.991,
+    0.992,0.993,0.994,0.994,0.995,0.996,0.997,0.998,0.998,0.999,
+    1.00
+)
+
+FACTORES_LD_ARRAY = np.array(FACTORES_LD, dtype=np.float64)
+FACTORES_LD_ARRAY.setflags(write=False)
+
+
+def factor_ld_for(ratio):
+    """
+    Devuelve el factor de corrección L/D para un cilindro.
+
+    Parámetros:
+    - ratio: Relación altura/diámetro, se redondea a la centésima
+    - factor de corrección; 1.0 para L/D >= 2.00 y None para L/D < 1.00
+    """
+    centesimas = round(ratio * 100)
+    if centesimas < LD_MIN_CENTESIMAS:
+        return None
+    if centesimas >= LD_MAX_CENTESIMAS:
+        return 1.0
+    return FACTORES_LD[centesimas - LD_MIN_CENTESIMAS]
+
+
+def factor_ld_array(ratios):
+    """
+    Devuelve los factores de corrección L/D para un arreglo de relaciones altura/diámetro.
+
+    Parámetros:
+    - ratios: Arreglo o columna con relaciones L/D
+    - arreglo de factores; 1.0 para L/D >= 2.00 y NaN para L/D < 1.00 o valores no finitos
+    """
+    ratios = np.asarray(ratios, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        centesimas = np.round(ratios * 100)
+    valido = np.isfinite(centesimas) & (centesimas >= LD_MIN_CENTESIMAS)
+    indices = np.clip(np.where(valido, centesimas, LD_MIN_CENTESIMAS), LD_MIN_CENTESIMAS, LD_MAX_CENTESIMAS)
+    factores = FACTORES_LD_ARRAY[indices.astype(np.intp) - LD_MIN_CENTESIMAS]
+    return np.where(valido, factores, np.nan)
+
+
+def __getattr__(nombre):
+    # Compatibilidad: la tabla como DataFrame solo se construye (e importa pandas) si se pide.
+    if nombre == "factor_ld":
+        import pandas as pd
+
+        tabla = pd.DataFrame({
+            "ld": [c / 100 for c in range(LD_MIN_CENTESIMAS, LD_MAX_CENTESIMAS + 1)],
+            "factor": list(FACTORES_LD),
+        })
+        globals()["factor_ld"] = tabla
+        return tabla
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -0,0 +1,122 @@
+from io import BytesIO
+from typing import MutableMapping, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from utils.graficos import BLOQUEO_RENDER, DPI_PANTALLA, configurar_ejes_granulometria, nueva_figura
+from utils.limites_granulometria import LimitesAgregado
+
+# Gráficos que se conservan por sesión (uno por tipo de agregado) antes de liberar el más antiguo
+MAX_GRAFICOS = 3
+
+# Rango del eje Y mientras los datos estén entre 0 y 100 %; fijo para poder reutilizar el fondo
+RANGO_Y = (-5.0, 105.0)
+
+# Compresión PNG rápida: el gráfico es casi todo blanco y el tamaño apenas cambia
+NIVEL_COMPRESION_PNG = 3
+
+
+class GraficoGranulometria:
+    """
+    Curva granulométrica de un tipo de agregado.
+
+    Los límites, la banda entre ellos, los ejes y la leyenda se dibujan una sola vez y se guarda
+    el fondo ya rasterizado. En cada rerun solo se copia ese fondo y se dibuja encima la línea de
+    % Pasante; el PNG se vuelve a generar únicamente si los datos cambiaron.
+    """
+
+    def __init__(self, limites: LimitesAgregado, dpi: int = DPI_PANTALLA):
+        self.fig = nueva_figura(dpi=dpi)
+        self.canvas = self.fig.canvas
+        ax = self.ax = self.fig.subplots()
+        configurar_ejes_granulometria(ax, limites)
+
+        # La línea de datos es "animada": no forma parte del fondo, se dibuja aparte
+        (self._linea_pasante,) = ax.plot(
+            limites.tamiz_mm, np.full(len(limites.tamiz_mm), 100.0),
+            'y--s', label='% Pasante', linewidth=1, markersize=6, animated=True,
+        )
+        ax.legend(fontsize=10)
+        ax.set_ylim(*RANGO_Y)
+        self.fig.tight_layout()
+
+        self._fondo = None
+        self._renderer_fondo = None
+        self._clave_png: Optional[bytes] = None
+        self._png: Optional[bytes] = None
+
+    def _rango_y(self, pasante: np.ndarray) -> Tuple[float, float]:
+        finitos = pasante[np.isfinite(pasante)]
+        if not finitos.size:
+            return RANGO_Y
+        return min(RANGO_Y[0], float(finitos.min()) - 5.0), max(RANGO_Y[1], float(finitos.max()) + 5.0)
+
+    def actualizar(self, pasante):
+        """Actualiza la línea de % Pasante; devuelve la figura (p.ej. para el PDF)."""
+        pasante = np.asarray(pasante, dtype=np.float64)
+        self._linea_pasante.set_ydata(pasante)
+        rango = self._rango_y(pasante)
+        if rango != self.ax.get_ylim():
+            # Datos fuera del rango habitual (p.ej. retenido mayor que el peso): el fondo cambia
+            self.ax.set_ylim(*rango)
+            self._fondo = None
+        return self.fig
+
+    def png(self, pasante) -> bytes:
+        """Devuelve el PNG del gráfico para los datos dados; se reutiliza si no cambiaron."""
+        clave = np.asarray(pasante, dtype=np.float64).tobytes()
+        if clave == self._clave_png:
+            return self._png
+
+        self.actualizar(pasante)
+        with BLOQUEO_RENDER:
+            # savefig (p.ej. el PDF) reemplaza el renderer del canvas; en ese caso se redibuja el fondo
+            if self._fondo is None or getattr(self.canvas, "renderer", None) is not self._renderer_fondo:
+                self.canvas.draw()
+                self._fondo = self.canvas.copy_from_bbox(self.fig.bbox)
+                self._renderer_fondo = self.canvas.renderer
+            else:
+                self.canvas.restore_region(self._fondo)
+            self.ax.draw_artist(self._linea_pasante)
+            pixeles = np.array(self.canvas.buffer_rgba())
+
+        buffer = BytesIO()
+        Image.fromarray(pixeles).save(buffer, format="png", compress_level=NIVEL_COMPRESION_PNG)
+        self._png = buffer.getvalue()
+        self._clave_png = clave
+        return self._png
+
+    def memoria_aproximada(self) -> int:
+        """Bytes aproximados: buffer RGBA del canvas, el fondo guardado y el último PNG."""
+        ancho, alto = self.canvas.get_width_height()
+        rgba = ancho * alto * 4
+        return rgba * (2 if self._fondo is not None else 1) + len(self._png or b"")
+
+    def liberar(self):
+        """Suelta la figura y los buffers para que el recolector los libere."""
+        self.fig.clear()
+        self._fondo = self._renderer_fondo = self._png = self._clave_png = None
+
+
+def grafico_granulometria(
+    cache: MutableMapping[str, GraficoGranulometria],
+    clave: str,
+    limites: LimitesAgregado,
+    max_graficos: int = MAX_GRAFICOS,
+) -> GraficoGranulometria:
+    """
+    Devuelve el gráfico guardado para un tipo de agregado o lo crea; libera los más antiguos.
+
+    Parámetros:
+    - cache: Diccionario de la sesión (p.ej. st.session_state.graficos_granulometria)
+    - clave: Tipo de agregado
+    - limites: LimitesAgregado del catálogo
+    """
+    grafico = cache.pop(clave, None)
+    if grafico is None:
+        grafico = GraficoGranulometria(limites)
+    cache[clave] = grafico
+    while len(cache) > max_graficos:
+        cache.pop(next(iter(cache))).liberar()
+    return grafico
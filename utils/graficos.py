@@ -0,0 +1,159 @@
+import threading
+from io import BytesIO
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from utils.limites_granulometria import LimitesAgregado
+
+# Gráficos con la API orientada a objetos de matplotlib (Figure + FigureCanvasAgg), sin pyplot.
+# pyplot guarda cada figura en un registro global hasta que se llama plt.close; en un servidor
+# Streamlit que atiende muchas sesiones eso hace crecer la memoria todo el día. Una Figure creada
+# aquí se libera sola cuando ya nadie la referencia.
+
+# matplotlib no es seguro entre hilos al rasterizar (caché de fuentes, mathtext); cada sesión de
+# Streamlit corre en su propio hilo, así que el dibujo y la exportación pasan por este candado.
+BLOQUEO_RENDER = threading.RLock()
+
+DPI_PANTALLA = 100
+
+
+def nueva_figura(figsize=(10, 6), dpi: int = DPI_PANTALLA) -> Figure:
+    """Crea una Figure con su canvas Agg, sin registrarla en pyplot."""
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def figura_png(fig: Figure, dpi: int = None, **kwargs) -> bytes:
+    """
+    Exporta la figura a PNG.
+
+    Parámetros:
+    - fig: Figure creada con nueva_figura
+    - dpi: Resolución; por defecto la de la figura
+    - kwargs: Otros argumentos de savefig (p.ej. bbox_inches="tight")
+    """
+    buffer = BytesIO()
+    with BLOQUEO_RENDER:
+        fig.savefig(buffer, format="png", dpi=dpi or fig.dpi, **kwargs)
+    return buffer.getvalue()
+
+
+# ========================================
+# GRANULOMETRÍA
+# ========================================
+
+def configurar_ejes_granulometria(ax, limites: LimitesAgregado):
+    """Dibuja los límites, la banda entre ellos y los ejes logarítmicos invertidos."""
+    # Graficar límites máximos y mínimos
+    ax.plot(limites.tamiz_mm, limites.limite_max, 'r--o', label='Límite Máximo', linewidth=1, markersize=6)
+    ax.plot(limites.tamiz_mm, limites.limite_min, 'b--o', label='Límite Mínimo', linewidth=1, markersize=6)
+
+    # Llenar el área entre límites
+    ax.fill_between(limites.tamiz_mm, limites.limite_min, limites.limite_max, alpha=0.2, color='lightgreen')
+
+    # Configurar ejes
+    ax.set_xlabel('Tamiz (mm)', fontsize=10)
+    ax.set_ylabel('Porcentaje Retenido Acumulado (%)', fontsize=10)
+    ax.grid(True, alpha=0.5)
+
+    # Configurar escala logarítmica en eje x
+    ax.set_xscale('log')
+    ax.set_xticks(limites.tamiz_mm)
+    ax.set_xticklabels([f"{t:g}" for t in limites.tamiz_mm])
+    ax.minorticks_off()
+
+    # Invertir eje x
+    ax.invert_xaxis()
+
+
+def curva_granulometrica(limites: LimitesAgregado, tamiz_mm, pasante) -> Figure:
+    """
+    Curva granulométrica completa (p.ej. para informes PDF).
+
+    Parámetros:
+    - limites: LimitesAgregado del tipo de agregado
+    - tamiz_mm: Aberturas de los tamices del ensayo
+    - pasante: % Pasante por tamiz
+    """
+    fig = nueva_figura()
+    ax = fig.subplots()
+    configurar_ejes_granulometria(ax, limites)
+    ax.plot(tamiz_mm, pasante, 'y--s', label='% Pasante', linewidth=1, markersize=6)
+    ax.legend(fontsize=10)
+    fig.tight_layout()
+    return fig
+
+
+# ========================================
+# CUBOS DE MORTERO
+# ========================================
+
+def barras_cubos(cubos, resistencia, validos) -> Figure:
+    """
+    Barras de resistencia por cubo: verdes los válidos, rojas los descartados.
+
+    Parámetros:
+    - cubos: Etiquetas de los cubos
+    - resistencia: Resistencia (MPa) de cada cubo
+    - validos: Booleanos; la media solo usa los cubos válidos
+    """
+    resistencia = np.asarray(resistencia, dtype=np.float64)
+    validos = np.asarray(validos, dtype=bool)
+
+    fig = nueva_figura()
+    ax = fig.subplots()
+    colores = np.where(validos, 'green', 'red').tolist()
+    ax.bar(list(cubos), resistencia, color=colores, alpha=0.7, edgecolor='black')
+
+    if validos.any():
+        ax.axhline(y=resistencia[validos].mean(), color='blue', linestyle='--', linewidth=2, label='Resistencia Media')
+
+    ax.set_xlabel('Cubo', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Resistencia (MPa)', fontsize=12, fontweight='bold')
+    ax.grid(True, alpha=0.3, axis='y')
+    if validos.any():
+        ax.legend(fontsize=11)
+    fig.tight_layout()
+    return fig
+
+
+# ========================================
+# CONFORMIDAD DE CILINDROS
+# ========================================
+
+def carta_control(fc, limite_individual, resultado, media_movil, bajo_individual) -> Figure:
+    """
+    Gráfico de control de una clase f'c: resultados, promedio móvil y límites de aceptación.
+
+    Parámetros:
+    - fc: Resistencia especificada (MPa)
+    - limite_individual: Mínimo de un resultado individual (p.ej. f'c - 3.5 MPa)
+    - resultado: Resultados en orden de ensayo (MPa)
+    - media_movil: Promedio móvil de tres resultados; NaN donde aún no aplica
+    - bajo_individual: Booleanos de los resultados bajo el límite individual
+    """
+    resultado = np.asarray(resultado, dtype=np.float64)
+    bajo_individual = np.asarray(bajo_individual, dtype=bool)
+    numero = np.arange(1, resultado.size + 1)
+
+    fig = nueva_figura(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.plot(numero, resultado, 'o-', color='gray', linewidth=1, markersize=5, label='Resultado')
+    ax.plot(numero, media_movil, 's-', color='blue', linewidth=2, markersize=4, label='Promedio móvil (3)')
+    if bajo_individual.any():
+        ax.plot(numero[bajo_individual], resultado[bajo_individual], 'o', color='red', markersize=8,
+                label='Bajo límite individual')
+    ax.axhline(y=fc, color='green', linestyle='--', linewidth=1.5, label=f"f'c = {fc:g} MPa")
+    ax.axhline(y=limite_individual, color='red', linestyle=':', linewidth=1.5,
+               label=f"Límite individual = {limite_individual:g} MPa")
+
+    ax.set_xlabel('Resultado N°', fontsize=10)
+    ax.set_ylabel('Resistencia (MPa)', fontsize=10)
+    ax.set_xticks(numero if numero.size <= 30 else numero[::max(1, numero.size // 15)])
+    ax.grid(True, alpha=0.3)
+    ax.legend(fontsize=9, loc='best')
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,273 @@
+import csv
+import io
+import re
+import unicodedata
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from calculos.cal_concreto import compute_cylinder_results
+from utils.registro_ensayos import tipar_ensayos
+
+# Importación de los registros de la prensa (CSV o Excel) a la tabla de ensayos de cilindros.
+# El archivo se lee por bloques: en memoria solo están el bloque actual y las filas inválidas,
+# nunca el archivo completo junto con su copia calculada.
+
+TAMANO_BLOQUE = 10_000
+
+# Encabezados que usan las prensas y hojas de cálculo del laboratorio, ya normalizados (minúsculas,
+# sin tildes, separados por "_"), y la columna de df_ensayos que les corresponde
+ALIAS_COLUMNAS: Dict[str, str] = {
+    **{alias: "Muestra" for alias in ("muestra", "id_muestra", "probeta", "cilindro", "especimen", "sample", "specimen", "id")},
+    **{alias: "Fecha" for alias in ("fecha", "fecha_ensayo", "fecha_rotura", "date", "test_date")},
+    **{alias: "Edad(d)" for alias in ("edad", "edad_d", "edad_dias", "dias", "age", "age_d", "age_days")},
+    **{alias: "F'c(MPa)" for alias in ("f_c_mpa", "fc", "fc_mpa", "f_c", "resistencia_diseno", "design_strength")},
+    **{alias: "Diámetro(mm)" for alias in ("diametro_mm", "diametro", "d_mm", "diameter", "diameter_mm")},
+    **{alias: "Altura(mm)" for alias in ("altura_mm", "altura", "longitud", "longitud_mm", "l_mm", "h_mm", "height", "height_mm", "length_mm")},
+    **{alias: "Peso(kg)" for alias in ("peso_kg", "peso", "masa", "masa_kg", "mass", "mass_kg", "weight", "weight_kg")},
+    **{alias: "Carga Máxima(kN)" for alias in (
+        "carga_maxima_kn", "carga_maxima", "carga", "carga_kn", "carga_max", "carga_max_kn", "fuerza_kn",
+        "max_load", "max_load_kn", "peak_load", "peak_load_kn", "load_kn",
+    )},
+    **{alias: "Tipo Falla" for alias in ("tipo_falla", "falla", "tipo_de_falla", "failure_type", "fracture_type")},
+    **{alias: "Obra" for alias in ("obra", "proyecto", "project")},
+}
+
+COLUMNAS_OBLIGATORIAS = ("Muestra", "Diámetro(mm)", "Carga Máxima(kN)")
+
+_NUMERICAS = ("Edad(d)", "F'c(MPa)", "Diámetro(mm)", "Altura(mm)", "Peso(kg)", "Carga Máxima(kN)")
+
+
+class ResumenImportacion(NamedTuple):
+    filas: int                   # Filas leídas del archivo
+    importadas: int              # Filas válidas agregadas
+    invalidos: pd.DataFrame      # Fila (número en el archivo), Muestra y Motivo de cada fila descartada
+    columnas: Dict[str, str]     # Encabezado del archivo -> columna de df_ensayos
+
+
+def _normalizar(encabezado: str) -> str:
+    texto = unicodedata.normalize("NFKD", str(encabezado)).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "_", texto.lower()).strip("_")
+
+
+def mapear_columnas(encabezados: Iterable[str]) -> Dict[str, str]:
+    """
+    Relaciona los encabezados del archivo con las columnas de df_ensayos.
+
+    Parámetros:
+    - encabezados: Nombres de columna del archivo
+    - devuelve {encabezado del archivo: columna de df_ensayos}; se ignoran las columnas desconocidas
+    - lanza ValueError si falta alguna columna de COLUMNAS_OBLIGATORIAS
+    """
+    mapa, destinos = {}, set()
+    for encabezado in encabezados:
+        destino = ALIAS_COLUMNAS.get(_normalizar(encabezado))
+        # Si dos columnas apuntan al mismo destino se usa la primera
+        if destino and destino not in destinos:
+            mapa[encabezado] = destino
+            destinos.add(destino)
+    faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in destinos]
+    if faltantes:
+        raise ValueError(f"El archivo no tiene las columnas obligatorias: {', '.join(faltantes)}")
+    return mapa
+
+
+def _opciones_csv(muestra: str) -> Dict[str, Any]:
+    """Separador del archivo según el encabezado; las prensas configuradas en español usan ';'."""
+    try:
+        separador = csv.Sniffer().sniff(muestra.split("\n", 1)[0], delimiters=",;\t|").delimiter
+    except csv.Error:
+        separador = ","
+    return {"sep": separador}
+
+
+def _bloques_csv(fuente, tamano_bloque: int) -> Iterator[pd.DataFrame]:
+    if isinstance(fuente, (str, Path)):
+        with open(fuente, encoding="utf-8-sig", errors="replace") as archivo:
+            opciones = _opciones_csv(archivo.read(64 * 1024))
+    else:
+        inicio = fuente.read(64 * 1024)
+        fuente.seek(0)
+        if isinstance(inicio, bytes):
+            inicio = inicio.decode("utf-8-sig", errors="replace")
+            fuente = io.TextIOWrapper(fuente, encoding="utf-8-sig", errors="replace")
+        opciones = _opciones_csv(inicio)
+    # dtype=str: los valores mal escritos se detectan por fila en lugar de romper la lectura
+    yield from pd.read_csv(fuente, dtype=str, keep_default_na=False, chunksize=tamano_bloque,
+                           skipinitialspace=True, **opciones)
+
+
+def _bloques_excel(fuente, tamano_bloque: int) -> Iterator[pd.DataFrame]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as error:
+        raise ImportError("Para importar archivos Excel instala openpyxl (pip install openpyxl)") from error
+
+    # read_only recorre las filas sin cargar la hoja completa en memoria
+    libro = load_workbook(fuente, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezados = [str(c) if c is not None else "" for c in next(filas, ())]
+        bloque: List[tuple] = []
+        for fila in filas:
+            if any(v is not None and v != "" for v in fila):
+                bloque.append(fila)
+            if len(bloque) >= tamano_bloque:
+                yield pd.DataFrame.from_records(bloque, columns=encabezados)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame.from_records(bloque, columns=encabezados)
+    finally:
+        libro.close()
+
+
+def _es_excel(fuente, nombre: Optional[str]) -> bool:
+    nombre = nombre or (str(fuente) if isinstance(fuente, (str, Path)) else getattr(fuente, "name", ""))
+    return Path(str(nombre)).suffix.lower() in (".xlsx", ".xlsm")
+
+
+def _texto(columna: pd.Series) -> pd.Series:
+    return columna.astype("string").str.strip().fillna("")
+
+
+def _fechas(texto: pd.Series) -> pd.Series:
+    """dd/mm/aaaa (formulario) o ISO (Excel, prensas); otros formatos se interpretan día primero."""
+    fechas = pd.to_datetime(texto, format="%d/%m/%Y", errors="coerce")
+    for opciones in ({"format": "ISO8601"}, {"format": "mixed", "dayfirst": True}):
+        pendientes = fechas.isna() & (texto != "")
+        if not pendientes.any():
+            break
+        fechas[pendientes] = pd.to_datetime(texto[pendientes], errors="coerce", **opciones)
+    return fechas
+
+
+def _preparar_bloque(bruto: pd.DataFrame, columnas: Dict[str, str], fecha_defecto: pd.Timestamp,
+                     obra_defecto: Optional[str]):
+    """Convierte un bloque del archivo a la tabla tipada de df_ensayos; devuelve (válidos, inválidos)."""
+    bloque = bruto[list(columnas)].rename(columns=columnas)
+    n = len(bloque)
+
+    for columna in _NUMERICAS:
+        if columna in bloque.columns:
+            valores = bloque[columna]
+            if columna == "Edad(d)" and valores.dtype == object:
+                # "28 (+-20h)" como en el formulario
+                valores = valores.astype(str).str.strip().str.split(" ").str[0]
+            if valores.dtype == object:
+                # Coma decimal (prensas en español, Excel con números como texto)
+                valores = valores.astype(str).str.strip().str.replace(",", ".", regex=False)
+            bloque[columna] = pd.to_numeric(valores, errors="coerce")
+
+    muestra = _texto(bloque["Muestra"])
+    bloque["Muestra"] = muestra
+    diametro = bloque["Diámetro(mm)"].to_numpy(np.float64)
+    if "Altura(mm)" not in bloque.columns:
+        # Cilindro normalizado (L/D = 2): sin corrección por esbeltez
+        bloque["Altura(mm)"] = diametro * 2
+    if "Edad(d)" in bloque.columns:
+        # Edades que no caben en el int8 de TIPOS_ENSAYOS (negativas o de más de 127 días)
+        edad_invalida = bloque["Edad(d)"].notna() & tipar_ensayos(bloque[["Edad(d)"]])["Edad(d)"].isna()
+    else:
+        edad_invalida = np.zeros(n, dtype=bool)
+        bloque["Edad(d)"] = pd.NA
+
+    if "Fecha" in bloque.columns:
+        texto_fecha = _texto(bloque["Fecha"])
+        fechas = _fechas(texto_fecha)
+        fecha_invalida = (texto_fecha != "") & fechas.isna()
+        bloque["Fecha"] = fechas.fillna(fecha_defecto)
+    else:
+        fecha_invalida = np.zeros(n, dtype=bool)
+        bloque["Fecha"] = fecha_defecto
+
+    if "Tipo Falla" in bloque.columns:
+        falla = _texto(bloque["Tipo Falla"])
+        # "3" o "Tipo 3: fisuras ..." quedan como "Tipo 3", igual que en el formulario
+        bloque["Tipo Falla"] = falla.where(~falla.str.fullmatch(r"[1-6]"), "Tipo " + falla).str[:6]
+    if "Obra" not in bloque.columns and obra_defecto:
+        bloque["Obra"] = obra_defecto
+
+    calculado = tipar_ensayos(compute_cylinder_results(bloque))
+
+    altura = calculado["Altura(mm)"].to_numpy(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel_ld = altura / diametro
+    motivos = {
+        "muestra vacía": (muestra == "").to_numpy(),
+        "carga no válida": ~(calculado["Carga Máxima(kN)"].to_numpy(np.float64) > 0),
+        "diámetro no válido": ~(diametro > 0),
+        "altura no válida": ~(altura > 0),
+        "L/D menor que 1.00": (diametro > 0) & (altura > 0) & (np.round(rel_ld * 100) < 100),
+        "edad no válida": np.asarray(edad_invalida, dtype=bool),
+        "fecha no válida": np.asarray(fecha_invalida, dtype=bool),
+    }
+    invalido = np.logical_or.reduce(list(motivos.values()))
+    if not invalido.any():
+        return calculado, None
+
+    filas_invalidas = np.flatnonzero(invalido)
+    motivo = [
+        "; ".join(nombre for nombre, mascara in motivos.items() if mascara[i])
+        for i in filas_invalidas
+    ]
+    invalidos = pd.DataFrame({
+        # +2: encabezado y numeración desde 1, como en la hoja de cálculo
+        "Fila": bruto.index.to_numpy()[filas_invalidas] + 2,
+        "Muestra": muestra.to_numpy()[filas_invalidas],
+        "Motivo": motivo,
+    })
+    return calculado[~invalido], invalidos
+
+
+def importar_ensayos(
+    fuente: Union[str, Path, io.IOBase],
+    nombre: Optional[str] = None,
+    tamano_bloque: int = TAMANO_BLOQUE,
+    obra: Optional[str] = None,
+    al_importar: Optional[Callable[[pd.DataFrame], None]] = None,
+) -> ResumenImportacion:
+    """
+    Importa un archivo de la prensa por bloques y entrega cada bloque válido ya calculado.
+
+    Cada bloque pasa por compute_cylinder_results (resistencia con corrección L/D, densidad y
+    evolución). Las filas con datos inválidos no detienen la importación: se descartan y se
+    informan con su número de fila y el motivo.
+
+    Parámetros:
+    - fuente: Ruta o archivo abierto (p.ej. el de st.file_uploader), CSV o Excel (.xlsx)
+    - nombre: Nombre del archivo para reconocer el formato si la fuente no tiene ruta
+    - tamano_bloque: Filas por bloque
+    - obra: Obra para las filas que no la traen
+    - al_importar: Función que recibe cada bloque válido (p.ej. agregarlo al registro y a SQLite)
+    - lanza ValueError si faltan columnas obligatorias
+    """
+    bloques = _bloques_excel(fuente, tamano_bloque) if _es_excel(fuente, nombre) else _bloques_csv(fuente, tamano_bloque)
+    fecha_defecto = pd.Timestamp(date.today())
+    columnas: Optional[Dict[str, str]] = None
+    filas = importadas = 0
+    invalidos: List[pd.DataFrame] = []
+
+    for bruto in bloques:
+        if columnas is None:
+            columnas = mapear_columnas(bruto.columns)
+        # Números de fila continuos entre bloques (Excel entrega cada bloque desde 0)
+        bruto.index = pd.RangeIndex(filas, filas + len(bruto))
+        filas += len(bruto)
+        validos, descartados = _preparar_bloque(bruto, columnas, fecha_defecto, obra)
+        if descartados is not None:
+            invalidos.append(descartados)
+        if len(validos):
+            importadas += len(validos)
+            if al_importar is not None:
+                al_importar(validos)
+
+    return ResumenImportacion(
+        filas,
+        importadas,
+        pd.concat(invalidos, ignore_index=True) if invalidos else pd.DataFrame(columns=["Fila", "Muestra", "Motivo"]),
+        columnas or {},
+    )
+
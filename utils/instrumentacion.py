@@ -0,0 +1,96 @@
+import functools
+import logging
+import os
+import sys
+import time
+from collections import deque
+from typing import Callable, Deque, List, NamedTuple
+
+import streamlit as st
+
+from utils.memoria_sesion import controlar_memoria
+
+# Registro de qué fragmentos de una página se ejecutaron y cuánto tardaron. Cada ejecución queda
+# en el log "lab_concreto.fragmentos" y en una cola corta de la sesión.
+#
+# El log va a stderr si se define LAB_CONCRETO_LOG_FRAGMENTOS=1; si no, solo queda en la sesión.
+
+MAX_TIEMPOS_SESION = 200
+
+logger = logging.getLogger("lab_concreto.fragmentos")
+if os.environ.get("LAB_CONCRETO_LOG_FRAGMENTOS") and not logger.handlers:
+    _manejador = logging.StreamHandler(sys.stderr)
+    _manejador.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(_manejador)
+    logger.setLevel(logging.INFO)
+
+
+class TiempoFragmento(NamedTuple):
+    fragmento: str
+    ms: float
+    hora: float          # time.time() al terminar
+
+
+def _tiempos_sesion() -> Deque[TiempoFragmento]:
+    if "tiempos_fragmentos" not in st.session_state:
+        st.session_state.tiempos_fragmentos = deque(maxlen=MAX_TIEMPOS_SESION)
+    return st.session_state.tiempos_fragmentos
+
+
+def instrumentado(nombre: str) -> Callable:
+    """
+    Decorador que mide cada ejecución de la función y la registra con su nombre.
+
+    Parámetros:
+    - nombre: Nombre del fragmento en el log (p.ej. "cilindros/registro")
+    """
+    def decorar(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                # st.rerun y st.stop salen con una excepción; igual se registra el tiempo
+                ms = (time.perf_counter() - inicio) * 1000
+                _tiempos_sesion().append(TiempoFragmento(nombre, ms, time.time()))
+                logger.info("%s %.1f ms", nombre, ms)
+        return envoltura
+    return decorar
+
+
+def _rerun_de_fragmento() -> bool:
+    """True si la ejecución actual es solo de fragmentos (no de la página completa)."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    contexto = get_script_run_ctx(suppress_warning=True)
+    return bool(contexto is not None and contexto.fragment_ids_this_run)
+
+
+def fragmento(nombre: str) -> Callable:
+    """
+    st.fragment con medición: un cambio en un widget del fragmento vuelve a ejecutar solo esa
+    función, no la página completa.
+
+    Al terminar un rerun del fragmento se controla la memoria de la sesión, que la página solo
+    controla al final de una ejecución completa (un PDF generado en el fragmento cuenta enseguida).
+
+    Parámetros:
+    - nombre: Nombre del fragmento en el log
+    """
+    def decorar(funcion):
+        medida = instrumentado(nombre)(funcion)
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            resultado = medida(*args, **kwargs)
+            if _rerun_de_fragmento():
+                controlar_memoria()
+            return resultado
+        return st.fragment(envoltura)
+    return decorar
+
+
+def tiempos_recientes() -> List[TiempoFragmento]:
+    """Últimas ejecuciones de fragmentos de la sesión, de la más antigua a la más reciente."""
+    return list(_tiempos_sesion())
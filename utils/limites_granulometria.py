@@ -0,0 +1,82 @@
+import csv
+import os
+import threading
+from pathlib import Path
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+# Catálogo de límites granulométricos (NTC 174) leído de gram_limites.txt.
+# El archivo se interpreta una sola vez por proceso y solo se vuelve a leer si cambia su mtime.
+
+RUTA_LIMITES = Path(__file__).with_name("gram_limites.txt")
+
+
+class LimitesAgregado(NamedTuple):
+    """Límites de un tipo de agregado, ordenados de mayor a menor tamiz."""
+    norma: str
+    tamiz_mm: np.ndarray
+    tamiz_nombre: tuple
+    limite_min: np.ndarray
+    limite_max: np.ndarray
+
+
+_cache: Dict[str, tuple] = {}
+_cache_lock = threading.Lock()
+
+
+def clave_agregado(tamanio: str, tmn: str) -> str:
+    """
+    Construye la clave "tamaño-tmn" que se muestra en la página.
+
+    Parámetros:
+    - tamanio: Columna #tamanio del archivo (p.ej. "56" o "Fino")
+    - tmn: Columna TMN del archivo (p.ej. "Grava TMN 25 mm")
+    """
+    return f"#{tamanio}-{tmn}" if tamanio.isdigit() else tmn
+
+
+def _solo_lectura(valores, dtype=np.float64):
+    arreglo = np.ascontiguousarray(valores, dtype=dtype)
+    arreglo.setflags(write=False)
+    return arreglo
+
+
+def _leer_catalogo(ruta: Path) -> Dict[str, LimitesAgregado]:
+    filas_por_clave: Dict[str, list] = {}
+    with open(ruta, newline="", encoding="utf-8") as archivo:
+        for fila in csv.DictReader(archivo):
+            clave = clave_agregado(fila["#tamanio"].strip(), fila["TMN"].strip())
+            filas_por_clave.setdefault(clave, []).append(fila)
+
+    catalogo = {}
+    for clave, filas in filas_por_clave.items():
+        tamiz_mm = np.array([float(f["tamiz_mm"]) for f in filas])
+        orden = np.argsort(-tamiz_mm, kind="stable")
+        catalogo[clave] = LimitesAgregado(
+            norma=filas[0]["norma"],
+            tamiz_mm=_solo_lectura(tamiz_mm[orden]),
+            tamiz_nombre=tuple(filas[i]["tamiz_nombre"] for i in orden),
+            limite_min=_solo_lectura([float(filas[i]["limite_min"]) for i in orden]),
+            limite_max=_solo_lectura([float(filas[i]["limite_max"]) for i in orden]),
+        )
+    return catalogo
+
+
+def cargar_limites(ruta=RUTA_LIMITES) -> Dict[str, LimitesAgregado]:
+    """
+    Devuelve el catálogo {clave de agregado: LimitesAgregado} en el orden del archivo.
+
+    Parámetros:
+    - ruta: Archivo de límites; por defecto utils/gram_limites.txt
+    - lanza FileNotFoundError si el archivo no existe
+    """
+    ruta = Path(ruta).resolve()
+    mtime = os.stat(ruta).st_mtime_ns
+    with _cache_lock:
+        guardado = _cache.get(str(ruta))
+        if guardado is not None and guardado[0] == mtime:
+            return guardado[1]
+        catalogo = _leer_catalogo(ruta)
+        _cache[str(ruta)] = (mtime, catalogo)
+        return catalogo
@@ -0,0 +1,261 @@
+import io
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Mapping, MutableMapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.registro_ensayos import RegistroEnsayos
+
+# Presupuesto de memoria por sesión. Streamlit guarda st.session_state de cada pestaña abierta
+# mientras dure la conexión; en sesiones largas crecen los ensayos, los PDF y los gráficos.
+#
+# Al final de cada ejecución completa de una página, controlar_memoria() estima los bytes de la
+# sesión. Si pasa del presupuesto:
+#   1. descarta PDF, gráficos y cartas de control guardados, del de uso más antiguo al más reciente
+#      (se vuelven a construir si se piden otra vez);
+#   2. si aún no alcanza y el registro pasa de MAX_FILAS_EN_MEMORIA ensayos, pasa los más antiguos a
+#      un Parquet temporal (ya están también en SQLite), dejando en memoria los MIN_FILAS_EN_MEMORIA
+#      más recientes. Entre los dos límites no se descarga: cada archivo lleva al menos
+#      MAX - MIN ensayos y registrar unos pocos no crea archivos nuevos.
+#
+# LAB_CONCRETO_MEMORIA_SESION_MB cambia el presupuesto y LAB_CONCRETO_DIR_SESIONES la carpeta de
+# los archivos temporales.
+
+MB = 1024 * 1024
+PRESUPUESTO_MB = float(os.environ.get("LAB_CONCRETO_MEMORIA_SESION_MB", 64))
+CARPETA_SESIONES = os.environ.get("LAB_CONCRETO_DIR_SESIONES") or None
+MIN_FILAS_EN_MEMORIA = 2_000
+MAX_FILAS_EN_MEMORIA = 2 * MIN_FILAS_EN_MEMORIA
+
+# Cachés de la sesión que se pueden vaciar (deben ser CacheLRU)
+CACHES_SESION = ("pdfs_generados", "graficos_granulometria", "cartas_control")
+
+# Sesiones sin actividad por más de este tiempo dejan de mostrarse en la vista de administración
+SESION_INACTIVA_S = 2 * 3600
+
+# Elementos que se miden de una lista larga para estimar su tamaño
+_MUESTRA = 64
+_PROFUNDIDAD_MAX = 6
+_RELOJ = itertools.count()
+
+
+class CacheLRU(OrderedDict):
+    """
+    OrderedDict que recuerda cuándo se usó cada entrada: leerla o guardarla la mueve al final.
+
+    controlar_memoria compara esos usos entre todas las cachés de la sesión para descartar
+    primero lo que hace más tiempo no se mira.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.usos: Dict[Any, int] = {}
+        super().__init__(*args, **kwargs)
+
+    def _usar(self, clave):
+        self.move_to_end(clave)
+        self.usos[clave] = next(_RELOJ)
+
+    def __getitem__(self, clave):
+        valor = super().__getitem__(clave)
+        self._usar(clave)
+        return valor
+
+    def __setitem__(self, clave, valor):
+        super().__setitem__(clave, valor)
+        self._usar(clave)
+
+    def __delitem__(self, clave):
+        super().__delitem__(clave)
+        self.usos.pop(clave, None)
+
+    def get(self, clave, defecto=None):
+        return self[clave] if clave in self else defecto
+
+    def pop(self, clave, *defecto):
+        self.usos.pop(clave, None)
+        return super().pop(clave, *defecto)
+
+
+class MemoriaSesion(NamedTuple):
+    sesion: str
+    total: int                       # Bytes aproximados
+    por_clave: Dict[str, int]        # Bytes por clave de st.session_state
+    filas_en_disco: int              # Ensayos descargados a Parquet
+    descartes: int                   # Entradas de caché descartadas por presupuesto (acumulado)
+    hora: float                      # time.time() de la última medición
+
+
+_SESIONES: Dict[str, MemoriaSesion] = {}
+_BLOQUEO = threading.Lock()
+
+
+# ========================================
+# ESTIMACIÓN DE TAMAÑO
+# ========================================
+
+def _promedio_muestra(valores, tamano) -> float:
+    paso = max(1, len(valores) // _MUESTRA)
+    muestra = [tamano(v) for v in itertools.islice(valores, 0, None, paso)]
+    return sum(muestra) / len(muestra) if muestra else 0.0
+
+
+def _tamano_pandas(objeto) -> int:
+    """memory_usage sin deep (O(columnas)); los textos se estiman con una muestra de filas."""
+    columnas = objeto.to_frame() if isinstance(objeto, pd.Series) else objeto
+    total = int(columnas.memory_usage(index=True, deep=False).sum())
+    for _, serie in columnas.items():
+        if serie.dtype == object and len(serie):
+            total += int(_promedio_muestra(serie.to_numpy(), sys.getsizeof) * len(serie))
+    return total
+
+
+def tamano_aproximado(valor, _vistos: Optional[set] = None, _profundidad: int = 0) -> int:
+    """
+    Bytes aproximados que retiene un valor de st.session_state.
+
+    Cuenta bytes, arreglos y DataFrames por su tamaño real; listas y diccionarios grandes con una
+    muestra de sus elementos. Los objetos con memoria_aproximada() (p.ej. GraficoGranulometria)
+    la informan ellos mismos. Cada objeto se cuenta una sola vez.
+    """
+    if _vistos is None:
+        _vistos = set()
+    if id(valor) in _vistos or _profundidad > _PROFUNDIDAD_MAX:
+        return 0
+    _vistos.add(id(valor))
+
+    if isinstance(valor, (bytes, bytearray, str)):
+        return sys.getsizeof(valor)
+    if isinstance(valor, io.BytesIO):
+        # Archivos subidos (st.file_uploader)
+        return sys.getsizeof(valor) + len(valor.getbuffer())
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return _tamano_pandas(valor)
+    if hasattr(valor, "memoria_aproximada"):
+        return valor.memoria_aproximada()
+
+    def interno(v):
+        return tamano_aproximado(v, _vistos, _profundidad + 1)
+
+    if isinstance(valor, Mapping):
+        if len(valor) <= _MUESTRA:
+            return sys.getsizeof(valor) + sum(interno(k) + interno(v) for k, v in valor.items())
+        return sys.getsizeof(valor) + int(_promedio_muestra(list(valor.items()), interno) * len(valor))
+    if isinstance(valor, (list, tuple, deque, set, frozenset)):
+        if len(valor) <= _MUESTRA:
+            return sys.getsizeof(valor) + sum(interno(v) for v in valor)
+        return sys.getsizeof(valor) + int(_promedio_muestra(list(valor), interno) * len(valor))
+    if hasattr(valor, "__dict__"):
+        return sys.getsizeof(valor) + interno(vars(valor))
+    return sys.getsizeof(valor)
+
+
+def medir_sesion(estado: Mapping[str, Any]) -> Dict[str, int]:
+    """Bytes aproximados por clave del estado de sesión, de mayor a menor."""
+    vistos: set = set()
+    tamanos = {str(clave): tamano_aproximado(estado[clave], vistos) for clave in list(estado.keys())}
+    return dict(sorted(tamanos.items(), key=lambda item: item[1], reverse=True))
+
+
+# ========================================
+# PRESUPUESTO
+# ========================================
+
+def _descartar_caches(estado: MutableMapping[str, Any], exceso: int) -> Tuple[int, int]:
+    """Descarta entradas de las cachés de la sesión, de uso más antiguo primero; devuelve (bytes, entradas)."""
+    candidatos = []
+    for nombre in CACHES_SESION:
+        cache = estado.get(nombre)
+        if not isinstance(cache, CacheLRU) or len(cache) < 2:
+            continue
+        # La más reciente de cada caché es la que está en pantalla; se volvería a construir enseguida
+        en_uso = next(reversed(cache))
+        candidatos += [(cache.usos.get(clave, -1), nombre, clave) for clave in cache if clave != en_uso]
+    candidatos.sort(key=lambda candidato: candidato[0])
+
+    liberados = descartadas = 0
+    for _, nombre, clave in candidatos:
+        if liberados >= exceso:
+            break
+        valor = estado[nombre].pop(clave)
+        liberados += tamano_aproximado(valor)
+        if hasattr(valor, "liberar"):
+            valor.liberar()
+        descartadas += 1
+    return liberados, descartadas
+
+
+def _id_sesion() -> str:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    contexto = get_script_run_ctx(suppress_warning=True)
+    return contexto.session_id if contexto is not None else "local"
+
+
+def controlar_memoria(
+    estado: Optional[MutableMapping[str, Any]] = None,
+    presupuesto_mb: Optional[float] = None,
+    sesion: Optional[str] = None,
+) -> MemoriaSesion:
+    """
+    Mide la sesión y la ajusta al presupuesto; se llama al final de cada página.
+
+    Parámetros:
+    - estado: Estado de la sesión; st.session_state si es None
+    - presupuesto_mb: Presupuesto en MB; PRESUPUESTO_MB si es None
+    - sesion: Identificador para la vista de administración; el de la sesión de Streamlit si es None
+    - devuelve la medición después de ajustar
+    """
+    estado = st.session_state if estado is None else estado
+    presupuesto = (PRESUPUESTO_MB if presupuesto_mb is None else presupuesto_mb) * MB
+    sesion = _id_sesion() if sesion is None else sesion
+
+    por_clave = medir_sesion(estado)
+    total = sum(por_clave.values())
+    descartadas = 0
+    if total > presupuesto:
+        _, descartadas = _descartar_caches(estado, total - presupuesto)
+        por_clave = medir_sesion(estado)
+        total = sum(por_clave.values())
+
+    registros = [v for v in (estado[c] for c in list(estado.keys())) if isinstance(v, RegistroEnsayos)]
+    if total > presupuesto:
+        descargados = sum(
+            registro.descargar(len(registro) - MIN_FILAS_EN_MEMORIA, CARPETA_SESIONES)
+            for registro in registros
+            if len(registro) >= MAX_FILAS_EN_MEMORIA
+        )
+        if descargados:
+            por_clave = medir_sesion(estado)
+            total = sum(por_clave.values())
+
+    with _BLOQUEO:
+        anterior = _SESIONES.get(sesion)
+        medicion = MemoriaSesion(
+            sesion,
+            total,
+            por_clave,
+            sum(registro.filas_en_disco for registro in registros),
+            (anterior.descartes if anterior else 0) + descartadas,
+            time.time(),
+        )
+        _SESIONES[sesion] = medicion
+    return medicion
+
+
+def sesiones_activas() -> List[MemoriaSesion]:
+    """Última medición de cada sesión con actividad reciente, de mayor a menor memoria."""
+    limite = time.time() - SESION_INACTIVA_S
+    with _BLOQUEO:
+        for sesion in [s for s, m in _SESIONES.items() if m.hora < limite]:
+            del _SESIONES[sesion]
+        mediciones = list(_SESIONES.values())
+    return sorted(mediciones, key=lambda m: m.total, reverse=True)
@@ -0,0 +1,354 @@
+import shutil
+import sys
+import tempfile
+import weakref
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from calculos.cal_concreto import COLUMNAS_ENSAYOS
+
+# Tipo de falla tal como se registra (los 6 primeros caracteres de "Tipo N: descripción")
+CATEGORIAS_FALLA = tuple(f"Tipo {i}" for i in range(1, 7))
+
+# Tipos de df_ensayos. Las medidas se ingresan con 1-2 decimales y caben en float32; los resultados
+# calculados quedan en float64 para que el redondeo a 2 decimales y las sumas de conformidad y del
+# ajuste resistencia-edad no cambien. Edad en int8 con nulos (las edades de NTC 673 llegan a 90 d),
+# tipo de falla como categoría y fecha como datetime en vez de texto por fila.
+TIPOS_ENSAYOS: Dict[str, Any] = {
+    "Muestra": np.dtype(object),
+    "Fecha": np.dtype("datetime64[ns]"),
+    "Edad(d)": pd.Int8Dtype(),
+    "F'c(MPa)": np.dtype(np.float32),
+    "Diámetro(mm)": np.dtype(np.float32),
+    "Altura(mm)": np.dtype(np.float32),
+    "Peso(kg)": np.dtype(np.float32),
+    "Densidad(kg/m3)": np.dtype(np.float64),
+    "Carga Máxima(kN)": np.dtype(np.float32),
+    "Resistencia(MPa)": np.dtype(np.float64),
+    "Evolución(%)": np.dtype(np.float64),
+    "Tipo Falla": pd.CategoricalDtype(CATEGORIAS_FALLA),
+}
+
+_CAPACIDAD_INICIAL = 64
+# Textos que se miden para estimar la memoria de una columna de objetos
+_MUESTRA_TEXTOS = 64
+# Edad vacía dentro del arreglo int8 del registro (no es una edad válida)
+_EDAD_VACIA = np.iinfo(np.int8).min
+
+
+def _edad(valor) -> Optional[int]:
+    try:
+        edad = round(float(str(valor).split(" ")[0]))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return edad if 0 <= edad <= np.iinfo(np.int8).max else None
+
+
+def _fecha(valor) -> np.datetime64:
+    if isinstance(valor, (date, datetime)):
+        return np.datetime64(pd.Timestamp(valor), "ns")
+    texto = str(valor).strip()
+    for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return np.datetime64(datetime.strptime(texto, formato), "ns")
+        except ValueError:
+            continue
+    return np.datetime64("NaT")
+
+
+def _edades(valores: pd.Series) -> pd.Series:
+    """'28 (+-20h)', '28', 28 o 28.0 -> Int8; vacío, texto o fuera de rango -> <NA>."""
+    if not pd.api.types.is_numeric_dtype(valores):
+        valores = pd.to_numeric(valores.astype("string").str.strip().str.split(" ").str[0], errors="coerce")
+    valores = valores.astype("Float64").round()
+    return valores.where((valores >= 0) & (valores <= np.iinfo(np.int8).max)).astype("Int8")
+
+
+def _fechas(valores: pd.Series) -> pd.Series:
+    """Fechas dd/mm/aaaa (formulario), ISO o date -> datetime64; las que no se reconocen quedan NaT."""
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        return valores.astype("datetime64[ns]")
+    texto = valores.astype("string").str.strip()
+    fechas = pd.to_datetime(texto, format="%d/%m/%Y", errors="coerce")
+    pendientes = fechas.isna() & texto.fillna("").ne("")
+    if pendientes.any():
+        fechas[pendientes] = pd.to_datetime(texto[pendientes], format="ISO8601", errors="coerce")
+    return fechas.astype("datetime64[ns]")
+
+
+def _categorias(valores: pd.Series, tipo: pd.CategoricalDtype) -> pd.Categorical:
+    """Categoría con las de tipo más los valores que no estén entre ellas (no se pierde ninguno)."""
+    texto = valores.astype("string").str.strip().replace("", pd.NA)
+    extra = sorted(set(texto.dropna().unique()) - set(tipo.categories))
+    return pd.Categorical(texto, categories=[*tipo.categories, *extra])
+
+
+def _convertir(valores: pd.Series, tipo) -> Any:
+    if isinstance(tipo, pd.CategoricalDtype):
+        return _categorias(valores, tipo)
+    if isinstance(tipo, pd.Int8Dtype):
+        return _edades(valores)
+    if tipo.kind == "M":
+        return _fechas(valores)
+    if tipo.kind == "f":
+        return pd.to_numeric(valores, errors="coerce").astype(tipo)
+    return valores
+
+
+def tipar_ensayos(df: pd.DataFrame, tipos: Mapping[str, Any] = TIPOS_ENSAYOS) -> pd.DataFrame:
+    """
+    Convierte las columnas de una tabla de ensayos a los tipos de TIPOS_ENSAYOS.
+
+    Parámetros:
+    - df: DataFrame con columnas de df_ensayos (las que falten se ignoran, las demás se dejan igual)
+    - devuelve otro DataFrame; los valores que no se pueden convertir quedan vacíos (NaN, NaT, <NA>)
+    """
+    convertidas = {
+        columna: _convertir(df[columna], tipo)
+        for columna, tipo in tipos.items()
+        if columna in df.columns and df[columna].dtype != tipo
+    }
+    return df.assign(**convertidas) if convertidas else df
+
+
+def ensayos_vacios(columnas: Iterable[str] = COLUMNAS_ENSAYOS) -> pd.DataFrame:
+    """Tabla de ensayos sin filas, con los tipos de TIPOS_ENSAYOS (en vez de columnas object)."""
+    return pd.DataFrame({c: pd.Series(dtype=TIPOS_ENSAYOS.get(c, object)) for c in columnas})
+
+
+class RegistroEnsayos:
+    """
+    Almacén por columnas de los ensayos registrados en la sesión.
+
+    Agregar un ensayo cuesta O(1) amortizado (no se copia la tabla completa como con
+    pd.concat). Cada columna se guarda con el tipo de TIPOS_ENSAYOS en un arreglo que crece por
+    duplicación: edad en int8, tipo de falla como código de categoría, fecha en datetime64; solo
+    la muestra queda como objetos de Python. El DataFrame para st.dataframe y el PDF se construye
+    solo cuando cambian los datos y se reutiliza en los reruns siguientes.
+
+    En sesiones largas los ensayos más antiguos se pueden pasar a archivos Parquet temporales
+    (descargar); dataframe() devuelve solo los que siguen en memoria y bloques() recorre todos.
+    """
+
+    def __init__(self, columnas: Iterable[str] = COLUMNAS_ENSAYOS, tipos: Mapping[str, Any] = TIPOS_ENSAYOS):
+        self.columnas: List[str] = list(columnas)
+        self.tipos = {c: tipos.get(c, np.dtype(object)) for c in self.columnas}
+        self._arreglos: Dict[str, np.ndarray] = {}
+        self._textos: Dict[str, list] = {}
+        # Categorías de cada columna categórica -> código; crece si llega un valor nuevo
+        self._codigos: Dict[str, Dict[str, int]] = {}
+        for columna, tipo in self.tipos.items():
+            if isinstance(tipo, pd.CategoricalDtype):
+                self._codigos[columna] = {v: i for i, v in enumerate(tipo.categories)}
+                self._arreglos[columna] = np.empty(_CAPACIDAD_INICIAL, np.int16)
+            elif isinstance(tipo, pd.Int8Dtype):
+                self._arreglos[columna] = np.empty(_CAPACIDAD_INICIAL, np.int8)
+            elif tipo.kind in "fM":
+                self._arreglos[columna] = np.empty(_CAPACIDAD_INICIAL, tipo)
+            else:
+                self._textos[columna] = []
+        self._n = 0
+        self._df: Optional[pd.DataFrame] = None
+        # Cambia con cada ensayo agregado o descargado (len() baja al descargar)
+        self._version = 0
+        self._archivos: List[Path] = []
+        self._en_disco = 0
+        self._carpeta: Optional[Path] = None
+
+    def __len__(self) -> int:
+        """Ensayos en memoria (sin los descargados a disco)."""
+        return self._n
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def filas_en_disco(self) -> int:
+        return self._en_disco
+
+    @property
+    def total(self) -> int:
+        """Ensayos registrados en la sesión, en memoria y en disco."""
+        return self._en_disco + self._n
+
+    @property
+    def empty(self) -> bool:
+        return self._n == 0
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes de los arreglos tipados (capacidad reservada incluida; sin los textos)."""
+        return sum(arreglo.nbytes for arreglo in self._arreglos.values())
+
+    def memoria_aproximada(self) -> int:
+        """
+        Bytes aproximados en memoria: los arreglos tipados y los textos, medidos con una muestra.
+
+        No cuenta el DataFrame de dataframe(): se arma con copy=False sobre los mismos arreglos.
+        """
+        total = self.nbytes
+        for valores in self._textos.values():
+            total += sys.getsizeof(valores)
+            if valores:
+                muestra = valores[::max(1, len(valores) // _MUESTRA_TEXTOS)]
+                total += int(sum(sys.getsizeof(v) for v in muestra) / len(muestra) * len(valores))
+        return total
+
+    def _reservar(self, n_nuevas: int):
+        capacidad = len(next(iter(self._arreglos.values()))) if self._arreglos else 0
+        requerida = self._n + n_nuevas
+        if requerida <= capacidad:
+            return
+        while capacidad < requerida:
+            capacidad = max(capacidad * 2, _CAPACIDAD_INICIAL)
+        self._redimensionar(capacidad)
+
+    def _redimensionar(self, capacidad: int, desde: int = 0):
+        """Copia las filas desde..n a arreglos nuevos de la capacidad dada."""
+        for columna, arreglo in self._arreglos.items():
+            nuevo = np.empty(capacidad, arreglo.dtype)
+            nuevo[:self._n - desde] = arreglo[desde:self._n]
+            self._arreglos[columna] = nuevo
+
+    def _valores(self, columna: str, serie: pd.Series) -> np.ndarray:
+        """Valores de una columna ya tipada en el formato del arreglo del registro."""
+        tipo = self.tipos[columna]
+        if isinstance(tipo, pd.CategoricalDtype):
+            codigos = self._codigos[columna]
+            for categoria in serie.cat.categories:
+                codigos.setdefault(categoria, len(codigos))
+            return pd.Categorical(serie, categories=list(codigos)).codes
+        if isinstance(tipo, pd.Int8Dtype):
+            return serie.to_numpy(np.int8, na_value=_EDAD_VACIA)
+        return serie.to_numpy(tipo)
+
+    def _valor(self, columna: str, valor):
+        """Un valor del formulario en el formato del arreglo del registro (sin pasar por pandas)."""
+        tipo = self.tipos[columna]
+        vacio = (
+            valor is None or valor is pd.NA or valor is pd.NaT
+            or (isinstance(valor, (float, np.floating)) and np.isnan(valor)) or valor == ""
+        )
+        if columna in self._codigos:
+            codigos = self._codigos[columna]
+            return -1 if vacio else codigos.setdefault(str(valor).strip(), len(codigos))
+        if isinstance(tipo, pd.Int8Dtype):
+            edad = _edad(valor)
+            return _EDAD_VACIA if edad is None else edad
+        if tipo.kind == "M":
+            return np.datetime64("NaT") if vacio else _fecha(valor)
+        return np.nan if vacio else valor
+
+    def agregar(self, ensayo: Dict[str, Any]):
+        """
+        Agrega un ensayo.
+
+        Parámetros:
+        - ensayo: Diccionario {columna: valor} como en el formulario ("28" o "28 (+-20h)",
+          "dd/mm/aaaa", "Tipo 1"); las columnas faltantes o None quedan vacías
+        """
+        self._reservar(1)
+        for columna, arreglo in self._arreglos.items():
+            arreglo[self._n] = self._valor(columna, ensayo.get(columna))
+        for columna, valores in self._textos.items():
+            valores.append(ensayo.get(columna))
+        self._n += 1
+        self._version += 1
+        self._df = None
+
+    def extender(self, ensayos: pd.DataFrame):
+        """
+        Agrega muchos ensayos de una vez (p.ej. un bloque importado de la prensa).
+
+        Parámetros:
+        - ensayos: DataFrame con las columnas del registro, tipado o no; las faltantes quedan vacías
+        """
+        n = len(ensayos)
+        if not n:
+            return
+        ensayos = tipar_ensayos(ensayos.reindex(columns=self.columnas), self.tipos)
+        self._reservar(n)
+        for columna, arreglo in self._arreglos.items():
+            arreglo[self._n:self._n + n] = self._valores(columna, ensayos[columna])
+        for columna, valores in self._textos.items():
+            valores.extend(ensayos[columna].tolist())
+        self._n += n
+        self._version += 1
+        self._df = None
+
+    def descargar(self, n: int, carpeta=None) -> int:
+        """
+        Pasa los n ensayos más antiguos a un archivo Parquet y los quita de la memoria.
+
+        Los archivos van a una carpeta temporal propia del registro, que se borra cuando el
+        registro se libera (al cerrarse la sesión).
+
+        Parámetros:
+        - n: Ensayos a descargar (como máximo los que hay en memoria)
+        - carpeta: Carpeta donde crear la carpeta temporal; la del sistema si es None
+        - devuelve los ensayos descargados
+        """
+        n = min(n, self._n)
+        if n <= 0:
+            return 0
+        if self._carpeta is None:
+            self._carpeta = Path(tempfile.mkdtemp(prefix="lab_concreto_sesion_", dir=carpeta))
+            weakref.finalize(self, shutil.rmtree, self._carpeta, True)
+        ruta = self._carpeta / f"ensayos_{len(self._archivos):04d}.parquet"
+        self.dataframe().iloc[:n].to_parquet(ruta, index=False)
+        self._archivos.append(ruta)
+
+        restantes = self._n - n
+        capacidad = _CAPACIDAD_INICIAL
+        while capacidad < restantes:
+            capacidad *= 2
+        # Arreglos nuevos del tamaño justo: así la memoria de las filas descargadas se libera
+        self._redimensionar(capacidad, desde=n)
+        for valores in self._textos.values():
+            del valores[:n]
+        self._n = restantes
+        self._en_disco += n
+        self._version += 1
+        self._df = None
+        return n
+
+    def bloques(self, columnas: Optional[Iterable[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Todos los ensayos de la sesión, de a un archivo descargado y al final los de memoria.
+
+        Parámetros:
+        - columnas: Columnas a leer (p.ej. solo las del ajuste resistencia-edad); todas si es None
+        """
+        todas = columnas is None
+        columnas = self.columnas if todas else list(columnas)
+        # Las categorías actuales (pueden haber crecido después de descargar): mismos tipos en todos los bloques
+        categorias = {c: pd.CategoricalDtype(list(codigos)) for c, codigos in self._codigos.items() if c in columnas}
+        for ruta in self._archivos:
+            yield pd.read_parquet(ruta, columns=columnas).astype(categorias)
+        if self._n:
+            yield self.dataframe() if todas else self.dataframe()[columnas]
+
+    def _columna(self, columna: str):
+        if columna in self._textos:
+            return self._textos[columna]
+        valores = self._arreglos[columna][:self._n]
+        if columna in self._codigos:
+            return pd.Categorical.from_codes(valores, categories=list(self._codigos[columna]))
+        if isinstance(self.tipos[columna], pd.Int8Dtype):
+            return pd.arrays.IntegerArray(valores, valores == _EDAD_VACIA)
+        return valores
+
+    def dataframe(self) -> pd.DataFrame:
+        """Devuelve la tabla de ensayos. No modificar: se comparte entre reruns hasta el próximo cambio."""
+        if self._df is None:
+            self._df = pd.DataFrame(
+                {c: self._columna(c) for c in self.columnas},
+                columns=self.columnas,
+                copy=False,
+            )
+        return self._df
@@ -0,0 +1,53 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, MutableMapping, Optional
+
+import pandas as pd
+
+# Número de informes que se conservan por sesión antes de descartar el menos usado
+MAX_PDFS_CACHE = 8
+
+
+def clave_pdf(df_resultados: pd.DataFrame, encabezado: Optional[Dict[str, Any]] = None, *extras) -> str:
+    """
+    Calcula un hash del contenido de los resultados y del encabezado del PDF.
+
+    Parámetros:
+    - df_resultados: DataFrame con los resultados del informe
+    - encabezado: Diccionario pdf_encabezado
+    - extras: Otros valores que cambian el informe (muestra, tipo de agregado, ...)
+    """
+    h = hashlib.sha256()
+    h.update(repr(list(df_resultados.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df_resultados, index=True).to_numpy().tobytes())
+    h.update(repr(sorted((encabezado or {}).items())).encode())
+    for extra in extras:
+        h.update(repr(extra).encode())
+    return h.hexdigest()
+
+
+def pdf_en_cache(
+    cache: MutableMapping[str, bytes],
+    clave: str,
+    construir: Callable[[], bytes],
+    max_entradas: int = MAX_PDFS_CACHE,
+) -> bytes:
+    """
+    Devuelve el PDF guardado para la clave o lo construye y lo guarda.
+
+    Parámetros:
+    - cache: OrderedDict donde se guardan los PDF (p.ej. en st.session_state)
+    - clave: Resultado de clave_pdf
+    - construir: Función sin argumentos que genera los bytes del PDF
+    - max_entradas: Máximo de PDF guardados; se descarta el de uso más antiguo
+    """
+    if clave in cache:
+        if isinstance(cache, OrderedDict):
+            cache.move_to_end(clave)
+        return cache[clave]
+
+    pdf = construir()
+    cache[clave] = pdf
+    while len(cache) > max_entradas:
+        del cache[next(iter(cache))]
+    return pdf
@@ -1,11 +1,13 @@
 from io import BytesIO
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Iterator, Union
+import sqlite3
 
+import numpy as np
 import pandas as pd
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 
 
@@ -21,12 +23,55 @@ def _dibujar_pie_pagina(canvas, doc):
 	canvas.restoreState()
 
 
-def compresion_cilindros_pdf(
-    df_resultados: pd.DataFrame,
-    encabezado: Optional[Dict[str, Any]] = None
-) -> bytes:
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
+COLUMNAS_PDF = [
+    "Muestra",
+    "Fecha",
+    "Edad(d)",
+    "Diámetro(mm)",
+    "Altura(mm)",
+    "Densidad(kg/m3)",
+    "Carga Máxima(kN)",
+    "Resistencia(MPa)",
+    "Evolución(%)",
+    "Tipo Falla",
+]
+
+# Formato de cada columna numérica; las demás se escriben como texto
+FORMATOS_PDF = {
+    "Diámetro(mm)": "%.1f",
+    "Altura(mm)": "%.1f",
+    "Densidad(kg/m3)": "%.2f",
+    "Carga Máxima(kN)": "%.2f",
+    "Resistencia(MPa)": "%.2f",
+    "Evolución(%)": "%.2f",
+}
+
+FORMATO_FECHA_PDF = "%d/%m/%Y"
+
+ANCHOS_COLUMNAS = [65, 55, 45, 68, 60, 78, 78, 72, 58, 60]
+
+# Alto fijo de fila para el modo por lotes: 8 pt de letra + 5 pt de relleno arriba y abajo.
+# Con alto fijo ReportLab no mide cada celda, y los bloques caben en una página sin partirse.
+ALTO_FILA = 19
+FILAS_PRIMERA_PAGINA = 20
+FILAS_POR_PAGINA = 26
+
+ESTILO_TABLA = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#D9EAF7")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F7F9FB")]),
+    ("TOPPADDING", (0, 0), (-1, -1), 5),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+])
+
+
+def _nuevo_documento(buffer) -> SimpleDocTemplate:
+    return SimpleDocTemplate(
         buffer,
         pagesize=landscape(A4),
         leftMargin=24,
@@ -34,6 +79,9 @@ def compresion_cilindros_pdf(
         topMargin=24,
         bottomMargin=24,
     )
+
+
+def _elementos_encabezado(encabezado: Optional[Dict[str, Any]]) -> list:
     estilos = getSampleStyleSheet()
     elementos = []
 
@@ -72,62 +120,45 @@ def compresion_cilindros_pdf(
     elementos.append(tabla_encabezado)
     elementos.append(Spacer(1, 12))
     elementos.append(Paragraph("<b>Ensayo de compresión de cilindros (NTC 673)</b>", estilos["Title"]))
+    elementos.append(Spacer(1, 12))
+    return elementos
 
-    #centra el texto normal debajo del título
-    
-    estilo_texto_centrado = ParagraphStyle(
-        "TextoCentrado",
-        parent=estilos["Normal"],
-        alignment=1,  # CENTER
-    )
 
-    elementos.append(Spacer(1, 12))
+def _formatear_filas(df_resultados: pd.DataFrame) -> list:
+    """Convierte un bloque de resultados en filas de texto, columna por columna (sin iterrows)."""
+    columnas = []
+    for columna in COLUMNAS_PDF:
+        serie = df_resultados[columna]
+        if columna in FORMATOS_PDF:
+            valores = pd.to_numeric(serie.to_numpy(), errors="coerce")
+            columnas.append(np.char.mod(FORMATOS_PDF[columna], np.asarray(valores, dtype=np.float64)))
+        elif pd.api.types.is_datetime64_any_dtype(serie):
+            # Tabla tipada de la sesión (TIPOS_ENSAYOS): la fecha como en el formulario
+            columnas.append(serie.dt.strftime(FORMATO_FECHA_PDF).fillna("").to_numpy(dtype=str))
+        else:
+            # Edad Int8 y tipo de falla categórico: los vacíos quedan en blanco, no "<NA>" ni "nan"
+            columnas.append(serie.astype(object).where(serie.notna(), "").to_numpy().astype(str))
+    if not len(df_resultados):
+        return []
+    return np.column_stack(columnas).tolist()
 
-    columnas = [
-        "Muestra",
-        "Fecha",
-        "Edad(d)",
-        "Diámetro(mm)",
-        "Altura(mm)",
-        "Densidad(kg/m3)",
-        "Carga Máxima(kN)",
-        "Resistencia(MPa)",
-        "Evolución(%)",
-        "Tipo Falla",
-    ]
-
-    tabla_datos = [columnas]
-    for _, fila in df_resultados.iterrows():
-        tabla_datos.append([
-            str(fila["Muestra"]),
-            str(fila["Fecha"]),
-            str(fila["Edad(d)"]),
-            f"{fila['Diámetro(mm)']:.1f}",
-            f"{fila['Altura(mm)']:.1f}",
-            f"{fila['Densidad(kg/m3)']:.2f}",
-            f"{fila['Carga Máxima(kN)']:.2f}",
-            f"{fila['Resistencia(MPa)']:.2f}",
-            f"{fila['Evolución(%)']:.2f}",
-            str(fila["Tipo Falla"]),
-        ])
+
+def compresion_cilindros_pdf(
+    df_resultados: pd.DataFrame,
+    encabezado: Optional[Dict[str, Any]] = None
+) -> bytes:
+    buffer = BytesIO()
+    doc = _nuevo_documento(buffer)
+    elementos = _elementos_encabezado(encabezado)
+
+    tabla_datos = [COLUMNAS_PDF] + _formatear_filas(df_resultados)
 
     tabla = Table(
         tabla_datos,
         repeatRows=1,
-        colWidths=[65, 55, 45, 68, 60, 78, 78, 72, 58, 60],
+        colWidths=ANCHOS_COLUMNAS,
     )
-    tabla.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#D9EAF7")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("FONTSIZE", (0, 0), (-1, -1), 8),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F7F9FB")]),
-        ("TOPPADDING", (0, 0), (-1, -1), 5),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
-    ]))
+    tabla.setStyle(ESTILO_TABLA)
 
     elementos.append(tabla)
     doc.build(elementos, onFirstPage=_dibujar_pie_pagina, onLaterPages=_dibujar_pie_pagina)
@@ -135,6 +166,122 @@ def compresion_cilindros_pdf(
     return buffer.getvalue()
 
 
+FuenteResultados = Union[pd.DataFrame, sqlite3.Cursor, Iterable[pd.DataFrame], Iterable[Dict[str, Any]]]
+
+
+def _bloques(fuente: FuenteResultados, tamano_bloque: int) -> Iterator[pd.DataFrame]:
+    """Recorre la fuente de datos en bloques de DataFrame sin cargarla completa."""
+    if isinstance(fuente, pd.DataFrame):
+        for inicio in range(0, len(fuente), tamano_bloque):
+            yield fuente.iloc[inicio:inicio + tamano_bloque]
+        return
+
+    if isinstance(fuente, sqlite3.Cursor):
+        # Admite columnas con nombres de pantalla o con los nombres de la tabla SQLite
+        from utils.almacenamiento import COLUMNAS_CILINDROS
+
+        renombrar = dict(COLUMNAS_CILINDROS)
+        nombres = [renombrar.get(d[0], d[0]) for d in fuente.description]
+        while True:
+            filas = fuente.fetchmany(tamano_bloque)
+            if not filas:
+                return
+            yield pd.DataFrame.from_records(filas, columns=nombres)
+
+    pendientes = []
+    for elemento in fuente:
+        if isinstance(elemento, pd.DataFrame):
+            yield from _bloques(elemento, tamano_bloque)
+            continue
+        pendientes.append(elemento)
+        if len(pendientes) == tamano_bloque:
+            yield pd.DataFrame.from_records(pendientes)
+            pendientes = []
+    if pendientes:
+        yield pd.DataFrame.from_records(pendientes)
+
+
+def _filas_en_paginas(fuente: FuenteResultados, tamano_bloque: int) -> Iterator[list]:
+    """Reagrupa los bloques de la fuente en bloques de filas del tamaño de una página."""
+    capacidad = FILAS_PRIMERA_PAGINA
+    pendientes = []
+    for bloque in _bloques(fuente, tamano_bloque):
+        pendientes.extend(_formatear_filas(bloque))
+        while len(pendientes) >= capacidad:
+            yield pendientes[:capacidad]
+            del pendientes[:capacidad]
+            capacidad = FILAS_POR_PAGINA
+    if pendientes:
+        yield pendientes
+
+
+class _FlowablesPerezosos(list):
+    """
+    Lista de flowables que se llena desde un generador a medida que ReportLab la consume
+    (doc.build saca elementos del frente de la lista), para no tener todo el informe en memoria.
+    """
+
+    def __init__(self, generador: Iterator, reserva: int = 2):
+        super().__init__()
+        self._generador = generador
+        self._reserva = reserva
+
+    def _rellenar(self, minimo: int):
+        while self._generador is not None and list.__len__(self) < minimo:
+            try:
+                self.append(next(self._generador))
+            except StopIteration:
+                self._generador = None
+
+    def __len__(self):
+        self._rellenar(self._reserva)
+        return list.__len__(self)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            self._rellenar(float("inf") if indice.stop is None or indice.stop < 0 else indice.stop)
+        else:
+            self._rellenar(float("inf") if indice < 0 else indice + 1)
+        return list.__getitem__(self, indice)
+
+
+def compresion_cilindros_pdf_lote(
+    fuente: FuenteResultados,
+    encabezado: Optional[Dict[str, Any]] = None,
+    tamano_bloque: int = 2000,
+) -> bytes:
+    """
+    Genera el informe de compresión de cilindros para volúmenes grandes (cierres de mes).
+
+    Parámetros:
+    - fuente: DataFrame, cursor SQLite o generador de DataFrames / diccionarios con las columnas de COLUMNAS_PDF
+    - encabezado: Diccionario pdf_encabezado
+    - tamano_bloque: Filas que se leen de la fuente en cada paso
+    """
+    buffer = BytesIO()
+    doc = _nuevo_documento(buffer)
+
+    def elementos():
+        yield from _elementos_encabezado(encabezado)
+        for filas in _filas_en_paginas(fuente, tamano_bloque):
+            tabla = Table(
+                [COLUMNAS_PDF] + filas,
+                repeatRows=1,
+                colWidths=ANCHOS_COLUMNAS,
+                rowHeights=ALTO_FILA,
+            )
+            tabla.setStyle(ESTILO_TABLA)
+            yield tabla
+
+    doc.build(
+        _FlowablesPerezosos(elementos()),
+        onFirstPage=_dibujar_pie_pagina,
+        onLaterPages=_dibujar_pie_pagina,
+    )
+    buffer.seek(0)
+    return buffer.getvalue()
+
+
 def generarar_pdf(
     df_resultados: pd.DataFrame,
     encabezado: Optional[Dict[str, Any]] = None
@@ -8,6 +8,8 @@ from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
+from utils.graficos import figura_png
+
 
 def _dibujar_pie_pagina(canvas, doc):
     canvas.saveState()
@@ -123,9 +125,7 @@ def granulometria_pdf(
     elementos.append(tabla)
     elementos.append(Spacer(1, 12))
 
-    imagen_buffer = BytesIO()
-    fig.savefig(imagen_buffer, format="png", dpi=180, bbox_inches="tight")
-    imagen_buffer.seek(0)
+    imagen_buffer = BytesIO(figura_png(fig, dpi=180, bbox_inches="tight"))
     elementos.append(Image(imagen_buffer, width=700, height=320))
 
     doc.build(elementos, onFirstPage=_dibujar_pie_pagina, onLaterPages=_dibujar_pie_pagina)
@@ -0,0 +1,219 @@
+import multiprocessing
+import os
+import pickle
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import pandas as pd
+
+# Exportación de muchos informes PDF a la vez (cierre de mes), repartidos en varios procesos.
+
+
+class TrabajoInforme(NamedTuple):
+    """Un informe a generar. tipo es "cilindros" o "granulometria"."""
+    nombre: str
+    tipo: str
+    resultados: pd.DataFrame
+    encabezado: Optional[Dict[str, Any]] = None
+    muestra: str = ""
+    tipo_agregado: str = ""
+
+
+class ResultadoExportacion(NamedTuple):
+    generados: List[str]
+    errores: Dict[str, str]
+
+
+ProgresoCallback = Callable[[int, int, str, Optional[str]], None]
+
+
+def _nombre_archivo(nombre: str) -> str:
+    limpio = re.sub(r"[^\w\-. ]", "_", nombre).strip() or "informe"
+    return limpio if limpio.lower().endswith(".pdf") else f"{limpio}.pdf"
+
+
+def _figura_granulometria(tipo_agregado: str, df_resultados: pd.DataFrame):
+    """Gráfico granulométrico del informe, con las curvas límite del tipo de agregado."""
+    from utils.graficos import curva_granulometrica
+    from utils.limites_granulometria import cargar_limites
+
+    limites = cargar_limites()[tipo_agregado]
+    return curva_granulometrica(limites, df_resultados['Tamiz (mm)'], df_resultados['% Pasante'])
+
+
+def renderizar_informe(trabajo: TrabajoInforme) -> bytes:
+    """Genera los bytes del PDF de un trabajo."""
+    if trabajo.tipo == "cilindros":
+        from utils.report.compresion_cilindros_pdf import compresion_cilindros_pdf_lote
+
+        return compresion_cilindros_pdf_lote(trabajo.resultados, trabajo.encabezado)
+    if trabajo.tipo == "granulometria":
+        from utils.report.granulometria_pdf import granulometria_pdf
+
+        fig = _figura_granulometria(trabajo.tipo_agregado, trabajo.resultados)
+        return granulometria_pdf(trabajo.muestra, trabajo.tipo_agregado, trabajo.resultados, fig, trabajo.encabezado)
+    raise ValueError(f"Tipo de informe desconocido: {trabajo.tipo}")
+
+
+# Estado de cada trabajo en memoria compartida (0 pendiente, 1 en curso, 2 terminado), para saber
+# cuál estaba en curso si un proceso muere. Se escribe sin colas para que no se pierda al morir.
+_EN_CURSO = 1
+_TERMINADO = 2
+_estados = None
+
+
+def _iniciar_proceso(estados):
+    global _estados
+    _estados = estados
+
+
+def _ejecutar(indice: int, trabajo_serializado: bytes) -> bytes:
+    # El trabajo llega serializado para marcarlo en curso antes de reconstruirlo
+    _estados[indice] = _EN_CURSO
+    pdf = renderizar_informe(pickle.loads(trabajo_serializado))
+    _estados[indice] = _TERMINADO
+    return pdf
+
+
+class _Destino:
+    """Escribe los PDF en una carpeta o, si la ruta termina en .zip, dentro de un zip."""
+
+    def __init__(self, destino):
+        self.ruta = Path(destino)
+        self._zip = None
+        if self.ruta.suffix.lower() == ".zip":
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            self._zip = zipfile.ZipFile(self.ruta, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            self.ruta.mkdir(parents=True, exist_ok=True)
+
+    def escribir(self, nombre: str, pdf: bytes):
+        if self._zip is not None:
+            self._zip.writestr(nombre, pdf)
+        else:
+            (self.ruta / nombre).write_bytes(pdf)
+
+    def cerrar(self):
+        if self._zip is not None:
+            self._zip.close()
+
+
+def exportar_informes(
+    trabajos: Iterable[TrabajoInforme],
+    destino,
+    progreso: Optional[ProgresoCallback] = None,
+    max_procesos: Optional[int] = None,
+    reintentos: int = 1,
+) -> ResultadoExportacion:
+    """
+    Genera varios informes PDF en paralelo con un ProcessPoolExecutor.
+
+    Parámetros:
+    - trabajos: Lista de TrabajoInforme
+    - destino: Carpeta de salida o archivo .zip
+    - progreso: Función (completados, total, nombre, error) llamada al terminar cada informe
+    - max_procesos: Número de procesos; por defecto os.cpu_count()
+    - reintentos: Veces que se reintenta un informe cuyo proceso murió (p.ej. sin memoria)
+    - devuelve ResultadoExportacion con los archivos generados y los errores por archivo;
+      el fallo de un informe no detiene el resto del lote
+    """
+    trabajos = list(trabajos)
+    nombres = []
+    for trabajo in trabajos:
+        nombre = base = _nombre_archivo(trabajo.nombre)
+        copia = 1
+        while nombre in nombres:
+            copia += 1
+            nombre = f"{base[:-4]}_{copia}.pdf"
+        nombres.append(nombre)
+    total = len(trabajos)
+    pendientes = set(range(total))
+    intentos = [0] * total
+    generados, errores = [], {}
+    salida = _Destino(destino)
+    contexto = multiprocessing.get_context("spawn")
+    estados = contexto.RawArray("b", total)
+
+    def terminar(indice, error=None):
+        pendientes.discard(indice)
+        if error is None:
+            generados.append(nombres[indice])
+        else:
+            errores[nombres[indice]] = error
+        if progreso:
+            progreso(total - len(pendientes), total, nombres[indice], error)
+
+    def ronda(indices, procesos) -> bool:
+        """Ejecuta los trabajos indicados en un pool nuevo; devuelve True si murió un proceso."""
+        roto = False
+        with ProcessPoolExecutor(
+            max_workers=procesos,
+            mp_context=contexto,
+            initializer=_iniciar_proceso,
+            initargs=(estados,),
+        ) as pool:
+            futuros = {pool.submit(_ejecutar, i, pickle.dumps(trabajos[i])): i for i in sorted(indices)}
+            for futuro in as_completed(futuros):
+                indice = futuros[futuro]
+                try:
+                    pdf = futuro.result()
+                except BrokenProcessPool:
+                    roto = True
+                    continue
+                except Exception as e:
+                    terminar(indice, f"{type(e).__name__}: {e}")
+                    continue
+                salida.escribir(nombres[indice], pdf)
+                terminar(indice)
+        return roto
+
+    # Cuando muere un proceso se pierden todos los trabajos en curso en ese pool. Esos quedan
+    # como sospechosos y se repiten uno a uno en un pool propio; los demás siguen en paralelo.
+    sospechosos = set()
+    try:
+        while pendientes:
+            normales = pendientes - sospechosos
+            if normales:
+                if ronda(normales, min(len(normales), max_procesos or os.cpu_count())):
+                    en_curso = {i for i in pendientes if estados[i] == _EN_CURSO}
+                    sospechosos |= en_curso or set(pendientes)
+                continue
+
+            indice = min(sospechosos)
+            if ronda({indice}, 1):
+                intentos[indice] += 1
+                if intentos[indice] > reintentos:
+                    terminar(indice, "El proceso que generaba el informe terminó inesperadamente")
+            sospechosos &= pendientes
+    finally:
+        salida.cerrar()
+
+    return ResultadoExportacion(generados, errores)
+
+
+def trabajos_cilindros_por_obra(
+    df_resultados: pd.DataFrame,
+    encabezado: Optional[Dict[str, Any]] = None,
+    columna_obra: str = "Obra",
+) -> List[TrabajoInforme]:
+    """
+    Arma un trabajo de informe de cilindros por cada obra del DataFrame.
+
+    Parámetros:
+    - df_resultados: Resultados con una columna de obra (p.ej. una consulta del historial)
+    - encabezado: Encabezado base; "obra" se reemplaza por la de cada grupo
+    """
+    trabajos = []
+    for obra, grupo in df_resultados.groupby(columna_obra, sort=True, dropna=False):
+        obra = "" if pd.isna(obra) else str(obra)
+        trabajos.append(TrabajoInforme(
+            nombre=f"cilindros_{obra or 'sin_obra'}",
+            tipo="cilindros",
+            resultados=grupo.reset_index(drop=True),
+            encabezado={**(encabezado or {}), "obra": obra},
+        ))
+    return trabajos
@@ -0,0 +1,50 @@
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+import streamlit as st
+
+# Tabla de entrada con st.data_editor: un solo widget para todas las filas, en lugar de una fila de
+# st.columns con un number_input por celda. Las columnas calculadas se muestran en la misma
+# grilla (deshabilitadas) y se recalculan de una vez para toda la tabla.
+
+
+def tabla_editable(
+    clave: str,
+    derivar: Callable[[pd.DataFrame], pd.DataFrame],
+    editables: List[str],
+    column_config: Optional[Dict] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    Muestra los datos de entrada guardados en st.session_state[clave] con sus columnas derivadas.
+
+    Parámetros:
+    - clave: Clave en session_state del DataFrame de entrada; la página lo crea o lo ajusta
+      (p.ej. número de filas) antes de llamar
+    - derivar: Función vectorizada que recibe la entrada y devuelve la tabla completa
+    - editables: Columnas que el usuario puede modificar; las demás quedan deshabilitadas
+    - column_config: Configuración de columnas de st.data_editor (validaciones, formatos)
+    - devuelve la tabla completa con las columnas derivadas al día
+    """
+    version = st.session_state.get(f"{clave}_version", 0)
+    clave_editor = f"{clave}_editor_{version}"
+    tabla = derivar(st.session_state[clave])
+
+    editada = st.data_editor(
+        tabla,
+        key=clave_editor,
+        column_config=column_config,
+        disabled=[c for c in tabla.columns if c not in editables],
+        hide_index=True,
+        num_rows="fixed",
+        **kwargs,
+    )
+
+    # Al editar una celda se guarda la entrada y se vuelve a ejecutar con un editor nuevo (otra
+    # versión de la clave), así las columnas derivadas se muestran ya recalculadas
+    if st.session_state[clave_editor]["edited_rows"]:
+        entrada = st.session_state[clave]
+        st.session_state[clave] = editada[entrada.columns].reset_index(drop=True)
+        st.session_state[f"{clave}_version"] = version + 1
+        st.rerun()
+    return tabla